@@ -1,10 +1,7 @@
+import argparse
 import os
-import random
-from typing import List
 
-# Import symbols from environment.py (CORRIDOR_SYMBOL removed)
-from src.environment import (
-    GROUND_SYMBOL, WATER_SYMBOL, MUD_SYMBOL, ROCK_SYMBOL, TREE_SYMBOL)
+from src.map_generator import DEFAULT_PROBABILITIES, GENERATORS, generate_map, parse_probabilities
 
 # --- Configuration ---
 MAP_WIDTH = 100
@@ -12,56 +9,40 @@ MAP_HEIGHT = 100
 output_dir = "maps"
 output_filename = os.path.join(output_dir, "map.txt")
 
-# Define the probabilities for each environment type (sum should be 1.0)
-ENVIRONMENT_PROBABILITIES = {
-    GROUND_SYMBOL: 0.5,
-    WATER_SYMBOL: 0.2,
-    MUD_SYMBOL: 0.2,
-    ROCK_SYMBOL: 0.05,
-    TREE_SYMBOL: 0.05
-}
-
-# Ensure probabilities sum to 1.0 (or close enough due to float precision)
-if not (0.99 <= sum(ENVIRONMENT_PROBABILITIES.values()) <= 1.01):
-    raise ValueError("Sum of ENVIRONMENT_PROBABILITIES must be approximately 1.0")
-
-
-def create_random_map_data(width: int, height: int) -> List[List[str]]:
-    """
-    Creates a 2D list representing the map with random environment types
-    based on defined probabilities.
-    """
-    map_data = []
-    env_symbols = list(ENVIRONMENT_PROBABILITIES.keys())
-    probabilities = list(ENVIRONMENT_PROBABILITIES.values())
-
-    for _ in range(height):
-        row = random.choices(env_symbols, weights=probabilities, k=width)
-        map_data.append(row)
-    return map_data
-
-
-# The add_corridor_to_map function has been completely removed as requested.
-
-def save_map_to_file(map_data: List[List[str]], filepath: str):
-    """
-    Saves the generated map data to a text file.
-    """
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, 'w', encoding='utf-8') as f:  # Keep UTF-8 encoding for '■' and '§'
-        for row in map_data:
-            f.write("".join(row) + "\n")
+# Probability of each environment type (defined once, in src/map_generator.py; they should sum to 1.0)
+ENVIRONMENT_PROBABILITIES = DEFAULT_PROBABILITIES
 
 
 def main():
-    print(f"Generating a {MAP_WIDTH}x{MAP_HEIGHT} map...")
-
-    # Generate random map data
-    map_data = create_random_map_data(MAP_WIDTH, MAP_HEIGHT)
-
-    # Save the map to file
-    save_map_to_file(map_data, output_filename)
-    print(f"Map saved to '{output_filename}'")
+    parser = argparse.ArgumentParser(description="Generate a random map and stream it to a text or binary map file.")
+    parser.add_argument("--width", type=int, default=MAP_WIDTH, help="Map width in cells.")
+    parser.add_argument("--height", type=int, default=MAP_HEIGHT, help="Map height in cells.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed; the same seed gives the same map.")
+    parser.add_argument("--generator", choices=list(GENERATORS), default="random", help="Map layout.")
+    parser.add_argument("--terrain", nargs="*", default=[], metavar="NAME=PROBABILITY",
+                        help="Terrain probabilities, e.g. --terrain ground=0.6 water=0.1 rock=0.1.")
+    parser.add_argument("--output", default=output_filename, help="Map file to write.")
+    parser.add_argument("--format", choices=["text", "binary"], default=None,
+                        help="Output format (default: binary for .pfm files, text otherwise).")
+    parser.add_argument("--cluster-size", type=int, default=16, help="Patch size for the clustered generator.")
+    parser.add_argument("--noise", type=float, default=0.1,
+                        help="Fraction of random cells for the clustered generator.")
+    parser.add_argument("--spacing", type=int, default=32, help="Distance between corridors.")
+    parser.add_argument("--corridor-width", type=int, default=2, help="Width of the corridors.")
+    args = parser.parse_args()
+
+    options = {}
+    if args.generator == "clustered":
+        options = {"cluster_size": args.cluster_size, "noise": args.noise}
+    elif args.generator == "corridors":
+        options = {"spacing": args.spacing, "corridor_width": args.corridor_width}
+    binary = args.format == "binary" or (args.format is None and args.output.endswith(".pfm"))
+
+    print(f"Generating a {args.width}x{args.height} {args.generator} map...")
+    probabilities = parse_probabilities(args.terrain, ENVIRONMENT_PROBABILITIES)
+    generate_map(args.output, args.width, args.height, probabilities, args.generator,
+                 seed=args.seed, binary=binary, **options)
+    print(f"Map saved to '{args.output}'")
     print("Now run main.py to find a shortest path on the grid.")
 
 
@@ -4,7 +4,7 @@ from typing import List
 
 from src.a_star import AStarPathfinder
 from src.environment import SYMBOL_TO_ENVIRONMENT, GROUND_SYMBOL, MUD_SYMBOL, WATER_SYMBOL, ROCK_SYMBOL, TREE_SYMBOL
-from src.grid import Grid, find_nearest_non_obstacle_cell
+from src.grid import Cell, Grid
 from src.visualize_grid_map import generate_grid_image_with_images
 
 
@@ -27,11 +27,11 @@ output_path_dir = "paths"
 output_path_filename = os.path.join(output_path_dir, "path_visualization.txt")
 
 
-def save_path_to_file(grid_representation: str, filepath: str):
-    """Saves the grid with the path to a txt file."""
+def save_path_to_file(grid: Grid, path: List[Cell], filepath: str):
+    """Streams the grid with the path to a txt file, row by row."""
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(grid_representation)
+        grid.write_rows(f, path)
     print(f"\nGrid with path visualization saved to '{filepath}'")
 
 
@@ -88,14 +88,14 @@ def main():
     if start_cell_original.environment_type.is_obstacle:
         print(
             f"Warning: Start cell ({start_x},{start_y}) is an obstacle ({start_cell_original.environment_type.name}).")
-        adjusted_start_coords = find_nearest_non_obstacle_cell(grid, start_x, start_y, max_search_radius=5)
+        adjusted_start_coords = grid.snap_to_passable(start_x, start_y)
         if adjusted_start_coords:
             start_x, start_y = adjusted_start_coords
             start_cell = grid.get_cell(start_x, start_y)
             print(
                 f"Adjusted start to nearest non-obstacle: ({start_x},{start_y}) ({start_cell.environment_type.name}).")
         else:
-            print("Error: Could not find a reachable non-obstacle start cell nearby. Exiting.")
+            print("Error: The map has no non-obstacle cell to start from. Exiting.")
             return
     else:
         start_cell = start_cell_original
@@ -103,13 +103,13 @@ def main():
     # Adjust end point if it's an obstacle
     if end_cell_original.environment_type.is_obstacle:
         print(f"Warning: End cell ({end_x},{end_y}) is an obstacle ({end_cell_original.environment_type.name}).")
-        adjusted_end_coords = find_nearest_non_obstacle_cell(grid, end_x, end_y, max_search_radius=5)
+        adjusted_end_coords = grid.snap_to_passable(end_x, end_y, prefer_component_of=start_cell)
         if adjusted_end_coords:
             end_x, end_y = adjusted_end_coords
             end_cell = grid.get_cell(end_x, end_y)
             print(f"Adjusted end to nearest non-obstacle: ({end_x},{end_y}) ({end_cell.environment_type.name}).")
         else:
-            print("Error: Could not find a reachable non-obstacle end cell nearby. Exiting.")
+            print("Error: The map has no non-obstacle cell to end at. Exiting.")
             return
     else:
         end_cell = end_cell_original
@@ -143,11 +143,9 @@ def main():
         print("\nGrid with Path (console view):")
         grid.print_grid_with_path(path, sample_size=None)
 
-        full_path_grid_string = grid.render_grid_with_path(path)
-
         # paths
         full_output_path_filepath = os.path.join(project_root, output_path_filename)
-        save_path_to_file(full_path_grid_string, full_output_path_filepath)
+        save_path_to_file(grid, path, full_output_path_filepath)
 
         print("\nGenerating visual map images...")
 
@@ -1,80 +1,506 @@
 import heapq
-from typing import List, Optional
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 # Import Cell and Grid classes from the grid
+from .cost_profile import CostProfile, profile_grid
 from .grid import Cell, Grid
+from .open_list import HeapOpenList, open_list_for
+from .search_stats import SearchStats
+
+if TYPE_CHECKING:  # only needed for annotations; keeps landmarks and flow fields out of plain imports
+    from .landmarks import LandmarkTable
 
 
 class AStarPathfinder:
 
-    # A* pathfinding algorithm to find the shortest path
+    # A* pathfinding algorithm to find the shortest path.
+    # All search state (g-scores, parents, open and closed sets) lives in per-query structures
+    # keyed by cell id, so one Grid can serve any number of sequential or concurrent queries.
+    # With a LandmarkTable the heuristic is tightened with ALT lower bounds; paths stay optimal.
+    # The open list is pluggable: by default a bucket queue is used when every terrain cost is an
+    # integer and a binary heap otherwise (see src/open_list.py).
+    # Passing a SearchStats to find_path records counters and calls its on_expand / on_push hooks;
+    # without one, the search loop only pays for a few None checks.
+    # Bounded-suboptimal modes: find_path(weight=w) runs weighted A* (cost at most w times optimal), and
+    # anytime_paths / find_path_anytime run ARA*, improving a quick inflated path while budget remains.
+    # Node-expansion and wall-clock budgets return the best path so far, or a partial path toward the goal.
+    # find_path(bidirectional=True) searches from both ends at once, which expands fewer nodes on long queries.
+    # find_path(profile=...) searches the grid as seen by another agent type (see src/cost_profile.py).
 
-    def __init__(self, grid: Grid):
+    def __init__(self, grid: Grid, landmarks: Optional['LandmarkTable'] = None,
+                 open_list_factory: Optional[Callable[[], object]] = None):
         self.grid = grid
+        self.landmarks = landmarks
+        self.open_list_factory = open_list_factory
+        # Manhattan distance only bounds the cost from below while no step is cheaper than 1.
+        passable_costs = [env.cost for env in grid.symbol_to_environment.values() if not env.is_obstacle]
+        self._distance_scale = min(passable_costs + [1.0])
+        self._profile_pathfinders: Dict[str, 'AStarPathfinder'] = {}
 
-    @staticmethod
-    def _heuristic(cell_a: Cell, cell_b: Cell) -> float:
+    def _heuristic(self, cell_a: Cell, cell_b: Cell) -> float:
 
         # Calculates the distance between two cells and cost of movement.
 
-        return abs(cell_a.x - cell_b.x) + abs(cell_a.y - cell_b.y)
+        distance = abs(cell_a.x - cell_b.x) + abs(cell_a.y - cell_b.y)
+        if self._distance_scale != 1:
+            distance *= self._distance_scale
+        if self.landmarks is not None:
+            bound = self.landmarks.lower_bound(self._cell_id(cell_a), self._cell_id(cell_b))
+            if bound > distance:
+                return bound
+        return distance
+
+    def _cell_id(self, cell: Cell) -> int:
+        """Returns the row-major index of a cell, used as the key for per-query search state."""
+        return cell.y * self.grid.width + cell.x
+
+    def _in_different_components(self, start_id: int, end_id: int) -> bool:
+        """True if the grid's component index (if built) shows the goal is walled off from the start."""
+        components = self.grid.component_index
+        if components is None:
+            return False
+        start_component, end_component = components.component(start_id), components.component(end_id)
+        return bool(start_component and end_component and start_component != end_component)
 
-    def find_path(self, start_cell: Cell, end_cell: Cell) -> Optional[List[Cell]]:
+    def find_path(self, start_cell: Cell, end_cell: Cell, stats: Optional[SearchStats] = None,
+                  weight: float = 1.0, max_expansions: Optional[int] = None,
+                  time_limit: Optional[float] = None, bidirectional: bool = False,
+                  profile: Optional[Union[str, CostProfile]] = None) -> Optional[List[Cell]]:
         """
         Finds the shortest path from start_cell to end_cell.
+        The grid and its cells are never written to, so calls are reentrant and thread-safe.
         Args:
             start_cell: The starting Cell object.
             end_cell: The target Cell object.
+            stats: Optional SearchStats, reset and filled in with the counters of this search.
+            weight: Heuristic weight (weighted A*). Above 1 the search expands fewer nodes and the path
+                costs at most weight times the optimum.
+            max_expansions: Optional budget of expanded nodes.
+            time_limit: Optional budget of wall-clock seconds.
+            bidirectional: Search from both ends at once (see _search_bidirectional). Paths stay optimal;
+                weight and budgets are not supported in this mode.
+            profile: Optional cost profile (a registered name or a CostProfile) to search with instead of
+                the grid's own terrain costs. Landmarks, if any, only apply to the grid's own costs.
         Returns:
-            A list of Cell objects representing the path from start to end,
-            or None if no path is found.
+            A list of new Cell objects representing the path from start to end, each carrying
+            its g_score and parent for this query, or None if no path is found.
+            If a budget runs out first, the partial path toward the explored cell closest to the goal
+            (by the heuristic) is returned instead; its last cell is then not end_cell.
         """
-        start_cell.g_score = 0
-        start_cell.f_score = self._heuristic(start_cell, end_cell)
-        start_cell.parent = None
+        if profile is not None:
+            pathfinder = self._profile_pathfinder(profile)
+            return pathfinder.find_path(pathfinder.grid.get_cell(start_cell.x, start_cell.y),
+                                        pathfinder.grid.get_cell(end_cell.x, end_cell.y), stats, weight,
+                                        max_expansions, time_limit, bidirectional)
+        if weight < 1:
+            raise ValueError("weight must be at least 1.")
+        if bidirectional and (weight != 1 or max_expansions is not None or time_limit is not None):
+            raise ValueError("Bidirectional search does not support weight or budgets.")
+        if stats is None and weight == 1 and max_expansions is None and time_limit is None:
+            if bidirectional:
+                return self._search_bidirectional(start_cell, end_cell, None)
+            return self._search(start_cell, end_cell, None)
+
+        if stats is not None:
+            stats.reset()
+        started = time.perf_counter()
+        deadline = started + time_limit if time_limit is not None else None
+        if bidirectional:
+            path = self._search_bidirectional(start_cell, end_cell, stats)
+        else:
+            path = self._search(start_cell, end_cell, stats, weight, max_expansions, deadline)
+        if stats is not None:
+            stats.wall_time = time.perf_counter() - started
+            stats.path_cost = path[-1].g_score if path and path[-1].coords == end_cell.coords else None
+        return path
+
+    def _profile_pathfinder(self, profile: Union[str, CostProfile]) -> 'AStarPathfinder':
+        """A pathfinder over the grid's compiled view for a profile, created once per profile."""
+        view = profile_grid(self.grid, profile)
+        pathfinder = self._profile_pathfinders.get(view.profile.name)
+        if pathfinder is None or pathfinder.grid is not view:
+            pathfinder = AStarPathfinder(view, open_list_factory=self.open_list_factory)
+            self._profile_pathfinders[view.profile.name] = pathfinder
+        return pathfinder
+
+    def _search(self, start_cell: Cell, end_cell: Cell, stats: Optional[SearchStats], weight: float = 1.0,
+                max_expansions: Optional[int] = None, deadline: Optional[float] = None) -> Optional[List[Cell]]:
+        width = self.grid.width
+        start_id = self._cell_id(start_cell)
+        end_id = self._cell_id(end_cell)
 
-        open_set = [(start_cell.f_score, start_cell)]
+        # Goals in another walled-off region are rejected without expanding anything.
+        if self._in_different_components(start_id, end_id):
+            return None
 
+        g_score: Dict[int, float] = {start_id: 0}
+        came_from: Dict[int, Cell] = {}
         closed_set = set()
 
-        while open_set:
-            current_f_score, current_cell = heapq.heappop(open_set)
+        if self.open_list_factory:
+            open_set = self.open_list_factory()
+        elif float(weight).is_integer():
+            open_set = open_list_for(self.grid)
+        else:
+            open_set = HeapOpenList()  # f-scores are no longer integers, so buckets do not apply
+        start_h_score = self._heuristic(start_cell, end_cell)
+        open_set.push(weight * start_h_score, start_h_score, start_id, start_cell)
 
-            if current_cell == end_cell:
-                return self._reconstruct_path(current_cell)
+        on_expand = stats.on_expand if stats is not None else None
+        on_push = stats.on_push if stats is not None else None
+        if on_push is not None:
+            on_push(start_cell, 0, weight * start_h_score)
+        pushes = 1
+        stale_pops = 0
+        max_open_size = 1
 
-            if current_cell in closed_set:
-                continue
+        # With a budget, the reached cell closest to the goal is tracked for a partial answer.
+        budgeted = max_expansions is not None or deadline is not None
+        closest_h_score, closest_cell = start_h_score, start_cell
+        exhausted = False
 
-            closed_set.add(current_cell)
+        try:
+            while open_set:
+                current_f_score, current_id, current_cell = open_set.pop()
 
-            for neighbor in self.grid.get_neighbors(current_cell):
-                if neighbor.environment_type.is_obstacle:
+                if current_id == end_id:
+                    return self._reconstruct_path(current_cell, came_from)
+
+                if current_id in closed_set:
+                    stale_pops += 1
                     continue
 
-                if neighbor in closed_set:
+                if budgeted and ((max_expansions is not None and len(closed_set) >= max_expansions) or
+                                 (deadline is not None and not len(closed_set) & 63 and
+                                  time.perf_counter() >= deadline)):
+                    exhausted = True
+                    return self._reconstruct_path(closest_cell, came_from)
+
+                closed_set.add(current_id)
+                current_g_score = g_score[current_id]
+                if on_expand is not None:
+                    on_expand(current_cell, current_g_score)
+
+                for neighbor in self.grid.get_neighbors(current_cell):
+                    if neighbor.environment_type.is_obstacle:
+                        continue
+
+                    neighbor_id = neighbor.y * width + neighbor.x
+                    if neighbor_id in closed_set:
+                        continue
+
+                    tentative_g_score = current_g_score + neighbor.environment_type.cost
+
+                    # If this path to neighbor's cell is better than any previous one
+                    if tentative_g_score < g_score.get(neighbor_id, float('inf')):
+                        came_from[neighbor_id] = current_cell
+                        g_score[neighbor_id] = tentative_g_score
+                        neighbor_h_score = self._heuristic(neighbor, end_cell)
+
+                        open_set.push(tentative_g_score + weight * neighbor_h_score, neighbor_h_score,
+                                      neighbor_id, neighbor)
+                        if budgeted and neighbor_h_score < closest_h_score:
+                            closest_h_score, closest_cell = neighbor_h_score, neighbor
+                        if stats is not None:
+                            pushes += 1
+                            if len(open_set) > max_open_size:
+                                max_open_size = len(open_set)
+                            if on_push is not None:
+                                on_push(neighbor, tentative_g_score, tentative_g_score + weight * neighbor_h_score)
+
+            return None  # No path found
+        finally:
+            if stats is not None:
+                stats.nodes_expanded = len(closed_set)
+                stats.pushes = pushes
+                stats.stale_pops = stale_pops
+                stats.max_open_size = max_open_size
+                stats.budget_exhausted = exhausted
+
+    def _search_bidirectional(self, start_cell: Cell, end_cell: Cell,
+                              stats: Optional[SearchStats]) -> Optional[List[Cell]]:
+        """
+        Bidirectional A*: a forward search from the start and a backward search from the goal, advancing the
+        side with the smaller open list. Entering a cell costs that cell's terrain cost, so a backward step
+        from a cell to its neighbor costs the cell's own cost.
+        Both sides order cells by the averaged potential 2g + h_own - h_other (h_forward bounds the cost to the
+        goal, h_backward the cost from the start), which keeps the searches from overshooting each other.
+        mu, the cheapest path through a cell labeled by both sides, is updated whenever a label improves, and
+        the search stops once the two smallest priorities average to at least mu: no unexplored path can be
+        cheaper, so the result is optimal. An enclosed goal fails fast, as the backward side runs dry.
+        """
+        width = self.grid.width
+        start_id = self._cell_id(start_cell)
+        end_id = self._cell_id(end_cell)
+        if self._in_different_components(start_id, end_id):
+            return None
+        if start_id == end_id:
+            return self._reconstruct_path(start_cell, {})
+
+        def new_open_list():
+            return self.open_list_factory() if self.open_list_factory else open_list_for(self.grid)
+
+        # Per side: g-scores, links (forward: parent cell, backward: next cell toward the goal), closed set, open list.
+        forward = ({start_id: 0}, {}, set(), new_open_list())
+        backward = ({end_id: 0}, {}, set(), new_open_list())
+        start_h_score = self._heuristic(start_cell, end_cell)
+        forward[3].push(start_h_score, start_h_score, start_id, start_cell)
+        backward[3].push(start_h_score, start_h_score, end_id, end_cell)
+
+        on_expand = stats.on_expand if stats is not None else None
+        on_push = stats.on_push if stats is not None else None
+        if on_push is not None:
+            on_push(start_cell, 0, start_h_score)
+            on_push(end_cell, 0, start_h_score)
+        pushes = 2
+        stale_pops = [0]
+        max_open_size = 2
+
+        def next_entry(side):
+            # Pops the side's best entry that has not been expanded yet, or returns None if it has run dry.
+            closed_set, open_set = side[2], side[3]
+            while open_set:
+                entry = open_set.pop()
+                if entry[1] not in closed_set:
+                    return entry
+                stale_pops[0] += 1
+            return None
+
+        best_cost = float('inf')  # mu
+        meeting_cell: Optional[Cell] = None
+        forward_entry, backward_entry = next_entry(forward), next_entry(backward)
+        try:
+            while forward_entry is not None and backward_entry is not None:
+                if forward_entry[0] + backward_entry[0] >= 2 * best_cost:
+                    break
+
+                is_forward = len(forward[3]) <= len(backward[3])
+                g_score, links, closed_set, open_set = forward if is_forward else backward
+                other_g_score = backward[0] if is_forward else forward[0]
+                _, current_id, current_cell = forward_entry if is_forward else backward_entry
+
+                closed_set.add(current_id)
+                current_g_score = g_score[current_id]
+                if on_expand is not None:
+                    on_expand(current_cell, current_g_score)
+
+                for neighbor in self.grid.get_neighbors(current_cell):
+                    if neighbor.environment_type.is_obstacle:
+                        continue
+
+                    neighbor_id = neighbor.y * width + neighbor.x
+                    if neighbor_id in closed_set:
+                        continue
+
+                    step_cost = (neighbor if is_forward else current_cell).environment_type.cost
+                    tentative_g_score = current_g_score + step_cost
+                    if tentative_g_score < g_score.get(neighbor_id, float('inf')):
+                        g_score[neighbor_id] = tentative_g_score
+                        links[neighbor_id] = current_cell
+                        if neighbor_id in other_g_score and tentative_g_score + other_g_score[neighbor_id] < best_cost:
+                            best_cost = tentative_g_score + other_g_score[neighbor_id]
+                            meeting_cell = neighbor
+
+                        to_goal, from_start = self._heuristic(neighbor, end_cell), self._heuristic(start_cell, neighbor)
+                        neighbor_h_score = to_goal if is_forward else from_start
+                        if tentative_g_score + neighbor_h_score >= best_cost:
+                            continue  # cannot lead to a cheaper path
+                        balance = to_goal - from_start if is_forward else from_start - to_goal
+                        open_set.push(2 * tentative_g_score + balance, neighbor_h_score, neighbor_id, neighbor)
+                        if stats is not None:
+                            pushes += 1
+                            if len(forward[3]) + len(backward[3]) > max_open_size:
+                                max_open_size = len(forward[3]) + len(backward[3])
+                            if on_push is not None:
+                                on_push(neighbor, tentative_g_score, tentative_g_score + neighbor_h_score)
+
+                if is_forward:
+                    forward_entry = next_entry(forward)
+                else:
+                    backward_entry = next_entry(backward)
+
+            if meeting_cell is None:
+                return None  # No path found
+
+            # Chain the backward links onto the forward parents and rebuild the path from the goal.
+            parents = dict(forward[1])
+            current_cell = meeting_cell
+            while self._cell_id(current_cell) in backward[1]:
+                next_cell = backward[1][self._cell_id(current_cell)]
+                parents[self._cell_id(next_cell)] = current_cell
+                current_cell = next_cell
+            return self._reconstruct_path(current_cell, parents)
+        finally:
+            if stats is not None:
+                stats.nodes_expanded = len(forward[2]) + len(backward[2])
+                stats.pushes = pushes
+                stats.stale_pops = stale_pops[0]
+                stats.max_open_size = max_open_size
+
+    def anytime_paths(self, start_cell: Cell, end_cell: Cell, initial_weight: float = 2.5, weight_step: float = 0.5,
+                      stats: Optional[SearchStats] = None, max_expansions: Optional[int] = None,
+                      time_limit: Optional[float] = None) -> Iterator[Tuple[float, List[Cell]]]:
+        """
+        Anytime Repairing A* (ARA*). Yields (weight, path) pairs of improving paths, each costing at most
+        weight times the optimum: the first comes quickly from a search inflated by initial_weight, then the
+        weight is lowered by weight_step down to 1 (an optimal path), reusing the earlier search effort.
+        Budgets (max_expansions, time_limit in seconds) cover all iterations. If one runs out before any path
+        is found, a single (inf, path) pair is yielded: a path to the goal found so far with no bound on its
+        cost, or else the partial path toward the explored cell closest to the goal.
+        """
+        if initial_weight < 1 or weight_step <= 0:
+            raise ValueError("initial_weight must be at least 1 and weight_step above 0.")
+        started = time.perf_counter()
+        deadline = started + time_limit if time_limit is not None else None
+        if stats is not None:
+            stats.reset()
+
+        width = self.grid.width
+        start_id = self._cell_id(start_cell)
+        end_id = self._cell_id(end_cell)
+        if self._in_different_components(start_id, end_id):
+            return
+
+        on_expand = stats.on_expand if stats is not None else None
+        on_push = stats.on_push if stats is not None else None
+        g_score: Dict[int, float] = {start_id: 0}
+        h_score: Dict[int, float] = {start_id: self._heuristic(start_cell, end_cell)}
+        came_from: Dict[int, Cell] = {}
+        cells: Dict[int, Cell] = {start_id: start_cell}
+        weight = initial_weight
+        open_ids = {start_id}
+        closed_set = set()
+        inconsistent = set()  # improved after being expanded in the current iteration
+        open_heap = [(weight * h_score[start_id], h_score[start_id], start_id)]
+        expansions = pushes = stale_pops = 0
+        max_open_size = 1
+        closest_id = start_id
+        best_path: Optional[List[Cell]] = None
+        best_cost = best_weight = float('inf')
+        exhausted = False
+
+        def record(path: Optional[List[Cell]]) -> None:
+            if stats is not None:
+                stats.nodes_expanded, stats.pushes, stats.stale_pops = expansions, pushes, stale_pops
+                stats.max_open_size, stats.budget_exhausted = max_open_size, exhausted
+                stats.wall_time = time.perf_counter() - started
+                if path and path[-1].coords == end_cell.coords:
+                    stats.path_cost = path[-1].g_score
+
+        while True:
+            # ImprovePath: expand until the goal's g-score is within the inflated bound of every open entry.
+            while open_heap:
+                f_score, current_h_score, current_id = open_heap[0]
+                if current_id not in open_ids or f_score != g_score[current_id] + weight * current_h_score:
+                    heapq.heappop(open_heap)
+                    stale_pops += 1
                     continue
+                if g_score.get(end_id, float('inf')) <= f_score:
+                    break
+                if (max_expansions is not None and expansions >= max_expansions) or \
+                        (deadline is not None and not expansions & 63 and time.perf_counter() >= deadline):
+                    exhausted = True
+                    break
+
+                heapq.heappop(open_heap)
+                open_ids.discard(current_id)
+                closed_set.add(current_id)
+                expansions += 1
+                current_cell = cells[current_id]
+                current_g_score = g_score[current_id]
+                if on_expand is not None:
+                    on_expand(current_cell, current_g_score)
+
+                for neighbor in self.grid.get_neighbors(current_cell):
+                    if neighbor.environment_type.is_obstacle:
+                        continue
+                    neighbor_id = neighbor.y * width + neighbor.x
+                    tentative_g_score = current_g_score + neighbor.environment_type.cost
+                    if tentative_g_score < g_score.get(neighbor_id, float('inf')):
+                        g_score[neighbor_id] = tentative_g_score
+                        came_from[neighbor_id] = current_cell
+                        cells[neighbor_id] = neighbor
+                        neighbor_h_score = h_score.get(neighbor_id)
+                        if neighbor_h_score is None:
+                            neighbor_h_score = h_score[neighbor_id] = self._heuristic(neighbor, end_cell)
+                            if neighbor_h_score < h_score[closest_id]:
+                                closest_id = neighbor_id
+                        if neighbor_id in closed_set:
+                            inconsistent.add(neighbor_id)
+                            continue
+                        open_ids.add(neighbor_id)
+                        heapq.heappush(open_heap, (tentative_g_score + weight * neighbor_h_score, neighbor_h_score,
+                                                   neighbor_id))
+                        pushes += 1
+                        if len(open_heap) > max_open_size:
+                            max_open_size = len(open_heap)
+                        if on_push is not None:
+                            on_push(neighbor, tentative_g_score, tentative_g_score + weight * neighbor_h_score)
 
-                tentative_g_score = current_cell.g_score + neighbor.environment_type.cost
+            if exhausted:
+                if end_id in g_score:
+                    # The goal's current parents may already beat the last answer, without a proof for this weight.
+                    path = self._reconstruct_path(cells[end_id], came_from)
+                    if path[-1].g_score < best_cost:
+                        record(path)
+                        yield best_weight, path
+                elif best_path is None:
+                    path = self._reconstruct_path(cells[closest_id], came_from)
+                    record(path)
+                    yield float('inf'), path
+                return
+            if end_id not in g_score:
+                record(None)
+                return  # No path found
 
-                # If this path to neighbor's cell is better than any previous one
-                if tentative_g_score < neighbor.g_score:
-                    neighbor.parent = current_cell
-                    neighbor.g_score = tentative_g_score
-                    neighbor.f_score = neighbor.g_score + self._heuristic(neighbor, end_cell)
+            # Parents can be cheaper than the goal's g-score says, so a new path is kept only if it is cheaper.
+            path = self._reconstruct_path(cells[end_id], came_from)
+            if path[-1].g_score < best_cost:
+                best_cost, best_path = path[-1].g_score, path
+            best_weight = weight
+            record(best_path)
+            yield weight, best_path
+            if weight <= 1:
+                return
 
-                    heapq.heappush(open_set, (neighbor.f_score, neighbor))
+            # Lower the weight, reopen the inconsistent cells and re-key the open list for the new weight.
+            weight = max(1.0, weight - weight_step)
+            open_ids |= inconsistent
+            inconsistent.clear()
+            closed_set.clear()
+            open_heap = [(g_score[cell_id] + weight * h_score[cell_id], h_score[cell_id], cell_id)
+                         for cell_id in open_ids]
+            heapq.heapify(open_heap)
 
-        return None  # No path found
+    def find_path_anytime(self, start_cell: Cell, end_cell: Cell, initial_weight: float = 2.5,
+                          weight_step: float = 0.5, stats: Optional[SearchStats] = None,
+                          max_expansions: Optional[int] = None,
+                          time_limit: Optional[float] = None) -> Optional[List[Cell]]:
+        """
+        Runs anytime_paths until it finishes or its budget runs out, and returns the last (best) path it
+        produced, or None if there is no path.
+        """
+        path = None
+        for _, path in self.anytime_paths(start_cell, end_cell, initial_weight, weight_step, stats,
+                                          max_expansions, time_limit):
+            pass
+        return path
 
-    @staticmethod
-    def _reconstruct_path(current_cell: Cell) -> List[Cell]:
+    def _reconstruct_path(self, current_cell: Cell, came_from: Dict[int, Cell]) -> List[Cell]:
         """
-        Reconstructs the path from the end_cell back to the start_cell
-        using the parent pointers stored directly in the Cell objects.
+        Reconstructs the path from current_cell back to the start_cell using the per-query
+        parent map. Returns fresh Cell copies, so results never alias the grid's cells.
+        g_score is accumulated along the path, so it is exact even where a search left
+        parents with outdated scores.
         """
         path = []
         while current_cell:
-            path.append(current_cell)
-            current_cell = current_cell.parent
-        return path[::-1]  # Reverse the path to get it from start to end
+            path.append(Cell(current_cell.x, current_cell.y, current_cell.environment_type))
+            current_cell = came_from.get(self._cell_id(current_cell))
+        path.reverse()  # Reverse the path to get it from start to end
+        path[0].g_score = path[0].f_score = 0
+        for previous, step in zip(path, path[1:]):
+            step.g_score = step.f_score = previous.g_score + step.environment_type.cost
+            step.parent = previous
+        return path
@@ -0,0 +1,100 @@
+import os
+from multiprocessing import Pool, shared_memory
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.a_star import AStarPathfinder
+from src.compact_grid import CompactGrid
+from src.environment import Environment
+from src.grid import Cell, Grid
+
+Coords = Tuple[int, int]
+Endpoint = Union[Coords, Cell]
+
+# Per-process state of a batch worker, set once by _init_worker.
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+_worker_pathfinder: Optional[AStarPathfinder] = None
+
+
+def share_grid(compact_grid: CompactGrid) -> shared_memory.SharedMemory:
+    """
+    Copies a grid's terrain and passable mask into a new shared memory block, for attach_shared_grid in other
+    processes. The caller closes and unlinks the block when done.
+    """
+    size = compact_grid.width * compact_grid.height
+    memory = shared_memory.SharedMemory(create=True, size=2 * size)
+    memory.buf[:size] = compact_grid.terrain
+    memory.buf[size:2 * size] = compact_grid.passable
+    return memory
+
+
+def attach_shared_grid(memory_name: str, width: int, height: int,
+                       environments: List[Environment]) -> Tuple[shared_memory.SharedMemory, CompactGrid]:
+    """Maps a block written by share_grid as a CompactGrid, without copying. Keep the memory object alive."""
+    memory = shared_memory.SharedMemory(name=memory_name)
+    size = width * height
+    grid = CompactGrid.from_terrain(width, height, memory.buf[:size], environments, memory.buf[size:2 * size])
+    return memory, grid
+
+
+def _init_worker(memory_name: str, width: int, height: int, environments: List[Environment]) -> None:
+    """Attaches a pool worker to the shared terrain and builds its pathfinder over it, without copying."""
+    global _worker_memory, _worker_pathfinder
+
+    _worker_memory, grid = attach_shared_grid(memory_name, width, height, environments)
+    _worker_pathfinder = AStarPathfinder(grid)
+
+
+def _find_path_task(task: Tuple[int, Coords, Coords]) -> Tuple[int, Optional[List[Cell]]]:
+    index, start, end = task
+    return index, _find_path(_worker_pathfinder, start, end)
+
+
+def _find_path(pathfinder: AStarPathfinder, start: Coords, end: Coords) -> Optional[List[Cell]]:
+    start_cell = pathfinder.grid.get_cell(*start)
+    end_cell = pathfinder.grid.get_cell(*end)
+    if not start_cell or not end_cell:
+        return None
+    return pathfinder.find_path(start_cell, end_cell)
+
+
+def _as_coords(endpoint: Endpoint) -> Coords:
+    return endpoint.coords if isinstance(endpoint, Cell) else (endpoint[0], endpoint[1])
+
+
+def find_paths(grid: Grid, pairs: Iterable[Tuple[Endpoint, Endpoint]], workers: Optional[int] = None,
+               ordered: bool = True, chunksize: int = 8) -> Iterator[Tuple[int, Optional[List[Cell]]]]:
+    """
+    Runs many start/goal queries against one map on a process pool.
+    The terrain is copied into shared memory once and every worker maps it directly,
+    so the grid is never pickled per task.
+    Args:
+        grid: Any grid backend; it is converted to a CompactGrid if needed.
+        pairs: (start, end) pairs, each endpoint an (x, y) tuple or a Cell.
+        workers: Number of worker processes (defaults to the CPU count). 1 runs in-process.
+        ordered: Yield results in input order if True, otherwise as they complete.
+        chunksize: Number of queries handed to a worker at a time.
+    Yields:
+        (index, path) tuples, where index is the position of the pair in the input and
+        path is the find_path result (a list of Cells, or None if no path is found).
+    """
+    tasks = [(index, _as_coords(start), _as_coords(end)) for index, (start, end) in enumerate(pairs)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    compact_grid = CompactGrid.from_grid(grid)
+
+    if workers <= 1 or len(tasks) <= 1:
+        pathfinder = AStarPathfinder(compact_grid)
+        for index, start, end in tasks:
+            yield index, _find_path(pathfinder, start, end)
+        return
+
+    memory = share_grid(compact_grid)
+    try:
+        init_args = (memory.name, compact_grid.width, compact_grid.height, compact_grid.environments)
+        with Pool(processes=workers, initializer=_init_worker, initargs=init_args) as pool:
+            imap = pool.imap if ordered else pool.imap_unordered
+            yield from imap(_find_path_task, tasks, chunksize=chunksize)
+    finally:
+        memory.close()
+        memory.unlink()
@@ -0,0 +1,210 @@
+import argparse
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from src.a_star import AStarPathfinder
+from src.compact_grid import CompactGrid
+from src.environment import GROUND_SYMBOL, MUD_SYMBOL, ROCK_SYMBOL, TREE_SYMBOL, WATER_SYMBOL
+from src.hpa_star import HierarchicalPathfinder
+from src.landmarks import LandmarkTable
+from src.map_format import load_binary_map
+from src.map_generator import generate_map
+from src.open_list import HeapOpenList
+from src.search_stats import SearchStats
+from src.workload import Query, latency_summary_ms, query_pairs
+
+# Default suite: square maps of increasing size, each at a light and a heavy obstacle density.
+DEFAULT_SIZES = [64, 256, 512]
+DEFAULT_DENSITIES = [0.1, 0.3]
+DEFAULT_QUERIES = 50
+DEFAULT_SEED = 1
+
+# Engine name -> factory building a pathfinder (anything with find_path(start_cell, end_cell)) for a grid.
+ENGINES: Dict[str, Callable[[CompactGrid], object]] = {
+    "astar": AStarPathfinder,
+    "astar-heap": lambda grid: AStarPathfinder(grid, open_list_factory=HeapOpenList),
+    "alt": lambda grid: AStarPathfinder(grid, landmarks=LandmarkTable.build(grid)),
+    "hpa": HierarchicalPathfinder,
+}
+
+
+def terrain_probabilities(obstacle_density: float) -> Dict[str, float]:
+    """Terrain mix with the given share of obstacles; passable terrain keeps the generator's 5:2:2 mix."""
+    passable = 1.0 - obstacle_density
+    return {GROUND_SYMBOL: passable * 5 / 9, MUD_SYMBOL: passable * 2 / 9, WATER_SYMBOL: passable * 2 / 9,
+            ROCK_SYMBOL: obstacle_density / 2, TREE_SYMBOL: obstacle_density / 2}
+
+
+def suite_map(map_dir: str, size: int, obstacle_density: float, seed: int) -> str:
+    """Returns the path of the binary benchmark map for these parameters, generating it on first use."""
+    filepath = os.path.join(map_dir, f"bench_{size}x{size}_d{obstacle_density:g}_s{seed}.pfm")
+    if not os.path.exists(filepath):
+        generate_map(filepath, size, size, terrain_probabilities(obstacle_density), seed=seed, binary=True)
+    return filepath
+
+
+def run_engine(grid: CompactGrid, factory: Callable[[CompactGrid], object], pairs: List[Query]) -> Dict[str, object]:
+    """
+    Times one engine over a query set, then replays the queries once more, untimed, to count expanded nodes
+    and the peak memory allocated while searching. Nodes are counted with SearchStats, so engines whose
+    find_path takes no stats report None.
+    """
+    started = time.perf_counter()
+    pathfinder = factory(grid)
+    setup_seconds = time.perf_counter() - started
+
+    queries = [(grid.get_cell(*start), grid.get_cell(*end)) for start, end in pairs]
+    latencies = []
+    found = 0
+    total_cost = 0.0
+    for start_cell, end_cell in queries:
+        started = time.perf_counter()
+        path = pathfinder.find_path(start_cell, end_cell)
+        latencies.append(time.perf_counter() - started)
+        if path:
+            found += 1
+            total_cost += path[-1].g_score
+
+    counts_nodes = "stats" in inspect.signature(pathfinder.find_path).parameters
+    expanded = 0
+    tracemalloc.start()
+    try:
+        for start_cell, end_cell in queries:
+            if counts_nodes:
+                stats = SearchStats()
+                pathfinder.find_path(start_cell, end_cell, stats=stats)
+                expanded += stats.nodes_expanded
+            else:
+                pathfinder.find_path(start_cell, end_cell)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    if hasattr(pathfinder, "close"):
+        pathfinder.close()
+    return {
+        "setup_seconds": setup_seconds,
+        "queries": len(queries),
+        "found": found,
+        "total_path_cost": total_cost,
+        "latency_ms": latency_summary_ms(latencies),
+        "nodes_expanded": ({"total": expanded, "mean": expanded / len(queries) if queries else 0.0}
+                           if counts_nodes else None),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_suite(sizes: List[int] = DEFAULT_SIZES, densities: List[float] = DEFAULT_DENSITIES,
+              engines: Optional[List[str]] = None, queries: int = DEFAULT_QUERIES, seed: int = DEFAULT_SEED,
+              map_dir: Optional[str] = None) -> Dict[str, object]:
+    """
+    Runs every engine over seeded queries on every (size, obstacle density) map and returns the results
+    as a JSON-serializable dict. Maps are generated from the seed on first use and reused afterwards.
+    """
+    map_dir = map_dir or os.path.join(tempfile.gettempdir(), "pathfinding-benchmark")
+    engines = engines or list(ENGINES)
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        raise ValueError(f"Unknown engine(s) {', '.join(unknown)}; choose from {', '.join(ENGINES)}.")
+
+    results = []
+    for size in sizes:
+        for density in densities:
+            map_filepath = suite_map(map_dir, size, density, seed)
+            started = time.perf_counter()
+            grid = load_binary_map(map_filepath)
+            load_seconds = time.perf_counter() - started
+            pairs = query_pairs(grid, queries, seed)
+
+            for name in engines:
+                print(f"  {size}x{size} density {density:g}: {name}...", file=sys.stderr)
+                result = {"map": os.path.basename(map_filepath), "size": size, "obstacle_density": density,
+                          "load_seconds": load_seconds, "engine": name}
+                result.update(run_engine(grid, ENGINES[name], pairs))
+                results.append(result)
+
+    return {
+        "meta": {"commit": _git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "seed": seed, "queries": queries,
+                 "max_rss_bytes": _max_rss_bytes()},
+        "results": results,
+    }
+
+
+def _mean_nodes(result: Dict[str, object]) -> str:
+    nodes = result["nodes_expanded"]
+    return f"{nodes['mean']:.0f}" if nodes else "-"
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object]) -> List[str]:
+    """Lines comparing median latency and expanded nodes per (map, engine) against a baseline run."""
+    previous = {(r["map"], r["engine"]): r for r in baseline["results"]}
+    lines = []
+    for result in current["results"]:
+        before = previous.get((result["map"], result["engine"]))
+        if before is None or not before["latency_ms"]["p50"]:
+            continue
+        ratio = result["latency_ms"]["p50"] / before["latency_ms"]["p50"]
+        lines.append(f"{result['map']:<32} {result['engine']:<12} p50 {before['latency_ms']['p50']:9.3f} -> "
+                     f"{result['latency_ms']['p50']:9.3f} ms ({ratio:5.2f}x), nodes "
+                     f"{_mean_nodes(before)} -> {_mean_nodes(result)}")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, object]:
+    parser = argparse.ArgumentParser(description="Benchmark the pathfinding engines on seeded maps and queries.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Map side lengths.")
+    parser.add_argument("--densities", type=float, nargs="+", default=DEFAULT_DENSITIES,
+                        help="Obstacle densities (0-1).")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="Queries per map.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Seed for maps and queries.")
+    parser.add_argument("--map-dir", default=None, help="Where benchmark maps are generated and cached.")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file to write the results to.")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against.")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.sizes, args.densities, args.engines, args.queries, args.seed, args.map_dir)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for result in report["results"]:
+        print(f"{result['map']:<32} {result['engine']:<12} p50 {result['latency_ms']['p50']:9.3f} ms  "
+              f"p99 {result['latency_ms']['p99']:9.3f} ms  nodes {_mean_nodes(result):>9}  "
+              f"peak {result['peak_memory_bytes'] / 1024:9.0f} KiB")
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print("\nCompared with " + args.compare + ":")
+        print("\n".join(compare(baseline, report)))
+    print(f"Results saved to '{args.output}'")
+    return report
+
+
+if __name__ == "__main__":
+    main()
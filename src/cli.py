@@ -0,0 +1,256 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.a_star import AStarPathfinder
+from src.environment import GROUND_SYMBOL, MUD_SYMBOL, ROCK_SYMBOL, TREE_SYMBOL, WATER_SYMBOL
+from src.grid import Cell, Grid
+from src.map_format import convert_text_map, load_map
+from src.search_stats import SearchStats
+
+# Rendering (PIL), landmarks, map generation and benchmarking are imported by the commands that need them,
+# so a query only pays for the modules its search uses.
+
+DEFAULT_MAP = os.path.join("maps", "map.txt")
+
+IMAGE_MAPPING = {
+    GROUND_SYMBOL: 'ground10x10.png',
+    MUD_SYMBOL: 'mud10x10.png',
+    WATER_SYMBOL: 'water10x10.png',
+    ROCK_SYMBOL: 'rock10x10.png',
+    TREE_SYMBOL: 'tree10x10.png'
+}
+
+
+class CommandError(Exception):
+    """A command could not run (missing map, endpoint out of bounds, ...); reported without a traceback."""
+
+
+def _load(filepath: str) -> Grid:
+    try:
+        return load_map(filepath)
+    except (FileNotFoundError, ValueError) as error:
+        raise CommandError(f"Error loading map: {error}") from error
+
+
+def _endpoint(grid: Grid, coords: List[int], label: str, snap: bool, other: Optional[Cell] = None) -> Cell:
+    """The cell at coords, moved to the nearest passable cell if it is an obstacle and snapping is on."""
+    x, y = coords
+    cell = grid.get_cell(x, y)
+    if cell is None:
+        raise CommandError(f"{label} coordinates ({x},{y}) are out of map bounds.")
+    if cell.environment_type.is_obstacle and snap:
+        snapped = grid.snap_to_passable(x, y, prefer_component_of=other)
+        if snapped is None:
+            raise CommandError(f"The map has no non-obstacle cell to use as the {label.lower()}.")
+        cell = grid.get_cell(*snapped)
+    return cell
+
+
+def _find_path(grid: Grid, args: argparse.Namespace,
+               stats: Optional[SearchStats] = None) -> Tuple[Cell, Cell, Optional[List[Cell]]]:
+    start = _endpoint(grid, args.start or [0, 0], "Start", args.snap)
+    end = _endpoint(grid, args.end or [grid.width - 1, grid.height - 1], "End", args.snap, other=start)
+    landmarks = None
+    if args.landmarks:
+        from src.landmarks import LandmarkTable
+
+        landmarks = LandmarkTable.load_or_build(args.map, grid)
+    pathfinder = AStarPathfinder(grid, landmarks=landmarks)
+    try:
+        path = pathfinder.find_path(start, end, stats=stats, weight=args.weight, bidirectional=args.bidirectional)
+    except ValueError as error:
+        raise CommandError(str(error)) from error
+    return start, end, path
+
+
+def _render(grid: Grid, output: str, path: Optional[List[Cell]], cell_size: int, tiles: bool) -> List[str]:
+    from src import visualize_grid_map
+
+    # The renderers report what they wrote on stdout; keep stdout for the command's own result.
+    with contextlib.redirect_stdout(sys.stderr):
+        if tiles:
+            return visualize_grid_map.generate_grid_image_tiles(grid, IMAGE_MAPPING, output, path=path,
+                                                                cell_size=cell_size)
+        visualize_grid_map.generate_grid_image_with_images(grid, IMAGE_MAPPING, path=path, output_filename=output,
+                                                           cell_size=cell_size)
+        return [output]
+
+
+def query_command(args: argparse.Namespace) -> Dict[str, object]:
+    grid = _load(args.map)
+    stats = SearchStats() if args.stats else None
+    started = time.perf_counter()
+    start, end, path = _find_path(grid, args, stats)
+    result = {
+        "start": list(start.coords),
+        "end": list(end.coords),
+        "cost": path[-1].g_score if path else None,
+        "path": [list(cell.coords) for cell in path] if path else None,
+    }
+    if stats is not None:
+        result["nodes_expanded"] = stats.nodes_expanded
+        result["time_ms"] = 1000 * (time.perf_counter() - started)
+    if path and args.output_text:
+        os.makedirs(os.path.dirname(args.output_text) or ".", exist_ok=True)
+        with open(args.output_text, 'w', encoding='utf-8') as f:
+            grid.write_rows(f, path)
+    if args.image:
+        grid.start_node, grid.end_node = start, end
+        _render(grid, args.image, path, args.cell_size, tiles=False)
+    return result
+
+
+def render_command(args: argparse.Namespace) -> Dict[str, object]:
+    grid = _load(args.map)
+    path = None
+    if args.start or args.end:
+        start, end, path = _find_path(grid, args)
+        grid.start_node, grid.end_node = start, end
+    written = _render(grid, args.output, path, args.cell_size, args.tiles)
+    return {"files": written, "path_cells": len(path) if path else 0}
+
+
+def generate_command(args: argparse.Namespace) -> Dict[str, object]:
+    from src.map_generator import generate_map, parse_probabilities
+
+    options = {}
+    if args.generator == "clustered":
+        options = {"cluster_size": args.cluster_size, "noise": args.noise}
+    elif args.generator == "corridors":
+        options = {"spacing": args.spacing, "corridor_width": args.corridor_width}
+    binary = args.format == "binary" or (args.format is None and args.output.endswith(".pfm"))
+    try:
+        generate_map(args.output, args.width, args.height, parse_probabilities(args.terrain), args.generator,
+                     seed=args.seed, binary=binary, **options)
+    except ValueError as error:
+        raise CommandError(str(error)) from error
+    return {"map": args.output, "width": args.width, "height": args.height}
+
+
+def convert_command(args: argparse.Namespace) -> Dict[str, object]:
+    try:
+        convert_text_map(args.text_map, args.binary_map)
+    except (FileNotFoundError, ValueError) as error:
+        raise CommandError(str(error)) from error
+    return {"map": args.binary_map}
+
+
+def bench_command(args: argparse.Namespace) -> Dict[str, object]:
+    from src import benchmark
+
+    if args.json:
+        with contextlib.redirect_stdout(sys.stderr):
+            return benchmark.main(args.benchmark_args)
+    return benchmark.main(args.benchmark_args)
+
+
+def _print_text(args: argparse.Namespace, result: Dict[str, object]) -> None:
+    if args.command == "query":
+        start, end = tuple(result["start"]), tuple(result["end"])
+        if result["path"] is None:
+            print(f"No path found from {start} to {end}.")
+        else:
+            print(f"Path from {start} to {end}: cost {result['cost']:.2f}, {len(result['path'])} cells")
+            if args.stats:
+                print(f"{result['nodes_expanded']} nodes expanded in {result['time_ms']:.1f} ms")
+            if args.print_path:
+                print(" ".join(f"({x},{y})" for x, y in result["path"]))
+    elif args.command == "render":
+        print("\n".join(f"Rendered '{filename}'" for filename in result["files"]))
+    elif args.command in ("generate", "convert"):
+        print(f"Map saved to '{result['map']}'")
+
+
+def _add_query_arguments(parser: argparse.ArgumentParser, endpoints_required: bool) -> None:
+    parser.add_argument("--map", default=DEFAULT_MAP, help="Text or binary (.pfm) map file.")
+    parser.add_argument("--start", type=int, nargs=2, metavar=("X", "Y"), default=None,
+                        help="Start cell" + (" (default: 0 0)." if endpoints_required else "."))
+    parser.add_argument("--end", type=int, nargs=2, metavar=("X", "Y"), default=None,
+                        help="End cell" + (" (default: the bottom-right corner)." if endpoints_required else "."))
+    parser.add_argument("--no-snap", dest="snap", action="store_false",
+                        help="Do not move endpoints on obstacles to the nearest passable cell.")
+    parser.add_argument("--weight", type=float, default=1.0, help="Weighted A* factor (1 is optimal).")
+    parser.add_argument("--bidirectional", action="store_true", help="Search from both ends.")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="Use the landmark heuristic (tables stored next to the map, built on first use).")
+    parser.add_argument("--cell-size", type=int, default=10, help="Pixels per cell in rendered images.")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Generate maps, find paths and render them.")
+    parser.add_argument("--json", action="store_true", help="Print only the result, as JSON.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="Find a path and print it.")
+    _add_query_arguments(query, endpoints_required=True)
+    query.add_argument("--stats", action="store_true", help="Also report nodes expanded and search time.")
+    query.add_argument("--print-path", action="store_true", help="List the path cells (text output).")
+    query.add_argument("--output-text", default=None, help="Write the map with the path drawn on it to this file.")
+    query.add_argument("--image", default=None, help="Render the map with the path to this PNG file.")
+    query.set_defaults(handler=query_command)
+
+    render = commands.add_parser("render", help="Render a map, with a path if --start or --end is given.")
+    _add_query_arguments(render, endpoints_required=False)
+    render.add_argument("--output", default="grid_map.png", help="PNG file (or directory with --tiles).")
+    render.add_argument("--tiles", action="store_true", help="Write the map as a directory of tile images.")
+    render.set_defaults(handler=render_command)
+
+    generate = commands.add_parser("generate", help="Generate a map file.")
+    generate.add_argument("--width", type=int, default=100)
+    generate.add_argument("--height", type=int, default=100)
+    generate.add_argument("--seed", type=int, default=None)
+    generate.add_argument("--generator", default="random", help="Map layout: random, clustered, maze or corridors.")
+    generate.add_argument("--terrain", nargs="*", default=[], metavar="NAME=PROBABILITY",
+                          help="Terrain probabilities, e.g. --terrain ground=0.6 water=0.1 rock=0.1.")
+    generate.add_argument("--output", default=DEFAULT_MAP, help="Map file to write.")
+    generate.add_argument("--format", choices=["text", "binary"], default=None,
+                          help="Output format (default: binary for .pfm files, text otherwise).")
+    generate.add_argument("--cluster-size", type=int, default=16)
+    generate.add_argument("--noise", type=float, default=0.1)
+    generate.add_argument("--spacing", type=int, default=32)
+    generate.add_argument("--corridor-width", type=int, default=2)
+    generate.set_defaults(handler=generate_command)
+
+    convert = commands.add_parser("convert", help="Convert a text map to the binary map format.")
+    convert.add_argument("text_map")
+    convert.add_argument("binary_map")
+    convert.set_defaults(handler=convert_command)
+
+    # Everything after "bench" is passed on to src.benchmark (see main).
+    bench = commands.add_parser("bench", help="Run the benchmark suite; arguments go to src.benchmark.",
+                                add_help=False)
+    bench.set_defaults(handler=bench_command)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs one command. Returns 0 on success, 1 if a query found no path and 2 on errors."""
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == "bench":
+        args.benchmark_args = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    try:
+        result = args.handler(args)
+    except CommandError as error:
+        if args.json:
+            print(json.dumps({"error": str(error)}))
+        else:
+            print(error, file=sys.stderr)
+        return 2
+
+    if args.json:
+        print(json.dumps(result, separators=(',', ':')))
+    else:
+        _print_text(args, result)
+    return 1 if args.command == "query" and result["path"] is None else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import os
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from src.environment import Environment
+from src.grid import Cell, Grid
+
+# Terrain is stored as one byte per cell, so at most 256 environment types fit in the table.
+MAX_ENVIRONMENTS = 256
+
+
+def _row_encoder(symbol_to_environment: Dict[str, Environment]) -> Callable[[str], Optional[bytes]]:
+    """
+    Returns a function turning a row of symbols into environment-index bytes (the index being the symbol's
+    position in symbol_to_environment), or None if the row holds an unknown symbol.
+    """
+    symbols = list(symbol_to_environment.keys())
+    if all(len(symbol) == 1 and ord(symbol) < 256 for symbol in symbols):
+        # Single-byte symbols (the '§' water symbol included) can be translated at the bytes level.
+        to_index = bytearray(range(256))
+        for index, symbol in enumerate(symbols):
+            to_index[ord(symbol)] = index
+        known_symbols = bytes(ord(symbol) for symbol in symbols)
+
+        def encode_row(row: str) -> Optional[bytes]:
+            try:
+                raw = row.encode('latin-1')
+            except UnicodeEncodeError:
+                return None
+            return raw.translate(to_index) if not raw.translate(None, known_symbols) else None
+    else:
+        to_char = {ord(symbol): chr(index) for index, symbol in enumerate(symbols)}
+        known_chars = {ord(symbol): None for symbol in symbols}
+
+        def encode_row(row: str) -> Optional[bytes]:
+            return row.translate(to_char).encode('latin-1') if not row.translate(known_chars) else None
+
+    return encode_row
+
+
+def encode_map_rows(map_data: Iterable[Sequence[str]],
+                    symbol_to_environment: Dict[str, Environment]) -> Iterator[bytes]:
+    """
+    Streams map rows (strings or lists of symbols) as environment-index bytes, one row at a time.
+    Raises ValueError on ragged rows or unknown symbols.
+    """
+    if len(symbol_to_environment) > MAX_ENVIRONMENTS:
+        raise ValueError(f"At most {MAX_ENVIRONMENTS} environment types are supported.")
+
+    encode_row = _row_encoder(symbol_to_environment)
+    width = None
+    for r, row in enumerate(map_data):
+        row = "".join(row)
+        if width is None:
+            width = len(row)
+        elif len(row) != width:
+            raise ValueError(f"Row {r} has {len(row)} cells, expected {width}.")
+        encoded = encode_row(row)
+        if encoded is None:
+            c = next(i for i, symbol in enumerate(row) if symbol not in symbol_to_environment)
+            raise ValueError(f"Unknown environment symbol '{row[c]}' at ({r},{c}). "
+                             f"Check map file and SYMBOL_TO_ENVIRONMENT mapping.")
+        yield encoded
+
+
+class CompactGrid(Grid):
+    """
+    Grid backend that stores terrain as a flat bytearray (one environment index per cell)
+    instead of one Cell object per tile. Cell objects are created on demand by get_cell,
+    so AStarPathfinder, find_nearest_non_obstacle_cell and the renderers run on it unchanged.
+    The terrain may also be any indexable buffer, such as shared memory or a memory-mapped file.
+    """
+
+    def __init__(self, map_data: Iterable[Sequence[str]], symbol_to_environment: Dict[str, Environment]):
+        width = 0
+        height = 0
+        terrain = bytearray()
+        for encoded in encode_map_rows(map_data, symbol_to_environment):
+            width = len(encoded)
+            terrain += encoded
+            height += 1
+
+        if not height or not width:
+            raise ValueError("Map data cannot be empty.")
+
+        self._init_terrain(width, height, terrain,
+                           list(symbol_to_environment.values()), symbol_to_environment)
+
+    @classmethod
+    def from_terrain(cls, width: int, height: int, terrain: bytearray, environments: List[Environment],
+                     passable: Optional[bytearray] = None) -> 'CompactGrid':
+        """
+        Builds a grid directly from a terrain buffer of environment indices (row-major),
+        skipping symbol parsing. The buffers are used as-is, not copied, so they may live in
+        shared memory; the passable mask is derived from the terrain when not given.
+        """
+        if width <= 0 or height <= 0:
+            raise ValueError("Map data cannot be empty.")
+        if len(terrain) != width * height:
+            raise ValueError(f"Terrain buffer has {len(terrain)} cells, expected {width * height}.")
+        if len(environments) > MAX_ENVIRONMENTS:
+            raise ValueError(f"At most {MAX_ENVIRONMENTS} environment types are supported.")
+        if passable is not None and len(passable) != width * height:
+            raise ValueError(f"Passable buffer has {len(passable)} cells, expected {width * height}.")
+
+        grid = cls.__new__(cls)
+        grid._init_terrain(width, height, terrain, environments,
+                           {env.symbol: env for env in environments}, passable)
+        return grid
+
+    @classmethod
+    def from_grid(cls, grid: Grid) -> 'CompactGrid':
+        """Converts any grid backend into a CompactGrid, reusing it when it already is one."""
+        if isinstance(grid, CompactGrid):
+            return grid
+
+        environments = list(dict.fromkeys(grid.symbol_to_environment.values()))
+        env_index = {env: index for index, env in enumerate(environments)}
+        terrain = bytearray(grid.width * grid.height)
+        for y in range(grid.height):
+            offset = y * grid.width
+            for x in range(grid.width):
+                env = grid.get_cell(x, y).environment_type
+                if env not in env_index:
+                    env_index[env] = len(environments)
+                    environments.append(env)
+                terrain[offset + x] = env_index[env]
+        return cls.from_terrain(grid.width, grid.height, terrain, environments)
+
+    @classmethod
+    def from_file(cls, filepath: str, symbol_to_environment: Dict[str, Environment]) -> 'CompactGrid':
+        """Loads a text map file straight into a CompactGrid, without a list-of-characters copy."""
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"Map file not found at '{filepath}'")
+
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return cls((line.strip() for line in f if line.strip()), symbol_to_environment)
+
+    def _init_terrain(self, width: int, height: int, terrain: bytearray, environments: List[Environment],
+                      symbol_to_environment: Dict[str, Environment],
+                      passable: Optional[bytearray] = None) -> None:
+        self.width = width
+        self.height = height
+        self.symbol_to_environment = dict(symbol_to_environment)
+        self.environments = list(environments)
+        self.terrain = terrain
+        self._passable = passable
+        self._update_tables()
+        self._init_indexes()
+
+        self.start_node: Optional[Cell] = self.get_cell(0, 0)
+        self.end_node: Optional[Cell] = self.get_cell(self.width - 1, self.height - 1)
+
+    def _update_tables(self) -> None:
+        """Rebuilds the per-environment-index lookup tables from the environment list."""
+        self.env_costs = [env.cost for env in self.environments]
+        self.passable_table = bytes(0 if index >= len(self.environments) or self.environments[index].is_obstacle
+                                    else 1 for index in range(MAX_ENVIRONMENTS))
+        # Environment index -> symbol byte, for rendering whole rows with one bytes.translate call.
+        # None when some symbol is not a single Latin-1 character.
+        symbols = [env.symbol for env in self.environments]
+        if all(len(symbol) == 1 and ord(symbol) < 256 for symbol in symbols):
+            self.symbol_table: Optional[bytes] = bytes(symbols[index].encode('latin-1')[0] if index < len(symbols)
+                                                       else ord('?') for index in range(MAX_ENVIRONMENTS))
+        else:
+            self.symbol_table = None
+
+    @property
+    def passable(self) -> bytearray:
+        """
+        Per-cell obstacle mask (1 = passable), derived from the terrain in one C-level pass on first use.
+        Searches do not need it (they look cells up through passable_table), so a memory-mapped terrain
+        is only paged in where it is actually read.
+        """
+        if self._passable is None:
+            terrain = self.terrain if isinstance(self.terrain, (bytes, bytearray)) else bytes(self.terrain)
+            self._passable = bytearray(terrain.translate(self.passable_table))
+        return self._passable
+
+    def _row_symbols(self, y: int, min_x: int, max_x: int) -> str:
+        """Renders a row slice straight from the terrain bytes."""
+        offset = y * self.width
+        row = bytes(self.terrain[offset + min_x:offset + max_x])
+        if self.symbol_table is not None:
+            return row.translate(self.symbol_table).decode('latin-1')
+        return "".join([self.environments[index].symbol for index in row])
+
+    def _store_environment(self, x: int, y: int, environment: Environment) -> None:
+        if environment in self.environments:
+            index = self.environments.index(environment)
+        elif len(self.environments) < MAX_ENVIRONMENTS:
+            index = len(self.environments)
+            self.environments.append(environment)
+            self._update_tables()
+        else:
+            raise ValueError(f"At most {MAX_ENVIRONMENTS} environment types are supported.")
+
+        cell_id = y * self.width + x
+        self.terrain[cell_id] = index
+        if self._passable is not None:
+            self._passable[cell_id] = 0 if environment.is_obstacle else 1
+
+    def cost_array(self) -> array:
+        """Returns the cached per-cell cost array, expanded from the terrain through the environment table."""
+        if self._cost_array is None:
+            costs = [float('inf') if env.is_obstacle else env.cost for env in self.environments]
+            self._cost_array = array('d', map(costs.__getitem__, self.terrain))
+        return self._cost_array
+
+    def passable_mask(self) -> bytearray:
+        """Returns the grid's own passable mask (shared, not copied)."""
+        return self.passable
+
+    def get_cell(self, x: int, y: int) -> Optional[Cell]:
+        """Returns a new Cell view for the given (x, y) coordinates, or None if out of bounds."""
+        if 0 <= y < self.height and 0 <= x < self.width:
+            return Cell(x, y, self.environments[self.terrain[y * self.width + x]])
+        return None
+
+    def get_neighbors(self, cell: Cell) -> List[Cell]:
+        """Returns a list of valid, non-obstacle neighbors, checked through the passable table."""
+        neighbors = []
+        width = self.width
+        passable_table = self.passable_table
+        environments = self.environments
+        terrain = self.terrain
+
+        for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            new_x, new_y = cell.x + dx, cell.y + dy
+            if 0 <= new_y < self.height and 0 <= new_x < width:
+                environment_index = terrain[new_y * width + new_x]
+                if passable_table[environment_index]:
+                    neighbors.append(Cell(new_x, new_y, environments[environment_index]))
+        return neighbors
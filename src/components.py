@@ -0,0 +1,164 @@
+import collections
+from array import array
+from typing import Dict, List
+
+
+class ComponentIndex:
+    """
+    Connected-component labeling of the passable cells of a grid (4-connected).
+    Cells are addressed by row-major id (y * width + x). Each passable cell holds a label and labels
+    are merged with a union-find forest, so same() is effectively O(1) and cells turning passable only
+    cost a few unions. Cells turning into obstacles relabel just the piece that was split off.
+    """
+
+    def __init__(self, width: int, height: int, passable: bytearray):
+        self.width = width
+        self.height = height
+        self.passable = passable
+        self.labels = array('I', bytes(4 * width * height))  # 0 marks an obstacle
+        self._parent = array('I', [0])
+        self._build()
+
+    def _new_label(self) -> int:
+        label = len(self._parent)
+        self._parent.append(label)
+        return label
+
+    def _find(self, label: int) -> int:
+        parent = self._parent
+        root = label
+        while parent[root] != root:
+            root = parent[root]
+        while parent[label] != root:
+            parent[label], label = root, parent[label]
+        return root
+
+    def _union(self, label_a: int, label_b: int) -> int:
+        root_a, root_b = self._find(label_a), self._find(label_b)
+        if root_a != root_b:
+            # Keep the smaller root so labels stay stable for the older, usually larger, region.
+            root_a, root_b = min(root_a, root_b), max(root_a, root_b)
+            self._parent[root_b] = root_a
+        return root_a
+
+    def _build(self) -> None:
+        """Labels the grid one row at a time, treating each horizontal run of passable cells as a unit."""
+        width = self.width
+        labels = self.labels
+        previous_runs: List[tuple] = []
+
+        for y in range(self.height):
+            offset = y * width
+            row = bytes(self.passable[offset:offset + width])  # any buffer, e.g. a shared memoryview
+            runs = []
+            j = 0
+            start = row.find(1)
+            while start != -1:
+                end = row.find(0, start)
+                if end == -1:
+                    end = width
+                label = self._new_label()
+
+                # Merge with every run of the previous row that overlaps [start, end).
+                while j < len(previous_runs) and previous_runs[j][1] <= start:
+                    j += 1
+                k = j
+                while k < len(previous_runs) and previous_runs[k][0] < end:
+                    self._union(label, previous_runs[k][2])
+                    k += 1
+
+                labels[offset + start:offset + end] = array('I', [label]) * (end - start)
+                runs.append((start, end, label))
+                start = row.find(1, end)
+            previous_runs = runs
+
+    def _neighbor_ids(self, cell_id: int) -> List[int]:
+        x, y = cell_id % self.width, cell_id // self.width
+        neighbors = []
+        if x > 0:
+            neighbors.append(cell_id - 1)
+        if x < self.width - 1:
+            neighbors.append(cell_id + 1)
+        if y > 0:
+            neighbors.append(cell_id - self.width)
+        if y < self.height - 1:
+            neighbors.append(cell_id + self.width)
+        return [n for n in neighbors if self.passable[n]]
+
+    def component(self, cell_id: int) -> int:
+        """Returns the component id of a cell, or 0 if it is an obstacle."""
+        label = self.labels[cell_id]
+        return self._find(label) if label else 0
+
+    def same(self, cell_id_a: int, cell_id_b: int) -> bool:
+        """True if both cells are passable and connected to each other."""
+        component_a = self.component(cell_id_a)
+        return component_a != 0 and component_a == self.component(cell_id_b)
+
+    def update_cell(self, cell_id: int, passable: bool) -> None:
+        """Updates the labeling after one cell changed passability."""
+        was_passable = self.labels[cell_id] != 0
+        self.passable[cell_id] = 1 if passable else 0
+        if passable == was_passable:
+            return
+
+        if passable:
+            label = self._new_label()
+            for neighbor_id in self._neighbor_ids(cell_id):
+                label = self._union(label, self.labels[neighbor_id])
+            self.labels[cell_id] = label
+            return
+
+        self.labels[cell_id] = 0
+        neighbors = self._neighbor_ids(cell_id)
+        if len(neighbors) > 1:
+            self._split(neighbors)
+
+    def _split(self, seeds: List[int]) -> None:
+        """
+        Grows one BFS per seed in lockstep. Searches that meet are merged; a search that runs out of
+        cells before meeting the others has found a detached piece, which gets a fresh label.
+        Stops as soon as a single search remains, so the cost is bounded by the smaller pieces.
+        """
+        owner: Dict[int, int] = {seed: search for search, seed in enumerate(seeds)}
+        group = list(range(len(seeds)))
+        queues = {search: collections.deque([seed]) for search, seed in enumerate(seeds)}
+        members = {search: [seed] for search, seed in enumerate(seeds)}
+
+        while len(queues) > 1:
+            for search in list(queues):
+                if search not in queues:
+                    continue  # folded into another search earlier in this round
+                if not queues[search]:
+                    label = self._new_label()
+                    for cell_id in members.pop(search):
+                        self.labels[cell_id] = label
+                    del queues[search]
+                    if len(queues) <= 1:
+                        break
+                    continue
+
+                cell_id = queues[search].popleft()
+                current = search
+                for neighbor_id in self._neighbor_ids(cell_id):
+                    other = owner.get(neighbor_id)
+                    if other is None:
+                        owner[neighbor_id] = current
+                        queues[current].append(neighbor_id)
+                        members[current].append(neighbor_id)
+                        continue
+                    other = self._group_root(group, other)
+                    if other != current:
+                        # The two searches met: fold the smaller one into the larger one.
+                        keep, drop = (current, other) if len(members[current]) >= len(members[other]) \
+                            else (other, current)
+                        group[drop] = keep
+                        queues[keep].extend(queues.pop(drop))
+                        members[keep].extend(members.pop(drop))
+                        current = keep
+
+    @staticmethod
+    def _group_root(group: List[int], search: int) -> int:
+        while group[search] != search:
+            search = group[search]
+        return search
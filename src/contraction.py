@@ -0,0 +1,356 @@
+import argparse
+import heapq
+import json
+import os
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from src.a_star import AStarPathfinder
+from src.environment import Environment
+from src.grid import Cell, Grid
+from src.map_format import load_binary_map
+
+INFINITY = float('inf')
+NO_MIDDLE = -1
+
+
+def hierarchy_path_for(map_filepath: str) -> str:
+    """Where the contraction hierarchy of a map file is stored: next to it, with a .ch extension."""
+    return os.path.splitext(map_filepath)[0] + ".ch"
+
+
+def _grid_checksum(grid: Grid) -> int:
+    return zlib.crc32(grid.cost_array().tobytes())
+
+
+def _witness_distances(adjacency: List[Optional[Dict[int, float]]], source: int, excluded: int,
+                       targets: Dict[int, float], limit: float) -> Dict[int, float]:
+    """
+    Dijkstra from source over the not yet contracted cells, skipping excluded, that stops once every target is
+    settled or the distance exceeds limit. Returns the settled distances.
+    Bounding by distance alone rather than by a settle count keeps witnesses that a capped search would miss,
+    and every missed witness is an extra shortcut that makes later contractions (and queries) slower.
+    """
+    distance = {source: 0.0}
+    settled: Dict[int, float] = {}
+    remaining = len(targets)
+    open_set = [(0.0, source)]
+    while open_set:
+        current_distance, current_id = heapq.heappop(open_set)
+        if current_id in settled:
+            continue
+        if current_distance > limit:
+            break
+        settled[current_id] = current_distance
+        if current_id in targets:
+            remaining -= 1
+            if not remaining:
+                break
+        for neighbor_id, weight in adjacency[current_id].items():
+            if neighbor_id == excluded:
+                continue
+            tentative_distance = current_distance + weight
+            if tentative_distance < distance.get(neighbor_id, INFINITY):
+                distance[neighbor_id] = tentative_distance
+                heapq.heappush(open_set, (tentative_distance, neighbor_id))
+    return settled
+
+
+def _needed_shortcuts(adjacency: List[Optional[Dict[int, float]]], cell_id: int) -> List[Tuple[int, int, float]]:
+    """The shortcuts (u, w, weight) that contracting cell_id requires: pairs of neighbors with no witness path."""
+    neighbors = list(adjacency[cell_id].items())
+    shortcuts = []
+    for index, (source, source_weight) in enumerate(neighbors[:-1]):
+        targets = {target: source_weight + target_weight for target, target_weight in neighbors[index + 1:]}
+        witnesses = _witness_distances(adjacency, source, cell_id, targets, max(targets.values()))
+        for target, weight in targets.items():
+            if witnesses.get(target, INFINITY) > weight:
+                shortcuts.append((source, target, weight))
+    return shortcuts
+
+
+class ContractionHierarchy:
+    """
+    A contraction hierarchy of a grid's passable cells, for exact shortest-path queries that touch only a few
+    hundred cells (see ContractionPathfinder).
+    Moving into a cell costs that cell's terrain cost, which makes grid edges directed; the hierarchy is built
+    over the symmetric weights cost(u) + cost(v) instead, which change every s -> t path cost to exactly
+    2 * cost - cost(s) + cost(t) and so keep the same shortest paths, with half the arcs to store and search.
+    Cells are contracted in order of importance (edge difference, contracted neighbors, depth), adding a
+    shortcut between two neighbors only when no witness path avoids the contracted cell. Each cell keeps its
+    arcs to more important cells, with the cell a shortcut bypasses (its middle) for unpacking.
+    The hierarchy stops being used (stale is set) once the grid's terrain changes.
+    """
+
+    def __init__(self, grid: Grid, rank: array, offsets: array, targets: array, weights: array, middles: array):
+        self.grid = grid
+        self.rank = rank  # contraction order per cell id, -1 for obstacles
+        self.offsets = offsets  # arcs of cell id are targets/weights/middles[offsets[id]:offsets[id + 1]]
+        self.targets = targets
+        self.weights = weights
+        self.middles = middles
+        self.stale = False
+        grid.add_change_listener(self._on_cell_changed)
+
+    def _on_cell_changed(self, x: int, y: int, old_environment: Environment, new_environment: Environment) -> None:
+        self.stale = True
+
+    @classmethod
+    def build(cls, grid: Grid) -> 'ContractionHierarchy':
+        """Contracts every passable cell of the grid. Slow (an offline step); save() the result."""
+        width, height = grid.width, grid.height
+        size = width * height
+        cell_costs = grid.cost_array()
+
+        adjacency: List[Optional[Dict[int, float]]] = [None] * size
+        for cell_id, cost in enumerate(cell_costs):
+            if cost == INFINITY:
+                continue
+            x = cell_id % width
+            neighbors = {}
+            for neighbor_id, in_bounds in ((cell_id - 1, x > 0), (cell_id + 1, x < width - 1),
+                                           (cell_id - width, cell_id >= width),
+                                           (cell_id + width, cell_id < (height - 1) * width)):
+                if in_bounds and cell_costs[neighbor_id] != INFINITY:
+                    neighbors[neighbor_id] = cost + cell_costs[neighbor_id]
+            adjacency[cell_id] = neighbors
+
+        middles: Dict[Tuple[int, int], int] = {}
+        contracted_neighbors = [0] * size
+        depth = [0] * size  # length of the longest chain of contracted cells below each cell
+
+        def priority(cell_id: int) -> Tuple[int, List[Tuple[int, int, float]]]:
+            shortcuts = _needed_shortcuts(adjacency, cell_id)
+            edge_difference = len(shortcuts) - len(adjacency[cell_id])
+            return 2 * edge_difference + contracted_neighbors[cell_id] + depth[cell_id], shortcuts
+
+        queue = [(priority(cell_id)[0], cell_id) for cell_id in range(size) if adjacency[cell_id] is not None]
+        heapq.heapify(queue)
+
+        rank = array('i', [-1]) * size
+        upward: List[Optional[List[Tuple[int, float]]]] = [None] * size
+        order = 0
+        while queue:
+            _, cell_id = heapq.heappop(queue)
+            # Lazy update: contract the cell only if it is still the least important one.
+            current_priority, shortcuts = priority(cell_id)
+            if queue and current_priority > queue[0][0]:
+                heapq.heappush(queue, (current_priority, cell_id))
+                continue
+
+            for source, target, weight in shortcuts:
+                if weight < adjacency[source].get(target, INFINITY):
+                    adjacency[source][target] = adjacency[target][source] = weight
+                    middles[(source, target) if source < target else (target, source)] = cell_id
+
+            neighbors = adjacency[cell_id]
+            upward[cell_id] = list(neighbors.items())
+            for neighbor_id in neighbors:
+                del adjacency[neighbor_id][cell_id]
+                contracted_neighbors[neighbor_id] += 1
+                depth[neighbor_id] = max(depth[neighbor_id], depth[cell_id] + 1)
+            adjacency[cell_id] = None
+            rank[cell_id] = order
+            order += 1
+
+        offsets = array('q', [0])
+        targets, weights, arc_middles = array('i'), array('d'), array('i')
+        for cell_id in range(size):
+            for target, weight in upward[cell_id] or ():
+                targets.append(target)
+                weights.append(weight)
+                arc_middles.append(middles.get((cell_id, target) if cell_id < target else (target, cell_id),
+                                               NO_MIDDLE))
+            offsets.append(len(targets))
+        return cls(grid, rank, offsets, targets, weights, arc_middles)
+
+    def _middle(self, cell_a: int, cell_b: int) -> int:
+        """The cell the arc between cell_a and cell_b bypasses, or NO_MIDDLE for a grid edge."""
+        lower, upper = (cell_a, cell_b) if self.rank[cell_a] < self.rank[cell_b] else (cell_b, cell_a)
+        start, end = self.offsets[lower], self.offsets[lower + 1]
+        return self.middles[start + self.targets[start:end].index(upper)]
+
+    def unpack(self, cell_ids: List[int]) -> List[int]:
+        """Expands a chain of hierarchy arcs into the chain of grid cells they stand for."""
+        cells = [cell_ids[0]]
+        stack = cell_ids[:0:-1]  # cells still to reach, the next one on top
+        while stack:
+            next_id = stack[-1]
+            middle = self._middle(cells[-1], next_id)
+            if middle == NO_MIDDLE:
+                cells.append(stack.pop())
+            else:
+                stack.append(middle)
+        return cells
+
+    def shortest_path(self, start_id: int, end_id: int) -> Tuple[float, List[int]]:
+        """
+        Bidirectional upward Dijkstra with stall-on-demand between two passable cells. Returns the travel
+        cost (infinity if there is no path) and the chain of hierarchy cells on the path (empty if none),
+        which unpack() turns into grid cells.
+        """
+        if start_id == end_id:
+            return 0.0, [start_id]
+
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        distances = ({start_id: 0.0}, {end_id: 0.0})
+        parents: Tuple[Dict[int, int], Dict[int, int]] = ({}, {})
+        open_sets = ([(0.0, start_id)], [(0.0, end_id)])
+        settled = (set(), set())
+        best_distance, meeting_id = INFINITY, -1
+
+        while open_sets[0] or open_sets[1]:
+            # Advance the side with the smaller key; a side is done once its smallest key reaches the best distance.
+            side = 0 if open_sets[0] and (not open_sets[1] or open_sets[0][0][0] <= open_sets[1][0][0]) else 1
+            current_distance, current_id = heapq.heappop(open_sets[side])
+            if current_distance >= best_distance:
+                open_sets[side].clear()
+                continue
+            if current_id in settled[side]:
+                continue
+            settled[side].add(current_id)
+            own_distance = distances[side]
+
+            other_distance = distances[1 - side].get(current_id)
+            if other_distance is not None and current_distance + other_distance < best_distance:
+                best_distance, meeting_id = current_distance + other_distance, current_id
+
+            start, end = offsets[current_id], offsets[current_id + 1]
+            arc_targets, arc_weights = targets[start:end], weights[start:end]
+            # Stall-on-demand: arcs are symmetric, so a cheaper route through a more important cell means
+            # this cell is not on a shortest upward path and need not be expanded.
+            if any(own_distance.get(target, INFINITY) + weight < current_distance
+                   for target, weight in zip(arc_targets, arc_weights)):
+                continue
+            for target, weight in zip(arc_targets, arc_weights):
+                tentative_distance = current_distance + weight
+                if tentative_distance < own_distance.get(target, INFINITY):
+                    own_distance[target] = tentative_distance
+                    parents[side][target] = current_id
+                    heapq.heappush(open_sets[side], (tentative_distance, target))
+
+        if meeting_id == -1:
+            return INFINITY, []
+        chain = [meeting_id]
+        while chain[-1] in parents[0]:
+            chain.append(parents[0][chain[-1]])
+        chain.reverse()
+        while chain[-1] in parents[1]:
+            chain.append(parents[1][chain[-1]])
+        cell_costs = self.grid.cost_array()
+        return (best_distance - cell_costs[start_id] + cell_costs[end_id]) / 2, chain
+
+    def save(self, filepath: str) -> None:
+        """
+        Writes the hierarchy: one JSON header line (dimensions, terrain checksum, arc count) followed by
+        the raw arrays.
+        """
+        header = {
+            "width": self.grid.width,
+            "height": self.grid.height,
+            "checksum": _grid_checksum(self.grid),
+            "arcs": len(self.targets),
+        }
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b"\n")
+            for table in (self.rank, self.offsets, self.targets, self.weights, self.middles):
+                table.tofile(f)
+
+    @classmethod
+    def load(cls, filepath: str, grid: Grid) -> 'ContractionHierarchy':
+        """Reads a hierarchy written by save(), refusing it if it was built for different terrain."""
+        with open(filepath, 'rb') as f:
+            header = json.loads(f.readline().decode('utf-8'))
+            if (header["width"], header["height"]) != (grid.width, grid.height) \
+                    or header["checksum"] != _grid_checksum(grid):
+                raise ValueError(f"Contraction hierarchy in '{filepath}' was built for a different map.")
+
+            size, arc_count = grid.width * grid.height, header["arcs"]
+            tables = []
+            for typecode, length in (('i', size), ('q', size + 1), ('i', arc_count), ('d', arc_count),
+                                     ('i', arc_count)):
+                table = array(typecode)
+                table.fromfile(f, length)
+                tables.append(table)
+        return cls(grid, *tables)
+
+    @classmethod
+    def load_or_build(cls, map_filepath: str, grid: Grid) -> 'ContractionHierarchy':
+        """Loads the hierarchy stored next to map_filepath, or builds and stores it if missing or outdated."""
+        filepath = hierarchy_path_for(map_filepath)
+        if os.path.exists(filepath):
+            try:
+                return cls.load(filepath, grid)
+            except (ValueError, EOFError, KeyError, json.JSONDecodeError):
+                pass
+        hierarchy = cls.build(grid)
+        hierarchy.save(filepath)
+        return hierarchy
+
+    def close(self) -> None:
+        """Stops listening to terrain changes on the grid."""
+        self.grid.remove_change_listener(self._on_cell_changed)
+
+
+class ContractionPathfinder:
+
+    # Exact shortest paths from a ContractionHierarchy: a bidirectional search over arcs to more important
+    # cells settles a few hundred cells instead of the thousands A* expands, then shortcuts are unpacked.
+    # Once the terrain changes, queries fall back to A* until the hierarchy is rebuilt.
+
+    def __init__(self, grid: Grid, hierarchy: Optional[ContractionHierarchy] = None):
+        self.grid = grid
+        self.hierarchy = hierarchy if hierarchy is not None else ContractionHierarchy.build(grid)
+        self.fallback = AStarPathfinder(grid)
+
+    def find_path(self, start_cell: Cell, end_cell: Cell) -> Optional[List[Cell]]:
+        """
+        Finds the shortest path from start_cell to end_cell.
+        Returns a list of Cells in the same format as AStarPathfinder.find_path, or None if no path is found.
+        """
+        if self.hierarchy.stale:
+            return self.fallback.find_path(start_cell, end_cell)
+        if start_cell.environment_type.is_obstacle or end_cell.environment_type.is_obstacle:
+            return None
+
+        width = self.grid.width
+        _, chain = self.hierarchy.shortest_path(start_cell.y * width + start_cell.x, end_cell.y * width + end_cell.x)
+        if not chain:
+            return None  # No path found
+
+        path = []
+        previous: Optional[Cell] = None
+        for cell_id in self.hierarchy.unpack(chain):
+            cell = self.grid.get_cell(cell_id % width, cell_id // width)
+            step = Cell(cell.x, cell.y, cell.environment_type)
+            step.g_score = step.f_score = previous.g_score + cell.environment_type.cost if previous else 0.0
+            step.parent = previous
+            path.append(step)
+            previous = step
+        return path
+
+    def close(self) -> None:
+        """Stops listening to terrain changes on the grid."""
+        self.hierarchy.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the contraction hierarchy of a binary map and store it.")
+    parser.add_argument("binary_map", help="Path of the binary map, e.g. maps/map.pfm")
+    parser.add_argument("--output", default=None, help="Where to write the hierarchy (default: next to the map).")
+    args = parser.parse_args()
+
+    grid = load_binary_map(args.binary_map)
+    started = time.perf_counter()
+    hierarchy = ContractionHierarchy.build(grid)
+    output = args.output or hierarchy_path_for(args.binary_map)
+    hierarchy.save(output)
+    print(f"Contracted {grid.width}x{grid.height} map into {len(hierarchy.targets)} arcs in "
+          f"{time.perf_counter() - started:.1f}s; saved to '{output}'")
+
+
+if __name__ == "__main__":
+    main()
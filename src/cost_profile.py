@@ -0,0 +1,173 @@
+import threading
+from array import array
+from typing import Dict, List, Optional, Union
+
+from src.environment import Environment
+from src.grid import Cell, Grid
+
+INFINITY = float('inf')
+
+# Registered profiles by name, so queries (and PathCache keys) can refer to them as find_path(..., profile="name").
+PROFILES: Dict[str, 'CostProfile'] = {}
+
+_compile_lock = threading.Lock()
+
+
+class CostProfile:
+    """
+    Movement rules for one agent type: a cost per environment name, or None to make that environment
+    impassable. Environments the profile does not list keep their own cost and passability, and listing an
+    obstacle with a cost makes it passable.
+    For example, CostProfile("wader", {"Water": 1.5, "Mud": None}) wades through water cheaply and avoids mud.
+    """
+
+    def __init__(self, name: str, costs: Dict[str, Optional[float]]):
+        self.name = name
+        self.costs = dict(costs)
+        self._environments: Dict[Environment, Environment] = {}
+
+    def __repr__(self):
+        return f"CostProfile(name='{self.name}', costs={self.costs})"
+
+    def environment_for(self, environment: Environment) -> Environment:
+        """The profile's version of an environment: same name and symbol, the profile's cost and passability."""
+        translated = self._environments.get(environment)
+        if translated is None:
+            if environment.name not in self.costs:
+                translated = environment
+            else:
+                cost = self.costs[environment.name]
+                translated = Environment(environment.name, INFINITY if cost is None else cost, cost is None,
+                                         environment.symbol)
+            self._environments[environment] = translated
+        return translated
+
+    def cost_of(self, environment: Environment) -> float:
+        """Cost of entering a cell of this environment under the profile (infinity if impassable)."""
+        translated = self.environment_for(environment)
+        return INFINITY if translated.is_obstacle else translated.cost
+
+
+def register_profile(profile: CostProfile) -> CostProfile:
+    """Makes a profile available by name. Registering a new profile under an existing name replaces it."""
+    PROFILES[profile.name] = profile
+    return profile
+
+
+def resolve_profile(profile: Union[str, CostProfile]) -> CostProfile:
+    """Returns the registered profile of that name, or the profile itself."""
+    if isinstance(profile, CostProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown cost profile '{profile}'; register it with register_profile first.")
+    return PROFILES[profile]
+
+
+class ProfileGrid(Grid):
+    """
+    A grid as one agent type sees it: the terrain of a base grid, with every environment replaced by the
+    profile's version of it. It stores no terrain of its own, only the profile's compiled cost array
+    (one float per cell), which decides passability during searches and is kept current as the base
+    grid changes. Build it through profile_grid() so every query on a map shares one instance per profile.
+    """
+
+    def __init__(self, base: Grid, profile: CostProfile):
+        self.base = base
+        self.profile = profile
+        self.width = base.width
+        self.height = base.height
+        self._init_indexes()
+        self._cost_array = self._compile()
+        self.start_node: Optional[Cell] = self.get_cell(0, 0)
+        self.end_node: Optional[Cell] = self.get_cell(self.width - 1, self.height - 1)
+        base.add_change_listener(self._on_base_changed)
+
+    def _compile(self) -> array:
+        """
+        Builds the per-cell cost array: through the terrain's environment table when the base has one,
+        from its Cell rows for a Grid, and cell by cell through get_cell for any other backend (e.g. TiledGrid).
+        """
+        environments = getattr(self.base, 'environments', None)
+        terrain = getattr(self.base, 'terrain', None)
+        if environments is not None and terrain is not None:
+            costs = [self.profile.cost_of(environment) for environment in environments]
+            return array('d', map(costs.__getitem__, terrain))
+        cost_of = self.profile.cost_of
+        if hasattr(self.base, 'cells'):
+            return array('d', (cost_of(cell.environment_type) for row in self.base.cells for cell in row))
+        get_cell = self.base.get_cell
+        return array('d', (cost_of(get_cell(x, y).environment_type)
+                           for y in range(self.height) for x in range(self.width)))
+
+    def close(self) -> None:
+        """Stops following terrain changes on the base grid."""
+        self.base.remove_change_listener(self._on_base_changed)
+
+    @property
+    def symbol_to_environment(self) -> Dict[str, Environment]:
+        return {symbol: self.profile.environment_for(environment)
+                for symbol, environment in self.base.symbol_to_environment.items()}
+
+    def get_cell(self, x: int, y: int) -> Optional[Cell]:
+        """Returns a new Cell for (x, y) carrying the profile's environment, or None if out of bounds."""
+        cell = self.base.get_cell(x, y)
+        if cell is None:
+            return None
+        return Cell(x, y, self.profile.environment_for(cell.environment_type))
+
+    def get_neighbors(self, cell: Cell) -> List[Cell]:
+        """Returns the neighbors that are passable under the profile, checked through the cost array."""
+        neighbors = []
+        width, costs = self.width, self._cost_array
+        for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            new_x, new_y = cell.x + dx, cell.y + dy
+            if 0 <= new_y < self.height and 0 <= new_x < width and costs[new_y * width + new_x] != INFINITY:
+                neighbors.append(self.get_cell(new_x, new_y))
+        return neighbors
+
+    def set_environment(self, x: int, y: int, environment: Environment) -> None:
+        """Changes the terrain of the base grid; the profile's view follows through the change listener."""
+        self.base.set_environment(x, y, environment)
+
+    def _on_base_changed(self, x: int, y: int, old_environment: Environment, new_environment: Environment) -> None:
+        cell_id = y * self.width + x
+        old_environment = self.profile.environment_for(old_environment)
+        new_environment = self.profile.environment_for(new_environment)
+        self._cost_array[cell_id] = INFINITY if new_environment.is_obstacle else new_environment.cost
+        if old_environment.is_obstacle != new_environment.is_obstacle:
+            if self.component_index is not None:
+                self.component_index.update_cell(cell_id, not new_environment.is_obstacle)
+            if self.nearest_index is not None:
+                self.nearest_index.update_cell(cell_id, not new_environment.is_obstacle)
+        if old_environment is not new_environment:
+            for listener in list(self.change_listeners):
+                listener(x, y, old_environment, new_environment)
+
+    def cost_array(self) -> array:
+        """Returns the profile's compiled cost array (shared, not copied)."""
+        return self._cost_array
+
+    def passable_mask(self) -> bytearray:
+        """Returns a row-major bytearray with 1 for cells that are passable under the profile."""
+        return bytearray(0 if cost == INFINITY else 1 for cost in self._cost_array)
+
+    def _row_symbols(self, y: int, min_x: int, max_x: int) -> str:
+        return self.base._row_symbols(y, min_x, max_x)
+
+
+def profile_grid(grid: Grid, profile: Union[str, CostProfile]) -> ProfileGrid:
+    """
+    Returns the grid as seen under a profile (a registered name or a CostProfile), compiling it on first use.
+    Compiled views are cached on the grid, so all queries with the same profile share one cost array.
+    """
+    profile = resolve_profile(profile)
+    view = grid.profile_views.get(profile.name)
+    if view is not None and view.profile is profile:
+        return view
+    with _compile_lock:
+        view = grid.profile_views.get(profile.name)
+        if view is None or view.profile is not profile:
+            if view is not None:
+                view.close()  # the name was re-registered with different rules
+            view = grid.profile_views[profile.name] = ProfileGrid(grid, profile)
+    return view
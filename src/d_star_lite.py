@@ -0,0 +1,177 @@
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.environment import Environment
+from src.grid import Cell, Grid
+
+INFINITY = float('inf')
+
+
+class DStarLitePathfinder:
+
+    # Incremental replanning with D* Lite. The search runs backward from the goal and its tree
+    # (g / rhs values and the open list) is kept between calls. Terrain edits made through
+    # Grid.set_environment are picked up by a change listener, and the next find_path call repairs
+    # only the part of the tree those cells affect. The start may move between calls.
+
+    def __init__(self, grid: Grid):
+        self.grid = grid
+        self._goal: Optional[Cell] = None
+        self._last_start: Optional[Cell] = None
+        self._changed: Set[Tuple[int, int]] = set()
+        self._reset_search()
+        self._min_cost = min((env.cost for env in grid.symbol_to_environment.values() if not env.is_obstacle),
+                             default=1.0)
+        grid.add_change_listener(self._on_cell_changed)
+
+    def close(self) -> None:
+        """Stops listening to terrain changes on the grid."""
+        self.grid.remove_change_listener(self._on_cell_changed)
+
+    def _reset_search(self) -> None:
+        self._g: Dict[int, float] = {}
+        self._rhs: Dict[int, float] = {}
+        self._open: List[Tuple[float, float, int]] = []
+        self._open_keys: Dict[int, Tuple[float, float]] = {}
+        self._km = 0.0
+        self.nodes_expanded = 0
+
+    def _on_cell_changed(self, x: int, y: int, old_environment: Environment, new_environment: Environment) -> None:
+        if not new_environment.is_obstacle and new_environment.cost < self._min_cost:
+            # The heuristic would no longer be admissible, so the stored tree cannot be repaired.
+            self._min_cost = new_environment.cost
+            self._goal = None
+            return
+        self._changed.add((x, y))
+
+    def _heuristic(self, cell_id: int, start: Cell) -> float:
+        width = self.grid.width
+        return (abs(cell_id % width - start.x) + abs(cell_id // width - start.y)) * self._min_cost
+
+    def _cell(self, cell_id: int) -> Cell:
+        return self.grid.get_cell(cell_id % self.grid.width, cell_id // self.grid.width)
+
+    def _neighbor_ids(self, cell_id: int) -> List[int]:
+        """All in-bounds 4-neighbors, obstacles included (their edges simply cost infinity)."""
+        width, height = self.grid.width, self.grid.height
+        x, y = cell_id % width, cell_id // width
+        neighbors = []
+        if x > 0:
+            neighbors.append(cell_id - 1)
+        if x < width - 1:
+            neighbors.append(cell_id + 1)
+        if y > 0:
+            neighbors.append(cell_id - width)
+        if y < height - 1:
+            neighbors.append(cell_id + width)
+        return neighbors
+
+    def _cost(self, from_id: int, to_id: int) -> float:
+        """Cost of moving between two adjacent cells: the cost of the cell entered, or infinity via obstacles."""
+        if self._cell(from_id).environment_type.is_obstacle:
+            return INFINITY
+        environment = self._cell(to_id).environment_type
+        return INFINITY if environment.is_obstacle else environment.cost
+
+    def _key(self, cell_id: int, start: Cell) -> Tuple[float, float]:
+        best = min(self._g.get(cell_id, INFINITY), self._rhs.get(cell_id, INFINITY))
+        return best + self._heuristic(cell_id, start) + self._km, best
+
+    def _push(self, cell_id: int, key: Tuple[float, float]) -> None:
+        self._open_keys[cell_id] = key
+        heapq.heappush(self._open, (key[0], key[1], cell_id))
+
+    def _top_key(self) -> Tuple[float, float]:
+        # Entries whose key no longer matches _open_keys are stale and skipped.
+        while self._open:
+            k1, k2, cell_id = self._open[0]
+            if self._open_keys.get(cell_id) == (k1, k2):
+                return k1, k2
+            heapq.heappop(self._open)
+        return INFINITY, INFINITY
+
+    def _update_vertex(self, cell_id: int, start: Cell, goal_id: int) -> None:
+        if cell_id != goal_id:
+            self._rhs[cell_id] = min((self._cost(cell_id, neighbor_id) + self._g.get(neighbor_id, INFINITY)
+                                      for neighbor_id in self._neighbor_ids(cell_id)), default=INFINITY)
+        self._open_keys.pop(cell_id, None)
+        if self._g.get(cell_id, INFINITY) != self._rhs.get(cell_id, INFINITY):
+            self._push(cell_id, self._key(cell_id, start))
+
+    def _compute_shortest_path(self, start: Cell, goal_id: int) -> None:
+        start_id = start.y * self.grid.width + start.x
+        while (self._top_key() < self._key(start_id, start)
+               or self._rhs.get(start_id, INFINITY) != self._g.get(start_id, INFINITY)):
+            old_key = self._top_key()
+            if old_key == (INFINITY, INFINITY):
+                break
+            _, _, cell_id = heapq.heappop(self._open)
+            del self._open_keys[cell_id]
+            self.nodes_expanded += 1
+
+            new_key = self._key(cell_id, start)
+            if old_key < new_key:
+                self._push(cell_id, new_key)
+            elif self._g.get(cell_id, INFINITY) > self._rhs.get(cell_id, INFINITY):
+                self._g[cell_id] = self._rhs[cell_id]
+                for neighbor_id in self._neighbor_ids(cell_id):
+                    self._update_vertex(neighbor_id, start, goal_id)
+            else:
+                self._g[cell_id] = INFINITY
+                self._update_vertex(cell_id, start, goal_id)
+                for neighbor_id in self._neighbor_ids(cell_id):
+                    self._update_vertex(neighbor_id, start, goal_id)
+
+    def find_path(self, start_cell: Cell, end_cell: Cell) -> Optional[List[Cell]]:
+        """
+        Finds the shortest path from start_cell to end_cell, reusing the previous search tree when the goal
+        is unchanged. Returns fresh Cells with g_score and parent set, like AStarPathfinder.find_path,
+        or None if no path is found.
+        """
+        width = self.grid.width
+        goal_id = end_cell.y * width + end_cell.x
+
+        if self._goal is None or self._goal.coords != end_cell.coords:
+            self._reset_search()
+            self._changed.clear()
+            self._goal = end_cell
+            self._rhs[goal_id] = 0.0
+            self._push(goal_id, self._key(goal_id, start_cell))
+        else:
+            # Moving the start shifts every key by at most the heuristic distance moved.
+            self._km += self._heuristic(self._last_start.y * width + self._last_start.x, start_cell)
+            changed = self._changed
+            self._changed = set()
+            for x, y in changed:
+                cell_id = y * width + x
+                self._update_vertex(cell_id, start_cell, goal_id)
+                for neighbor_id in self._neighbor_ids(cell_id):
+                    self._update_vertex(neighbor_id, start_cell, goal_id)
+        self._last_start = start_cell
+
+        self._compute_shortest_path(start_cell, goal_id)
+        return self._extract_path(start_cell, goal_id)
+
+    def _extract_path(self, start_cell: Cell, goal_id: int) -> Optional[List[Cell]]:
+        width = self.grid.width
+        cell_id = start_cell.y * width + start_cell.x
+        if self._g.get(cell_id, INFINITY) == INFINITY:
+            return None
+
+        step = Cell(start_cell.x, start_cell.y, start_cell.environment_type)
+        step.g_score = step.f_score = 0.0
+        path = [step]
+        visited = {cell_id}
+        while cell_id != goal_id:
+            next_id = min(self._neighbor_ids(cell_id),
+                          key=lambda neighbor_id: self._cost(cell_id, neighbor_id) + self._g.get(neighbor_id, INFINITY))
+            if next_id in visited or self._g.get(next_id, INFINITY) == INFINITY:
+                return None  # The tree is inconsistent; should not happen after compute_shortest_path.
+            visited.add(next_id)
+            cell = self._cell(next_id)
+            step = Cell(cell.x, cell.y, cell.environment_type)
+            step.g_score = step.f_score = path[-1].g_score + cell.environment_type.cost
+            step.parent = path[-1]
+            path.append(step)
+            cell_id = next_id
+        return path
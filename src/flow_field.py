@@ -0,0 +1,212 @@
+import collections
+import heapq
+from array import array
+from operator import itemgetter
+from typing import Iterable, List, Optional, Tuple, Union
+
+from src.environment import Environment
+from src.grid import Cell, Grid
+
+INFINITY = float('inf')
+
+Endpoint = Union[Tuple[int, int], Cell]
+
+
+def cost_field(grid: Grid, source: Tuple[int, int], reverse: bool = False) -> array:
+    """
+    Runs Dijkstra over the whole grid from source and returns the costs as a flat row-major array('d'),
+    with infinity for unreachable cells. Moving into a cell costs that cell's entry in grid.cost_array().
+    By default the values are costs of travelling from source; with reverse=True they are costs of
+    travelling to source.
+    """
+    width, height = grid.width, grid.height
+    cell_costs = grid.cost_array()
+    source_id = source[1] * width + source[0]
+    costs = array('d', [INFINITY]) * (width * height)
+    costs[source_id] = 0.0
+    open_set = [(0.0, source_id)]
+
+    while open_set:
+        current_cost, cell_id = heapq.heappop(open_set)
+        if current_cost > costs[cell_id]:
+            continue  # stale entry
+
+        if reverse:
+            # Stepping backward from cell_id to a neighbor costs what the neighbor pays to enter cell_id.
+            step_cost = cell_costs[cell_id]
+            if step_cost == INFINITY:
+                continue
+        elif cell_costs[cell_id] == INFINITY and cell_id != source_id:
+            continue
+        x = cell_id % width
+        for neighbor_id, in_bounds in ((cell_id - 1, x > 0), (cell_id + 1, x < width - 1),
+                                       (cell_id - width, cell_id >= width),
+                                       (cell_id + width, cell_id < (height - 1) * width)):
+            if not in_bounds or cell_costs[neighbor_id] == INFINITY:
+                continue
+            tentative_cost = current_cost + (step_cost if reverse else cell_costs[neighbor_id])
+            if tentative_cost < costs[neighbor_id]:
+                costs[neighbor_id] = tentative_cost
+                heapq.heappush(open_set, (tentative_cost, neighbor_id))
+    return costs
+
+
+class FlowField:
+    """
+    Cost-to-goal field for one target: the cheapest cost of reaching the target from every cell,
+    computed once by a reverse Dijkstra over the grid and stored as a flat array('d') (infinity where
+    the target cannot be reached). Paths for any number of agents then come from greedy descent,
+    in O(path length) each.
+    The field refuses to answer (ValueError) once the grid's terrain changes; build a new one, or use
+    FlowFieldCache, which does so on demand.
+    """
+
+    def __init__(self, grid: Grid, target: Endpoint):
+        self.grid = grid
+        target_x, target_y = target.coords if isinstance(target, Cell) else target
+        if not grid.get_cell(target_x, target_y):
+            raise ValueError(f"Target ({target_x},{target_y}) is out of map bounds.")
+        self.target = (target_x, target_y)
+        self.costs = cost_field(grid, self.target, reverse=True)
+        self.stale = False
+        grid.add_change_listener(self._on_cell_changed)
+
+    def close(self) -> None:
+        """Stops listening to terrain changes on the grid; the field answers no further queries."""
+        self.grid.remove_change_listener(self._on_cell_changed)
+        self.stale = True
+
+    def _on_cell_changed(self, x: int, y: int, old_environment: Environment, new_environment: Environment) -> None:
+        self.stale = True
+
+    def _check_current(self) -> None:
+        if self.stale:
+            raise ValueError(f"Flow field to {self.target} is stale: it was closed or the terrain changed.")
+
+    def _cell_id(self, cell: Endpoint) -> Optional[int]:
+        x, y = cell.coords if isinstance(cell, Cell) else cell
+        if 0 <= x < self.grid.width and 0 <= y < self.grid.height:
+            return y * self.grid.width + x
+        return None
+
+    def cost_from(self, start: Endpoint) -> float:
+        """Cost of the cheapest path from start to the target (infinity if unreachable or out of bounds)."""
+        self._check_current()
+        cell_id = self._cell_id(start)
+        return self.costs[cell_id] if cell_id is not None else INFINITY
+
+    def costs_from(self, starts: Iterable[Endpoint]) -> List[float]:
+        """Vectorized cost_from: looks up many starts in one C-level pass over the field."""
+        self._check_current()
+        cell_ids = [self._cell_id(start) for start in starts]
+        if not cell_ids:
+            return []
+        if None in cell_ids:
+            return [self.costs[cell_id] if cell_id is not None else INFINITY for cell_id in cell_ids]
+        costs = itemgetter(*cell_ids)(self.costs)
+        return list(costs) if len(cell_ids) > 1 else [costs]
+
+    def next_step(self, cell: Endpoint) -> Optional[Cell]:
+        """Returns the neighbor to move to from cell along the field, or None at the target or if unreachable."""
+        self._check_current()
+        cell_id = self._cell_id(cell)
+        if cell_id is None or self.costs[cell_id] == INFINITY or cell_id == self._cell_id(self.target):
+            return None
+        next_id = self._descend(cell_id, self.grid.cost_array())
+        if next_id is None:
+            return None
+        return self.grid.get_cell(next_id % self.grid.width, next_id // self.grid.width)
+
+    def _descend(self, cell_id: int, cell_costs: array) -> Optional[int]:
+        """The neighbor on the cheapest way down, or None if no neighbor is closer to the target than cell_id."""
+        width = self.grid.width
+        x = cell_id % width
+        best_id, best_cost = cell_id, INFINITY
+        for neighbor_id, in_bounds in ((cell_id - 1, x > 0), (cell_id + 1, x < width - 1),
+                                       (cell_id - width, cell_id >= width),
+                                       (cell_id + width, cell_id < (self.grid.height - 1) * width)):
+            if in_bounds:
+                cost = cell_costs[neighbor_id] + self.costs[neighbor_id]
+                if cost < best_cost:
+                    best_id, best_cost = neighbor_id, cost
+        if self.costs[best_id] >= self.costs[cell_id]:
+            return None  # no descent: guards the loop in path_from against a field that disagrees with the grid
+        return best_id
+
+    def path_from(self, start: Endpoint) -> Optional[List[Cell]]:
+        """
+        Follows the field from start down to the target.
+        Returns fresh Cells with g_score and parent set, like AStarPathfinder.find_path, or None if unreachable.
+        """
+        self._check_current()
+        cell_id = self._cell_id(start)
+        if cell_id is None or self.costs[cell_id] == INFINITY:
+            return None
+
+        grid = self.grid
+        width = grid.width
+        cell_costs = grid.cost_array()
+        target_id = self._cell_id(self.target)
+
+        cell = grid.get_cell(cell_id % width, cell_id // width)
+        step = Cell(cell.x, cell.y, cell.environment_type)
+        step.g_score = step.f_score = 0.0
+        path = [step]
+        while cell_id != target_id:
+            cell_id = self._descend(cell_id, cell_costs)
+            if cell_id is None:
+                return None
+            cell = grid.get_cell(cell_id % width, cell_id // width)
+            step = Cell(cell.x, cell.y, cell.environment_type)
+            step.g_score = step.f_score = path[-1].g_score + cell_costs[cell_id]
+            step.parent = path[-1]
+            path.append(step)
+        return path
+
+    def paths_from(self, starts: Iterable[Endpoint]) -> List[Optional[List[Cell]]]:
+        return [self.path_from(start) for start in starts]
+
+
+class FlowFieldCache:
+    """
+    LRU cache of FlowFields per target on one grid.
+    Any terrain change made through Grid.set_environment drops every cached field. Dropped and evicted
+    fields are closed, so get() a field again rather than holding on to it.
+    """
+
+    def __init__(self, grid: Grid, max_fields: int = 16):
+        self.grid = grid
+        self.max_fields = max_fields
+        self._fields: 'collections.OrderedDict[Tuple[int, int], FlowField]' = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        grid.add_change_listener(self._on_cell_changed)
+
+    def close(self) -> None:
+        """Stops listening to terrain changes on the grid."""
+        self.grid.remove_change_listener(self._on_cell_changed)
+        self._drop_all()
+
+    def _drop_all(self) -> None:
+        for field in self._fields.values():
+            field.close()
+        self._fields.clear()
+
+    def _on_cell_changed(self, x: int, y: int, old_environment: Environment, new_environment: Environment) -> None:
+        self._drop_all()
+
+    def get(self, target: Endpoint) -> FlowField:
+        """Returns the field for target, computing it on a miss and evicting the least recently used field."""
+        key = target.coords if isinstance(target, Cell) else (target[0], target[1])
+        field = self._fields.get(key)
+        if field is not None:
+            self.hits += 1
+            self._fields.move_to_end(key)
+            return field
+
+        self.misses += 1
+        field = FlowField(self.grid, key)
+        self._fields[key] = field
+        while len(self._fields) > self.max_fields:
+            self._fields.popitem(last=False)[1].close()
+        return field
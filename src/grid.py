@@ -1,7 +1,10 @@
 import collections
-from typing import List, Dict, Tuple, Optional, Set
+from array import array
+from typing import Callable, Iterator, List, Dict, TextIO, Tuple, Optional, Set, Union
 
+from src.components import ComponentIndex
 from src.environment import Environment
+from src.nearest_index import NO_CELL, NearestPassableIndex
 
 
 class Cell:
@@ -31,6 +34,13 @@ class Cell:
         return self.x, self.y
 
 
+# Called as listener(x, y, old_environment, new_environment) after a cell's terrain changes.
+ChangeListener = Callable[[int, int, Environment, Environment], None]
+
+# A rendering window as (x, y, width, height).
+Viewport = Tuple[int, int, int, int]
+
+
 class Grid:
     def __init__(self, map_data: List[List[str]], symbol_to_environment: Dict[str, Environment]):
         if not map_data or not map_data[0]:
@@ -39,10 +49,11 @@ class Grid:
         self.height = len(map_data)
         self.width = len(map_data[0])
         self.cells: List[List[Cell]] = []
-        self.symbol_to_environment = symbol_to_environment
+        self.symbol_to_environment = dict(symbol_to_environment)
 
         self.start_node: Optional[Cell] = None
         self.end_node: Optional[Cell] = None
+        self._init_indexes()
 
         for r in range(self.height):
             row_cells = []
@@ -59,6 +70,14 @@ class Grid:
         self.start_node = self.get_cell(0, 0)
         self.end_node = self.get_cell(self.width - 1, self.height - 1)
 
+    def _init_indexes(self) -> None:
+        """Resets the derived, lazily built structures shared by all grid backends."""
+        self.component_index: Optional[ComponentIndex] = None
+        self.nearest_index: Optional[NearestPassableIndex] = None
+        self.change_listeners: List[ChangeListener] = []
+        self._cost_array: Optional[array] = None
+        self.profile_views: Dict[str, 'Grid'] = {}  # compiled cost profiles by name (see src/cost_profile.py)
+
     def get_cell(self, x: int, y: int) -> Optional[Cell]:
         """Returns the Cell object at the given (x, y) coordinates, or None if out of bounds."""
         if 0 <= y < self.height and 0 <= x < self.width:
@@ -77,29 +96,177 @@ class Grid:
                 neighbors.append(neighbor_cell)
         return neighbors
 
+    def set_environment(self, x: int, y: int, environment: Environment) -> None:
+        """
+        Changes the terrain of the cell at (x, y), keeps the component and nearest-passable indexes
+        (if built) current and notifies every registered change listener.
+        """
+        cell = self.get_cell(x, y)
+        if not cell:
+            raise ValueError(f"Coordinates ({x},{y}) are out of map bounds.")
+        old_environment = cell.environment_type
+        if old_environment is environment:
+            return
+
+        self._store_environment(x, y, environment)
+        if environment not in self.symbol_to_environment.values():
+            # Keep the table of known environments complete for cost-based decisions (heuristics, open lists).
+            self.symbol_to_environment[environment.symbol] = environment
+        if self._cost_array is not None:
+            self._cost_array[y * self.width + x] = float('inf') if environment.is_obstacle else environment.cost
+        if old_environment.is_obstacle != environment.is_obstacle:
+            if self.component_index is not None:
+                self.component_index.update_cell(y * self.width + x, not environment.is_obstacle)
+            if self.nearest_index is not None:
+                self.nearest_index.update_cell(y * self.width + x, not environment.is_obstacle)
+        for listener in list(self.change_listeners):
+            listener(x, y, old_environment, environment)
+
+    def _store_environment(self, x: int, y: int, environment: Environment) -> None:
+        self.cells[y][x].environment_type = environment
+
+    def add_change_listener(self, listener: ChangeListener) -> None:
+        """Registers a callback to run after every set_environment call."""
+        self.change_listeners.append(listener)
+
+    def remove_change_listener(self, listener: ChangeListener) -> None:
+        if listener in self.change_listeners:
+            self.change_listeners.remove(listener)
+
+    def cost_array(self) -> array:
+        """
+        Returns a row-major array('d') with the movement cost of entering each cell (infinity for obstacles).
+        Built on first use, cached on the grid and kept current by set_environment.
+        """
+        if self._cost_array is None:
+            self._cost_array = array('d', (float('inf') if cell.environment_type.is_obstacle
+                                           else cell.environment_type.cost for row in self.cells for cell in row))
+        return self._cost_array
+
+    def passable_mask(self) -> bytearray:
+        """Returns a row-major bytearray with 1 for passable cells and 0 for obstacles."""
+        return bytearray(0 if cell.environment_type.is_obstacle else 1 for row in self.cells for cell in row)
+
+    def build_component_index(self) -> ComponentIndex:
+        """
+        Labels the connected regions of passable cells and stores the index on the grid.
+        Once built, AStarPathfinder uses it to reject unreachable goals without searching.
+        """
+        self.component_index = ComponentIndex(self.width, self.height, self.passable_mask())
+        return self.component_index
+
+    def same_component(self, cell_a: Union[Cell, Tuple[int, int]], cell_b: Union[Cell, Tuple[int, int]]) -> bool:
+        """
+        True if both cells (Cell objects or (x, y) tuples) are passable and connected to each other.
+        Builds the component index on first use.
+        """
+        (x_a, y_a), (x_b, y_b) = [cell.coords if isinstance(cell, Cell) else cell for cell in (cell_a, cell_b)]
+        if not self.get_cell(x_a, y_a) or not self.get_cell(x_b, y_b):
+            return False
+        if self.component_index is None:
+            self.build_component_index()
+        return self.component_index.same(y_a * self.width + x_a, y_b * self.width + x_b)
+
+    def build_nearest_index(self) -> NearestPassableIndex:
+        """
+        Builds the nearest-passable-cell table and stores it on the grid, where set_environment keeps it current.
+        Once built, snap_to_passable and find_nearest_non_obstacle_cell are O(1) lookups.
+        """
+        self.nearest_index = NearestPassableIndex(self.width, self.height, self.passable_mask())
+        return self.nearest_index
+
+    def snap_to_passable(self, x: int, y: int, prefer_component_of: Optional[Union[Cell, Tuple[int, int]]] = None) \
+            -> Optional[Tuple[int, int]]:
+        """
+        Returns the nearest passable cell to (x, y) (the cell itself if passable), or None if the grid
+        has no passable cell. There is no radius limit; the nearest-passable index is built on first use.
+        With prefer_component_of (a passable Cell or (x, y) tuple, e.g. the other endpoint of a query), the
+        nearest cell connected to it is returned instead, if there is one.
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f"Coordinates ({x},{y}) are out of map bounds.")
+        if self.nearest_index is None:
+            self.build_nearest_index()
+        nearest_id = self.nearest_index.nearest(y * self.width + x)
+        if nearest_id == NO_CELL:
+            return None
+        nearest = (nearest_id % self.width, nearest_id // self.width)
+        if prefer_component_of is None or self.same_component(nearest, prefer_component_of):
+            return nearest
+
+        # The nearest cell is walled off from the other endpoint: search outward for one that is not.
+        other = prefer_component_of.coords if isinstance(prefer_component_of, Cell) else prefer_component_of
+        if not self.same_component(other, other):
+            return nearest
+        queue = collections.deque([(x, y)])
+        visited = {(x, y)}
+        while queue:
+            curr_x, curr_y = queue.popleft()
+            if self.same_component((curr_x, curr_y), other):
+                return curr_x, curr_y
+            for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]:
+                neighbor = (curr_x + dx, curr_y + dy)
+                if 0 <= neighbor[0] < self.width and 0 <= neighbor[1] < self.height and neighbor not in visited:
+                    visited.add(neighbor)
+                    queue.append(neighbor)
+        return nearest
+
+    def _row_symbols(self, y: int, min_x: int, max_x: int) -> str:
+        """Returns the environment symbols of row y between min_x (inclusive) and max_x (exclusive)."""
+        return "".join([cell.environment_type.symbol for cell in self.cells[y][min_x:max_x]])
+
+    def _clip_viewport(self, viewport: Optional[Viewport]) -> Tuple[int, int, int, int]:
+        """Turns an (x, y, width, height) viewport into clipped (min_x, min_y, max_x, max_y) bounds."""
+        if viewport is None:
+            return 0, 0, self.width, self.height
+        x, y, width, height = viewport
+        return max(0, x), max(0, y), min(self.width, x + width), min(self.height, y + height)
+
+    def iter_rows(self, path: Optional[List['Cell']] = None, viewport: Optional[Viewport] = None) -> Iterator[str]:
+        """
+        Yields the grid one text row at a time, built in bulk from the terrain.
+        If path is given (even empty), it is overlaid: 'S' for start, 'E' for end, '■' for path cells.
+        viewport limits the output to an (x, y, width, height) window.
+        """
+        min_x, min_y, max_x, max_y = self._clip_viewport(viewport)
+
+        overlay: Dict[int, Dict[int, str]] = {}
+        if path is not None:
+            for cell in path:
+                overlay.setdefault(cell.y, {})[cell.x] = '■'
+            if self.end_node:
+                overlay.setdefault(self.end_node.y, {})[self.end_node.x] = 'E'
+            if self.start_node:
+                overlay.setdefault(self.start_node.y, {})[self.start_node.x] = 'S'
+
+        for y in range(min_y, max_y):
+            row_str = self._row_symbols(y, min_x, max_x)
+            row_overlay = overlay.get(y)
+            if row_overlay:
+                row_chars = list(row_str)
+                for x, symbol in row_overlay.items():
+                    if min_x <= x < max_x:
+                        row_chars[x - min_x] = symbol
+                row_str = "".join(row_chars)
+            yield row_str
+
+    def write_rows(self, stream: TextIO, path: Optional[List['Cell']] = None,
+                   viewport: Optional[Viewport] = None) -> None:
+        """Streams the rows from iter_rows to a text stream (file or stdout), newline-separated."""
+        for index, row_str in enumerate(self.iter_rows(path, viewport)):
+            if index:
+                stream.write("\n")
+            stream.write(row_str)
+
     def print_grid(self) -> None:
         """Prints the full grid to the console."""
-        for r in range(self.height):
-            row_str = ""
-            for c in range(self.width):
-                cell = self.get_cell(c, r)
-                if cell:
-                    row_str += cell.environment_type.symbol
-                else:
-                    row_str += '?'
+        for row_str in self.iter_rows():
             print(row_str)
 
     def print_sample(self, sample_size: int = 25) -> None:
         """Prints a sample (top-left) section of the grid to the console."""
         print(f"--- Sample Grid ({sample_size}x{sample_size}) ---")
-        for r in range(min(sample_size, self.height)):
-            row_str = ""
-            for c in range(min(sample_size, self.width)):
-                cell = self.get_cell(c, r)
-                if cell:
-                    row_str += cell.environment_type.symbol
-                else:
-                    row_str += '?'
+        for row_str in self.iter_rows(viewport=(0, 0, sample_size, sample_size)):
             print(row_str)
         if self.width > sample_size or self.height > sample_size:
             print("...")
@@ -115,44 +282,31 @@ class Grid:
         else:
             return cell.environment_type.symbol
 
-    def render_grid_with_path(self, path: List['Cell']) -> str:
+    def render_grid_with_path(self, path: List['Cell'], viewport: Optional[Viewport] = None) -> str:
         """
         Generates a multi-line string representation of the grid with the path highlighted.
-        'S' for start, 'E' for end, '*' for path, and environment symbols otherwise.
+        'S' for start, 'E' for end, '■' for path, and environment symbols otherwise.
+        For large maps prefer write_rows, which streams instead of building one string.
         """
         if not self.start_node or not self.end_node:
             raise ValueError("Start and end nodes must be set on the grid for path rendering.")
-
-        path_coords_set = {(cell.x, cell.y) for cell in path}
-        display_lines = []
-
-        for r in range(self.height):
-            row_str = ""
-            for c in range(self.width):
-                cell = self.get_cell(c, r)
-                if cell:
-                    row_str += self._get_display_symbol(cell, path_coords_set)
-                else:
-                    row_str += '?'
-            display_lines.append(row_str)
-        return "\n".join(display_lines)
+        return "\n".join(self.iter_rows(path, viewport))
 
     def print_grid_with_path(self, path: List['Cell'], sample_size: Optional[int] = None) -> None:
         """
         Prints the grid with the path highlighted to the console.
         Can print a sample if sample_size is provided.
         """
-        full_grid_str = self.render_grid_with_path(path)
-        lines = full_grid_str.splitlines()
+        if not self.start_node or not self.end_node:
+            raise ValueError("Start and end nodes must be set on the grid for path rendering.")
 
         if sample_size is not None and (self.width > sample_size or self.height > sample_size):
-            print_width = sample_size
-            print_height = sample_size
-            for r in range(min(print_height, len(lines))):
-                print(lines[r][:print_width])
+            for row_str in self.iter_rows(path, viewport=(0, 0, sample_size, sample_size)):
+                print(row_str)
             print("...")
         else:
-            print(full_grid_str)
+            for row_str in self.iter_rows(path):
+                print(row_str)
 
 
 # --- find_nearest_non_obstacle_cell (standalone function) ---
@@ -162,7 +316,16 @@ def find_nearest_non_obstacle_cell(grid: Grid, start_x: int, start_y: int, max_s
     """
     Finds the nearest non-obstacle cell to a given (x,y) coordinate using BFS.
     Returns (x, y) tuple of the non-obstacle cell, or None if not found within radius.
+    If the grid's nearest-passable index is built (see Grid.build_nearest_index), this is an O(1) lookup.
     """
+    index = grid.nearest_index
+    if index is not None and 0 <= start_x < grid.width and 0 <= start_y < grid.height:
+        cell_id = start_y * grid.width + start_x
+        nearest_id = index.nearest(cell_id)
+        if nearest_id == NO_CELL or index.distance(cell_id) > max_search_radius:
+            return None
+        return nearest_id % grid.width, nearest_id // grid.width
+
     queue = collections.deque([(start_x, start_y, 0)])
     visited = {(start_x, start_y)}
 
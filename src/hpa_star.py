@@ -0,0 +1,295 @@
+import heapq
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .grid import Cell, Grid
+
+# A cluster's bounds as (min_x, min_y, max_x, max_y), max values exclusive.
+Bounds = Tuple[int, int, int, int]
+
+# Border segments at least this long get two entrances (one at each end) instead of one in the middle.
+WIDE_ENTRANCE_LENGTH = 6
+
+
+def _bounded_search(grid: Grid, source: Cell, bounds: Bounds, target: Optional[Cell] = None,
+                    reverse: bool = False) -> Tuple[Dict[int, float], Dict[int, Cell]]:
+    """
+    Dijkstra from source that never leaves bounds. Moving into a cell costs that cell's environment cost.
+    With reverse=True the distances are costs *to* source instead of from it.
+    Stops early once target is settled. Returns (distance, parent) maps keyed by cell id.
+    """
+    min_x, min_y, max_x, max_y = bounds
+    width = grid.width
+    source_id = source.y * width + source.x
+    target_id = target.y * width + target.x if target else None
+
+    distance = {source_id: 0.0}
+    parent: Dict[int, Cell] = {}
+    settled = set()
+    open_set = [(0.0, source_id, source)]
+
+    while open_set:
+        current_distance, current_id, current_cell = heapq.heappop(open_set)
+        if current_id in settled:
+            continue
+        settled.add(current_id)
+        if current_id == target_id:
+            break
+
+        for neighbor in grid.get_neighbors(current_cell):
+            if not (min_x <= neighbor.x < max_x and min_y <= neighbor.y < max_y):
+                continue
+            neighbor_id = neighbor.y * width + neighbor.x
+            step_cost = current_cell.environment_type.cost if reverse else neighbor.environment_type.cost
+            tentative_distance = current_distance + step_cost
+            if tentative_distance < distance.get(neighbor_id, float('inf')):
+                distance[neighbor_id] = tentative_distance
+                parent[neighbor_id] = current_cell
+                heapq.heappush(open_set, (tentative_distance, neighbor_id, neighbor))
+
+    return {cell_id: distance[cell_id] for cell_id in settled}, parent
+
+
+class ClusterGraph:
+    """
+    The abstract graph used by hierarchical pathfinding (HPA*).
+    The grid is split into cluster_size x cluster_size clusters; entrance nodes sit on both sides of every
+    passable stretch of a cluster border, and edges carry exact terrain costs: one step across a border,
+    or the cheapest in-cluster route between two entrances of the same cluster.
+    Nodes are cell ids (y * width + x). Built once per map with build() and reusable via save()/load().
+    """
+
+    def __init__(self, width: int, height: int, cluster_size: int, edges: Dict[int, Dict[int, float]]):
+        self.width = width
+        self.height = height
+        self.cluster_size = cluster_size
+        self.edges = edges
+        self.cluster_nodes: Dict[Tuple[int, int], List[int]] = {}
+        for node_id in edges:
+            self.cluster_nodes.setdefault(self.cluster_of(node_id % width, node_id // width), []).append(node_id)
+
+    def cluster_of(self, x: int, y: int) -> Tuple[int, int]:
+        return x // self.cluster_size, y // self.cluster_size
+
+    def cluster_bounds(self, cluster: Tuple[int, int]) -> Bounds:
+        cluster_x, cluster_y = cluster
+        min_x, min_y = cluster_x * self.cluster_size, cluster_y * self.cluster_size
+        return min_x, min_y, min(min_x + self.cluster_size, self.width), min(min_y + self.cluster_size, self.height)
+
+    @classmethod
+    def build(cls, grid: Grid, cluster_size: int = 10) -> 'ClusterGraph':
+        """Precomputes entrance nodes and intra-cluster costs for the given grid."""
+        if cluster_size < 2:
+            raise ValueError("cluster_size must be at least 2.")
+
+        graph = cls(grid.width, grid.height, cluster_size, {})
+        width = grid.width
+
+        def add_edge(from_id: int, to_id: int, cost: float) -> None:
+            graph.edges.setdefault(to_id, {})
+            if cost < graph.edges.setdefault(from_id, {}).get(to_id, float('inf')):
+                graph.edges[from_id][to_id] = cost
+
+        def add_entrance(cell_a: Cell, cell_b: Cell) -> None:
+            id_a, id_b = cell_a.y * width + cell_a.x, cell_b.y * width + cell_b.x
+            add_edge(id_a, id_b, cell_b.environment_type.cost)
+            add_edge(id_b, id_a, cell_a.environment_type.cost)
+
+        def scan_border(pairs: List[Tuple[Cell, Cell]]) -> None:
+            segment: List[Tuple[Cell, Cell]] = []
+            for cell_a, cell_b in pairs + [(None, None)]:
+                if cell_a and not cell_a.environment_type.is_obstacle and not cell_b.environment_type.is_obstacle:
+                    segment.append((cell_a, cell_b))
+                    continue
+                if len(segment) >= WIDE_ENTRANCE_LENGTH:
+                    add_entrance(*segment[0])
+                    add_entrance(*segment[-1])
+                elif segment:
+                    add_entrance(*segment[len(segment) // 2])
+                segment = []
+
+        # Entrances on vertical borders (between horizontally adjacent clusters) and horizontal ones.
+        for border_x in range(cluster_size, grid.width, cluster_size):
+            for min_y in range(0, grid.height, cluster_size):
+                scan_border([(grid.get_cell(border_x - 1, y), grid.get_cell(border_x, y))
+                             for y in range(min_y, min(min_y + cluster_size, grid.height))])
+        for border_y in range(cluster_size, grid.height, cluster_size):
+            for min_x in range(0, grid.width, cluster_size):
+                scan_border([(grid.get_cell(x, border_y - 1), grid.get_cell(x, border_y))
+                             for x in range(min_x, min(min_x + cluster_size, grid.width))])
+
+        # Intra-cluster edges between every pair of entrances of the same cluster.
+        graph.cluster_nodes = {}
+        for node_id in graph.edges:
+            graph.cluster_nodes.setdefault(graph.cluster_of(node_id % width, node_id // width), []).append(node_id)
+        for cluster, node_ids in graph.cluster_nodes.items():
+            bounds = graph.cluster_bounds(cluster)
+            for node_id in node_ids:
+                distance, _ = _bounded_search(grid, grid.get_cell(node_id % width, node_id // width), bounds)
+                for other_id in node_ids:
+                    if other_id != node_id and other_id in distance:
+                        add_edge(node_id, other_id, distance[other_id])
+        return graph
+
+    def save(self, filepath: str) -> None:
+        """Writes the abstraction to a JSON file."""
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        data = {
+            "width": self.width,
+            "height": self.height,
+            "cluster_size": self.cluster_size,
+            "nodes": list(self.edges),
+            "edges": [[from_id, to_id, cost] for from_id, targets in self.edges.items()
+                      for to_id, cost in targets.items()],
+        }
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, filepath: str, grid: Optional[Grid] = None) -> 'ClusterGraph':
+        """Reads an abstraction written by save(), checking it against grid's dimensions if given."""
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if grid is not None and (grid.width, grid.height) != (data["width"], data["height"]):
+            raise ValueError(f"Cluster graph in '{filepath}' was built for a {data['width']}x{data['height']} map, "
+                             f"not {grid.width}x{grid.height}.")
+
+        edges: Dict[int, Dict[int, float]] = {node_id: {} for node_id in data["nodes"]}
+        for from_id, to_id, cost in data["edges"]:
+            edges[from_id][to_id] = cost
+        return cls(data["width"], data["height"], data["cluster_size"], edges)
+
+
+class HierarchicalPathfinder:
+
+    # Hierarchical pathfinding (HPA*): searches the abstract cluster graph first, then refines
+    # only the segments of the coarse path it returns. Paths are near-optimal, not guaranteed optimal.
+
+    def __init__(self, grid: Grid, graph: Optional[ClusterGraph] = None, cluster_size: int = 10):
+        self.grid = grid
+        self.graph = graph if graph is not None else ClusterGraph.build(grid, cluster_size)
+        passable_costs = [env.cost for env in grid.symbol_to_environment.values() if not env.is_obstacle]
+        self._min_cost = min(passable_costs) if passable_costs else 1.0
+
+    def _heuristic(self, cell_id: int, end_cell: Cell) -> float:
+        width = self.grid.width
+        return (abs(cell_id % width - end_cell.x) + abs(cell_id // width - end_cell.y)) * self._min_cost
+
+    def find_coarse_path(self, start_cell: Cell, end_cell: Cell) -> Optional[List[Cell]]:
+        """
+        Finds the abstract path: start, the entrance nodes it passes through, and end.
+        Returns the waypoints as Cells (g_score holds the cost so far), or None if no path is found.
+        """
+        grid = self.grid
+        graph = self.graph
+        width = grid.width
+        start_id = start_cell.y * width + start_cell.x
+        end_id = end_cell.y * width + end_cell.x
+
+        start_cluster = graph.cluster_of(start_cell.x, start_cell.y)
+        end_cluster = graph.cluster_of(end_cell.x, end_cell.y)
+        start_distance, _ = _bounded_search(grid, start_cell, graph.cluster_bounds(start_cluster))
+        end_distance, _ = _bounded_search(grid, end_cell, graph.cluster_bounds(end_cluster), reverse=True)
+
+        g_score: Dict[int, float] = {}
+        came_from: Dict[int, int] = {}
+        open_set = []
+
+        # Temporarily connect start and end to the entrances of their clusters.
+        if start_cluster == end_cluster and end_id in start_distance:
+            g_score[end_id] = start_distance[end_id]
+            came_from[end_id] = start_id
+            heapq.heappush(open_set, (g_score[end_id], end_id))
+        for node_id in graph.cluster_nodes.get(start_cluster, []):
+            if node_id in start_distance and start_distance[node_id] < g_score.get(node_id, float('inf')):
+                g_score[node_id] = start_distance[node_id]
+                came_from[node_id] = start_id
+                heapq.heappush(open_set, (g_score[node_id] + self._heuristic(node_id, end_cell), node_id))
+
+        closed_set = set()
+        while open_set:
+            _, current_id = heapq.heappop(open_set)
+            if current_id == end_id:
+                return self._coarse_path(start_id, end_id, came_from, g_score)
+            if current_id in closed_set:
+                continue
+            closed_set.add(current_id)
+
+            targets = list(graph.edges.get(current_id, {}).items())
+            if current_id in end_distance:
+                targets.append((end_id, end_distance[current_id]))
+            for neighbor_id, cost in targets:
+                if neighbor_id in closed_set:
+                    continue
+                tentative_g_score = g_score[current_id] + cost
+                if tentative_g_score < g_score.get(neighbor_id, float('inf')):
+                    g_score[neighbor_id] = tentative_g_score
+                    came_from[neighbor_id] = current_id
+                    heapq.heappush(open_set, (tentative_g_score + self._heuristic(neighbor_id, end_cell),
+                                              neighbor_id))
+        return None
+
+    def _coarse_path(self, start_id: int, end_id: int, came_from: Dict[int, int],
+                     g_score: Dict[int, float]) -> List[Cell]:
+        width = self.grid.width
+        node_ids = [end_id]
+        while node_ids[-1] != start_id:
+            node_ids.append(came_from[node_ids[-1]])
+        node_ids.reverse()
+
+        waypoints = []
+        for node_id in node_ids:
+            cell = self.grid.get_cell(node_id % width, node_id // width)
+            waypoint = Cell(cell.x, cell.y, cell.environment_type)
+            waypoint.g_score = g_score.get(node_id, 0.0) if node_id != start_id else 0.0
+            waypoints.append(waypoint)
+        return waypoints
+
+    def refine(self, coarse_path: List[Cell]) -> Iterator[Cell]:
+        """
+        Lazily expands a coarse path into grid cells, one segment at a time.
+        Yields fresh Cells with g_score and parent set, as AStarPathfinder.find_path returns them.
+        """
+        grid = self.grid
+        width = grid.width
+        previous: Optional[Cell] = None
+        for index, waypoint in enumerate(coarse_path):
+            if previous is None:
+                step = Cell(waypoint.x, waypoint.y, waypoint.environment_type)
+                step.g_score = step.f_score = 0.0
+                previous = step
+                yield step
+                continue
+
+            # Consecutive waypoints are either adjacent across a border or inside one cluster.
+            source = coarse_path[index - 1]
+            bounds = self.graph.cluster_bounds(self.graph.cluster_of(source.x, source.y))
+            if abs(source.x - waypoint.x) + abs(source.y - waypoint.y) == 1:
+                segment = [waypoint]
+            else:
+                _, parent = _bounded_search(grid, source, bounds, target=waypoint)
+                segment = []
+                cell = waypoint
+                while (cell.x, cell.y) != (source.x, source.y):
+                    segment.append(cell)
+                    cell = parent[cell.y * width + cell.x]
+                segment.reverse()
+
+            for cell in segment:
+                step = Cell(cell.x, cell.y, cell.environment_type)
+                step.g_score = step.f_score = previous.g_score + cell.environment_type.cost
+                step.parent = previous
+                previous = step
+                yield step
+
+    def find_path(self, start_cell: Cell, end_cell: Cell) -> Optional[List[Cell]]:
+        """
+        Finds a path from start_cell to end_cell through the cluster graph, fully refined.
+        Returns a list of Cells in the same format as AStarPathfinder.find_path, or None if no path is found.
+        """
+        coarse_path = self.find_coarse_path(start_cell, end_cell)
+        if coarse_path is None:
+            return None
+        return list(self.refine(coarse_path))
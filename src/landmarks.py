@@ -0,0 +1,178 @@
+import json
+import os
+import zlib
+from array import array
+from typing import Dict, List, Tuple
+
+from src.components import ComponentIndex
+from src.environment import Environment
+from src.flow_field import cost_field
+from src.grid import Grid
+
+INFINITY = float('inf')
+
+
+def landmark_path_for(map_filepath: str) -> str:
+    """Where the landmark tables of a map file are stored: next to it, with a .landmarks extension."""
+    return os.path.splitext(map_filepath)[0] + ".landmarks"
+
+
+def _grid_checksum(grid: Grid) -> int:
+    return zlib.crc32(grid.cost_array().tobytes())
+
+
+class LandmarkTable:
+    """
+    Precomputed distances for the ALT (A*, Landmarks, Triangle inequality) heuristic.
+    For each landmark L it stores the cost from L to every cell and from every cell to L, so that
+    d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L) give admissible lower bounds that are
+    far tighter than Manhattan distance on expensive terrain.
+    The table stops returning bounds (stale is set) once the grid's terrain changes.
+    """
+
+    def __init__(self, grid: Grid, landmarks: List[Tuple[int, int]], from_landmark: List[array],
+                 to_landmark: List[array]):
+        self.grid = grid
+        self.landmarks = landmarks
+        self.from_landmark = from_landmark
+        self.to_landmark = to_landmark
+        self.stale = False
+        grid.add_change_listener(self._on_cell_changed)
+
+    def _on_cell_changed(self, x: int, y: int, old_environment: Environment, new_environment: Environment) -> None:
+        self.stale = True
+
+    @classmethod
+    def build(cls, grid: Grid, count: int = 8) -> 'LandmarkTable':
+        """
+        Picks count landmarks by farthest-point selection (each new landmark is the reachable cell
+        farthest from all landmarks chosen so far) and computes their distance arrays.
+        Landmarks only bound queries within their own connected component, so the budget is shared
+        between components by size and the largest one always gets at least one.
+        """
+        landmarks: List[Tuple[int, int]] = []
+        from_landmark: List[array] = []
+        to_landmark: List[array] = []
+        if count < 1:
+            return cls(grid, landmarks, from_landmark, to_landmark)
+
+        mask = grid.passable_mask()
+        components = ComponentIndex(grid.width, grid.height, mask)
+        sizes: Dict[int, int] = {}
+        first_cell: Dict[int, int] = {}
+        for cell_id, passable in enumerate(mask):
+            if passable:
+                component = components.component(cell_id)
+                sizes[component] = sizes.get(component, 0) + 1
+                first_cell.setdefault(component, cell_id)
+
+        if not sizes:
+            return cls(grid, landmarks, from_landmark, to_landmark)
+
+        # Smaller components get their proportional share; the largest takes whatever is left.
+        by_size = sorted(sizes, key=sizes.get, reverse=True)
+        total = sum(sizes.values())
+        shares = {}
+        for component in by_size[1:]:
+            share = min(round(count * sizes[component] / total), count - 1 - sum(shares.values()))
+            if share < 1:
+                break
+            shares[component] = share
+        shares[by_size[0]] = count - sum(shares.values())
+        for component in by_size:
+            if component in shares:
+                cls._select(grid, first_cell[component], shares[component], landmarks, from_landmark, to_landmark)
+
+        return cls(grid, landmarks, from_landmark, to_landmark)
+
+    @staticmethod
+    def _select(grid: Grid, seed_id: int, count: int, landmarks: List[Tuple[int, int]],
+                from_landmark: List[array], to_landmark: List[array]) -> None:
+        """Adds up to count landmarks from the component of seed_id, with their distance arrays."""
+        width = grid.width
+        # Seed the selection with the cell farthest from an arbitrary cell of the component.
+        min_distance = cost_field(grid, (seed_id % width, seed_id // width))
+        for _ in range(count):
+            best_id, best_distance = -1, 0.0
+            for cell_id, distance in enumerate(min_distance):
+                if best_distance < distance < INFINITY:
+                    best_id, best_distance = cell_id, distance
+            if best_id == -1:
+                break  # every reachable cell already is a landmark
+
+            landmark = (best_id % width, best_id // width)
+            landmarks.append(landmark)
+            from_landmark.append(cost_field(grid, landmark))
+            to_landmark.append(cost_field(grid, landmark, reverse=True))
+            min_distance = array('d', map(min, min_distance, from_landmark[-1]))
+
+    def lower_bound(self, cell_id: int, target_id: int) -> float:
+        """Best triangle-inequality lower bound on the cost from cell_id to target_id (0 if none applies)."""
+        if self.stale:
+            return 0.0
+        bound = 0.0
+        for from_landmark, to_landmark in zip(self.from_landmark, self.to_landmark):
+            from_target, from_cell = from_landmark[target_id], from_landmark[cell_id]
+            if from_target < INFINITY and from_cell < INFINITY and from_target - from_cell > bound:
+                bound = from_target - from_cell
+            to_cell, to_target = to_landmark[cell_id], to_landmark[target_id]
+            if to_cell < INFINITY and to_target < INFINITY and to_cell - to_target > bound:
+                bound = to_cell - to_target
+        return bound
+
+    def save(self, filepath: str) -> None:
+        """
+        Writes the tables: one JSON header line (dimensions, terrain checksum, landmarks) followed by
+        the raw distance arrays.
+        """
+        header = {
+            "width": self.grid.width,
+            "height": self.grid.height,
+            "checksum": _grid_checksum(self.grid),
+            "landmarks": self.landmarks,
+        }
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b"\n")
+            for from_landmark, to_landmark in zip(self.from_landmark, self.to_landmark):
+                from_landmark.tofile(f)
+                to_landmark.tofile(f)
+
+    @classmethod
+    def load(cls, filepath: str, grid: Grid) -> 'LandmarkTable':
+        """Reads tables written by save(), refusing them if they were built for different terrain."""
+        with open(filepath, 'rb') as f:
+            header = json.loads(f.readline().decode('utf-8'))
+            if (header["width"], header["height"]) != (grid.width, grid.height) \
+                    or header["checksum"] != _grid_checksum(grid):
+                raise ValueError(f"Landmark tables in '{filepath}' were built for a different map.")
+
+            size = grid.width * grid.height
+            from_landmark, to_landmark = [], []
+            for _ in header["landmarks"]:
+                for tables in (from_landmark, to_landmark):
+                    table = array('d')
+                    table.fromfile(f, size)
+                    tables.append(table)
+
+        return cls(grid, [tuple(landmark) for landmark in header["landmarks"]], from_landmark, to_landmark)
+
+    @classmethod
+    def load_or_build(cls, map_filepath: str, grid: Grid, count: int = 8) -> 'LandmarkTable':
+        """Loads the tables stored next to map_filepath, or builds and stores them if missing or outdated."""
+        filepath = landmark_path_for(map_filepath)
+        if os.path.exists(filepath):
+            try:
+                table = cls.load(filepath, grid)
+                if len(table.landmarks) >= count:
+                    return table
+                table.close()
+            except (ValueError, EOFError, KeyError, json.JSONDecodeError):
+                pass
+        table = cls.build(grid, count)
+        table.save(filepath)
+        return table
+
+    def close(self) -> None:
+        """Stops listening to terrain changes on the grid."""
+        self.grid.remove_change_listener(self._on_cell_changed)
@@ -0,0 +1,184 @@
+import argparse
+import mmap
+import os
+import struct
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from src.compact_grid import CompactGrid, MAX_ENVIRONMENTS, encode_map_rows
+from src.environment import Environment, SYMBOL_TO_ENVIRONMENT
+from src.grid import Grid
+
+# Binary map layout (little-endian):
+#   header:      magic "PFMB", version (u16), data offset (u32), width (u32), height (u32), environment count (u16)
+#   environment: cost (f64), is_obstacle (u8), name length (u16) + UTF-8 name, symbol length (u8) + UTF-8 symbol
+#   data:        width * height bytes, row-major, each the index of the cell's environment in the table
+MAGIC = b"PFMB"
+VERSION = 1
+_HEADER = struct.Struct("<4sHIIIH")
+_ENVIRONMENT = struct.Struct("<dBH")
+
+
+def _encode_environment_table(environments: List[Environment]) -> bytes:
+    table = bytearray()
+    for env in environments:
+        name = env.name.encode('utf-8')
+        symbol = env.symbol.encode('utf-8')
+        table += _ENVIRONMENT.pack(env.cost, env.is_obstacle, len(name)) + name
+        table += bytes([len(symbol)]) + symbol
+    return bytes(table)
+
+
+class BinaryMapWriter:
+    """
+    Streams a binary map to disk one row at a time, so maps never have to fit in memory.
+    Rows go to "<filepath>.tmp"; close() patches width and height into its header and moves it into place,
+    while abort() (or an exception in a with block) deletes it, so a failed write never leaves a map behind.
+    """
+
+    def __init__(self, filepath: str, environments: List[Environment]):
+        if len(environments) > MAX_ENVIRONMENTS:
+            raise ValueError(f"At most {MAX_ENVIRONMENTS} environment types are supported.")
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        self.filepath = filepath
+        self.environments = environments
+        self.width: Optional[int] = None
+        self.height = 0
+
+        table = _encode_environment_table(environments)
+        self._data_offset = _HEADER.size + len(table)
+        self._temporary_path = filepath + ".tmp"
+        self._file: BinaryIO = open(self._temporary_path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, self._data_offset, 0, 0, len(environments)) + table)
+
+    def write_row(self, row: bytes) -> None:
+        """Appends one row of environment indices."""
+        if self.width is None:
+            self.width = len(row)
+        elif len(row) != self.width:
+            raise ValueError(f"Row {self.height} has {len(row)} cells, expected {self.width}.")
+        self._file.write(row)
+        self.height += 1
+
+    def write_rows(self, rows: bytes) -> None:
+        """Appends several whole rows given as one contiguous block (width must already be known)."""
+        if self.width is None or len(rows) % self.width:
+            raise ValueError("write_rows needs whole rows of a known width; write the first row with write_row.")
+        self._file.write(rows)
+        self.height += len(rows) // self.width
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, VERSION, self._data_offset, self.width or 0, self.height,
+                                      len(self.environments)))
+        self._file.close()
+        os.replace(self._temporary_path, self.filepath)
+
+    def abort(self) -> None:
+        """Discards everything written so far; any existing file at filepath is left untouched."""
+        if self._file.closed:
+            return
+        self._file.close()
+        os.remove(self._temporary_path)
+
+    def __enter__(self) -> 'BinaryMapWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def convert_text_map(text_filepath: str, binary_filepath: str,
+                     symbol_to_environment: Dict[str, Environment] = SYMBOL_TO_ENVIRONMENT) -> None:
+    """Converts a text map to the binary format, streaming it row by row."""
+    if not os.path.exists(text_filepath):
+        raise FileNotFoundError(f"Map file not found at '{text_filepath}'")
+
+    with open(text_filepath, 'r', encoding='utf-8') as f, \
+            BinaryMapWriter(binary_filepath, list(symbol_to_environment.values())) as writer:
+        for row in encode_map_rows((line.strip() for line in f if line.strip()), symbol_to_environment):
+            writer.write_row(row)
+        if not writer.height:
+            raise ValueError("Map data cannot be empty.")
+
+
+def save_binary_map(grid: Grid, binary_filepath: str) -> None:
+    """Writes any grid backend to the binary format."""
+    compact_grid = CompactGrid.from_grid(grid)
+    with BinaryMapWriter(binary_filepath, compact_grid.environments) as writer:
+        writer.write_row(bytes(compact_grid.terrain[:compact_grid.width]))
+        writer.write_rows(bytes(compact_grid.terrain[compact_grid.width:]))
+
+
+def read_binary_header(f: BinaryIO, symbol_to_environment: Optional[Dict[str, Environment]] = None) \
+        -> Tuple[int, int, int, List[Environment]]:
+    """
+    Reads the header of an open binary map file.
+    Returns (data offset, width, height, environment table); see load_binary_map for symbol_to_environment.
+    """
+    name = getattr(f, 'name', 'binary map')
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"'{name}' is not a binary map file.")
+    magic, version, data_offset, width, height, environment_count = _HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"'{name}' is not a binary map file.")
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary map version {version} in '{name}'.")
+
+    environments = []
+    for _ in range(environment_count):
+        cost, is_obstacle, name_length = _ENVIRONMENT.unpack(f.read(_ENVIRONMENT.size))
+        env_name = f.read(name_length).decode('utf-8')
+        symbol = f.read(f.read(1)[0]).decode('utf-8')
+        known = symbol_to_environment.get(symbol) if symbol_to_environment else None
+        environments.append(known if known is not None else Environment(env_name, cost, bool(is_obstacle), symbol))
+    return data_offset, width, height, environments
+
+
+def load_binary_map(binary_filepath: str,
+                    symbol_to_environment: Optional[Dict[str, Environment]] = None) -> CompactGrid:
+    """
+    Opens a binary map as a CompactGrid whose terrain is a private (copy-on-write) memory map of the file:
+    opening is O(1) in the map size and pages are read only when a search touches them.
+    Edits through set_environment stay in memory and never reach the file.
+    If symbol_to_environment is given, its Environment objects are used for matching symbols.
+    """
+    if not os.path.exists(binary_filepath):
+        raise FileNotFoundError(f"Map file not found at '{binary_filepath}'")
+
+    with open(binary_filepath, 'rb') as f:
+        data_offset, width, height, environments = read_binary_header(f, symbol_to_environment)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    if len(mapped) < data_offset + width * height:
+        raise ValueError(f"Binary map '{binary_filepath}' is truncated.")
+    terrain = memoryview(mapped)[data_offset:data_offset + width * height]
+    return CompactGrid.from_terrain(width, height, terrain, environments)
+
+
+def load_map(filepath: str, symbol_to_environment: Dict[str, Environment] = SYMBOL_TO_ENVIRONMENT) -> CompactGrid:
+    """Loads a binary (.pfm) or text map as a CompactGrid."""
+    if filepath.endswith(".pfm"):
+        return load_binary_map(filepath, symbol_to_environment)
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"Map file not found at '{filepath}'")
+    return CompactGrid.from_file(filepath, symbol_to_environment)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a text map to the binary map format.")
+    parser.add_argument("text_map", help="Path of the text map to read, e.g. maps/map.txt")
+    parser.add_argument("binary_map", help="Path of the binary map to write, e.g. maps/map.pfm")
+    args = parser.parse_args()
+
+    convert_text_map(args.text_map, args.binary_map)
+    print(f"Binary map saved to '{args.binary_map}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import os
+import random
+import re
+from typing import Callable, Dict, Iterator, List, Optional
+
+from src.environment import (
+    GROUND_SYMBOL, MUD_SYMBOL, ROCK_SYMBOL, SYMBOL_TO_ENVIRONMENT, TREE_SYMBOL, WATER_SYMBOL, Environment)
+from src.map_format import BinaryMapWriter
+
+# Rows are generated in blocks of about this many cells, so memory use does not depend on the map size.
+BLOCK_CELLS = 1 << 20
+
+RowBlocks = Iterator[bytes]  # blocks of whole rows, one environment index per cell
+
+# Relative frequency of each environment symbol when no other probabilities are given.
+DEFAULT_PROBABILITIES = {
+    GROUND_SYMBOL: 0.5,
+    WATER_SYMBOL: 0.2,
+    MUD_SYMBOL: 0.2,
+    ROCK_SYMBOL: 0.05,
+    TREE_SYMBOL: 0.05
+}
+
+# Ensure probabilities sum to 1.0 (or close enough due to float precision)
+if not (0.99 <= sum(DEFAULT_PROBABILITIES.values()) <= 1.01):
+    raise ValueError("Sum of DEFAULT_PROBABILITIES must be approximately 1.0")
+
+
+def parse_probabilities(terrain: List[str], defaults: Dict[str, float] = DEFAULT_PROBABILITIES,
+                        symbol_to_environment: Dict[str, Environment] = SYMBOL_TO_ENVIRONMENT) -> Dict[str, float]:
+    """
+    Parses NAME=PROBABILITY pairs such as "water=0.3" (environment names or symbols) into a
+    symbol -> probability dict. Terrain types that are not listed keep their probability from defaults.
+    """
+    by_name = {env.name.lower(): symbol for symbol, env in symbol_to_environment.items()}
+    probabilities = dict(defaults)
+    for pair in terrain:
+        name, _, value = pair.partition("=")
+        symbol = by_name.get(name.lower(), name)
+        if symbol not in symbol_to_environment or not value:
+            raise ValueError(f"Invalid terrain probability '{pair}'; expected e.g. water=0.2.")
+        probabilities[symbol] = float(value)
+    return probabilities
+
+
+def _sampling_table(environments: List[Environment], probabilities: Dict[str, float],
+                    passable_only: bool = False) -> bytes:
+    """
+    Builds a 256-entry translation table from a random byte to an environment index, so that a block of
+    random bytes becomes a block of terrain with one bytes.translate call.
+    Probabilities are rounded to multiples of 1/256; every terrain with a non-zero probability keeps at
+    least one slot.
+    """
+    symbols = [env.symbol for env in environments]
+    weights = {}
+    for symbol, probability in probabilities.items():
+        if symbol not in symbols:
+            raise ValueError(f"Unknown environment symbol '{symbol}' in terrain probabilities.")
+        if probability < 0:
+            raise ValueError(f"Probability of '{symbol}' must not be negative.")
+        index = symbols.index(symbol)
+        if probability > 0 and not (passable_only and environments[index].is_obstacle):
+            weights[index] = probability
+    if not weights:
+        raise ValueError("At least one " + ("passable " if passable_only else "") +
+                         "terrain type needs a probability above zero.")
+
+    total = sum(weights.values())
+    slots = {index: max(1, int(weight / total * 256)) for index, weight in weights.items()}
+    # Hand the slots lost to rounding to the terrains with the largest remainders (or take surplus from the largest).
+    by_remainder = sorted(weights, key=lambda index: weights[index] / total * 256 - slots[index], reverse=True)
+    while sum(slots.values()) < 256:
+        for index in by_remainder[:256 - sum(slots.values())]:
+            slots[index] += 1
+    while sum(slots.values()) > 256:
+        slots[max(slots, key=slots.get)] -= 1
+
+    table = bytearray()
+    for index, count in slots.items():
+        table += bytes([index]) * count
+    return bytes(table)
+
+
+def _select(mask: bytes, if_set: bytes, if_clear: bytes) -> bytes:
+    """Per byte, takes if_set where mask is 0xFF and if_clear where it is 0x00 (mask holds only those values)."""
+    bits = int.from_bytes(mask, 'little')
+    return ((int.from_bytes(if_set, 'little') & bits) |
+            (int.from_bytes(if_clear, 'little') & ~bits)).to_bytes(len(mask), 'little')
+
+
+def _threshold_table(probability: float) -> bytes:
+    """Translation table turning a random byte into 0xFF with the given probability and 0x00 otherwise."""
+    cutoff = round(probability * 256)
+    return b"\xff" * cutoff + b"\x00" * (256 - cutoff)
+
+
+def random_rows(width: int, height: int, environments: List[Environment], probabilities: Dict[str, float],
+                rng: random.Random) -> RowBlocks:
+    """Independent random terrain per cell."""
+    table = _sampling_table(environments, probabilities)
+    block_rows = max(1, BLOCK_CELLS // width)
+    for y in range(0, height, block_rows):
+        yield rng.randbytes(min(block_rows, height - y) * width).translate(table)
+
+
+def clustered_rows(width: int, height: int, environments: List[Environment], probabilities: Dict[str, float],
+                   rng: random.Random, cluster_size: int = 16, noise: float = 0.1) -> RowBlocks:
+    """
+    Patches of the same terrain about cluster_size cells across: a coarse random map, scaled up with every
+    band of rows shifted sideways by a random offset, with a fraction noise of cells redrawn at random.
+    """
+    if cluster_size < 1:
+        raise ValueError("cluster_size must be at least 1.")
+    table = _sampling_table(environments, probabilities)
+    noise_table = _threshold_table(noise)
+    repeated = [bytes([index]) * cluster_size for index in range(256)]
+    coarse_width = width // cluster_size + 2
+
+    for y in range(0, height, cluster_size):
+        shift = rng.randrange(cluster_size)
+        coarse = rng.randbytes(coarse_width).translate(table)
+        band = b"".join(map(repeated.__getitem__, coarse))[shift:shift + width]
+        rows = min(cluster_size, height - y)
+        cells = band * rows
+        yield _select(rng.randbytes(len(cells)).translate(noise_table),
+                      rng.randbytes(len(cells)).translate(table), cells)
+
+
+def _wall_index(environments: List[Environment], probabilities: Dict[str, float]) -> int:
+    """The obstacle used for walls: the most likely obstacle in probabilities, else the first one known."""
+    obstacles = [i for i, env in enumerate(environments) if env.is_obstacle]
+    if not obstacles:
+        raise ValueError("Mazes need an obstacle terrain type for walls.")
+    return max(obstacles, key=lambda i: probabilities.get(environments[i].symbol, 0.0))
+
+
+def maze_rows(width: int, height: int, environments: List[Environment], probabilities: Dict[str, float],
+              rng: random.Random) -> RowBlocks:
+    """
+    A perfect maze (exactly one route between any two open cells) built row by row with the sidewinder
+    algorithm. Maze cells sit at even (x, y); the cells in between are walls or carved passages.
+    Passages get random passable terrain from probabilities, walls the most likely obstacle.
+    """
+    floor_table = _sampling_table(environments, probabilities, passable_only=True)
+    wall_row = bytes([_wall_index(environments, probabilities)]) * width
+    maze_width = (width + 1) // 2
+    # Random bytes -> 0xFF (carve east) or 0x00 (close the run), half and half.
+    carve_table = _threshold_table(0.5)
+
+    def row_from(open_mask: bytearray) -> bytes:
+        return _select(bytes(open_mask[:width]), rng.randbytes(width).translate(floor_table), wall_row)
+
+    for maze_y in range(0, (height + 1) // 2):
+        open_mask = bytearray(2 * maze_width)
+        if maze_y == 0:
+            open_mask[:] = b"\xff" * len(open_mask)
+        else:
+            east = bytearray(rng.randbytes(maze_width).translate(carve_table))
+            east[-1] = 0
+            open_mask[0::2] = b"\xff" * maze_width
+            open_mask[1::2] = east
+
+            north = bytearray(len(open_mask))
+            run_start = 0
+            for run_end in (match.start() for match in re.finditer(b"\x00", east)):
+                north[2 * rng.randint(run_start, run_end)] = 0xFF
+                run_start = run_end + 1
+            yield row_from(north)
+
+        if maze_y == 0:
+            open_mask[-1] = 0
+        if 2 * maze_y < height:
+            yield row_from(open_mask)
+    if height % 2 == 0:
+        yield wall_row
+
+
+def corridor_rows(width: int, height: int, environments: List[Environment], probabilities: Dict[str, float],
+                  rng: random.Random, spacing: int = 32, corridor_width: int = 2) -> RowBlocks:
+    """
+    Random terrain (typically obstacle-heavy) cut by a lattice of straight horizontal and vertical corridors of
+    the cheapest passable terrain, about spacing cells apart.
+    """
+    if spacing < 1 or corridor_width < 1:
+        raise ValueError("spacing and corridor_width must be at least 1.")
+    table = _sampling_table(environments, probabilities)
+    passable = [i for i, env in enumerate(environments) if not env.is_obstacle]
+    if not passable:
+        raise ValueError("Corridors need a passable terrain type.")
+    floor_row = bytes([min(passable, key=lambda i: environments[i].cost)]) * width
+
+    def corridor_mask(length: int) -> bytearray:
+        mask = bytearray(length)
+        position = rng.randrange(spacing)
+        while position < length:
+            mask[position:position + corridor_width] = b"\xff" * len(mask[position:position + corridor_width])
+            position += corridor_width + rng.randint((spacing + 1) // 2, spacing + spacing // 2)
+        return mask
+
+    columns = bytes(corridor_mask(width))
+    rows = corridor_mask(height)
+    for y in range(height):
+        yield floor_row if rows[y] else _select(columns, floor_row, rng.randbytes(width).translate(table))
+
+
+GENERATORS: Dict[str, Callable[..., RowBlocks]] = {
+    "random": random_rows,
+    "clustered": clustered_rows,
+    "maze": maze_rows,
+    "corridors": corridor_rows,
+}
+
+
+def _write_text(blocks: RowBlocks, width: int, filepath: str, environments: List[Environment]) -> None:
+    symbols = [env.symbol for env in environments]
+    if all(len(symbol) == 1 and ord(symbol) < 256 for symbol in symbols):
+        # Single-byte symbols ('§' included) translate straight from environment indices to latin-1 text.
+        symbol_table = bytearray(256)
+        symbol_table[:len(symbols)] = bytes(ord(symbol) for symbol in symbols)
+
+        def to_text(block: bytes) -> str:
+            text = block.translate(symbol_table)
+            return b"".join(text[i:i + width] + b"\n" for i in range(0, len(text), width)).decode('latin-1')
+    else:
+        def to_text(block: bytes) -> str:
+            return "".join("".join(map(symbols.__getitem__, block[i:i + width])) + "\n"
+                           for i in range(0, len(block), width))
+
+    with open(filepath, 'w', encoding='utf-8') as f:  # Keep UTF-8 encoding for '■' and '§'
+        for block in blocks:
+            f.write(to_text(block))
+
+
+def _write_binary(blocks: RowBlocks, width: int, filepath: str, environments: List[Environment]) -> None:
+    with BinaryMapWriter(filepath, environments) as writer:
+        for block in blocks:
+            if writer.width is None:
+                writer.write_row(block[:width])
+                block = block[width:]
+            if block:
+                writer.write_rows(block)
+
+
+def generate_map(filepath: str, width: int, height: int, probabilities: Dict[str, float],
+                 generator: str = "random", seed: Optional[int] = None, binary: bool = False,
+                 symbol_to_environment: Dict[str, Environment] = SYMBOL_TO_ENVIRONMENT, **options) -> None:
+    """
+    Generates a width x height map and streams it to filepath, as a text map or in the binary map format.
+    probabilities maps environment symbols to their relative frequency. The same seed always gives the same map.
+    options are passed on to the generator (cluster_size and noise for "clustered", spacing and
+    corridor_width for "corridors").
+    """
+    if width < 1 or height < 1:
+        raise ValueError("Map width and height must be at least 1.")
+    if generator not in GENERATORS:
+        raise ValueError(f"Unknown map generator '{generator}'; choose one of {', '.join(GENERATORS)}.")
+
+    environments = list(symbol_to_environment.values())
+    blocks = GENERATORS[generator](width, height, environments, probabilities, random.Random(seed), **options)
+    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+    (_write_binary if binary else _write_text)(blocks, width, filepath, environments)
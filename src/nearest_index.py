@@ -0,0 +1,152 @@
+import heapq
+from array import array
+from typing import List
+
+NO_CELL = -1
+_FAR = 2 ** 31 - 1  # distance reported when the grid has no passable cell at all
+
+
+class NearestPassableIndex:
+    """
+    Nearest-passable-cell lookup table (a Manhattan distance transform) for a grid.
+    Cells are addressed by row-major id (y * width + x). For every cell the table holds one integer,
+    distance * cell count + id of the nearest passable cell (the cell itself if it is passable), so
+    snapping a coordinate is O(1) with no radius limit, and ties always go to the lowest cell id.
+    Cells changing passability update only the affected part of the table.
+    """
+
+    def __init__(self, width: int, height: int, passable: bytearray):
+        self.width = width
+        self.height = height
+        self.passable = passable
+        self._count = width * height
+        self._none = _FAR * self._count  # keys at or above this mean "no passable cell"
+        self.keys = array('q')
+        self._build()
+
+    def _neighbor_ids(self, cell_id: int) -> List[int]:
+        x, y = cell_id % self.width, cell_id // self.width
+        neighbors = []
+        if y < self.height - 1:
+            neighbors.append(cell_id + self.width)
+        if y > 0:
+            neighbors.append(cell_id - self.width)
+        if x < self.width - 1:
+            neighbors.append(cell_id + 1)
+        if x > 0:
+            neighbors.append(cell_id - 1)
+        return neighbors
+
+    def _build(self) -> None:
+        """
+        Builds the table as a separable L1 distance transform: distances along each row first (one slice per
+        run of obstacles), then one pass down and one up the columns, each combining a run with the same
+        slice of the neighbor row through a C-level min() per cell.
+        """
+        width, height, passable = self.width, self.height, self.passable
+        step = self._count.__add__  # one more step away from the same nearest cell
+        rows = []
+        row_runs = []  # passable cells are their own nearest cell, so the column passes only touch these runs
+        for y in range(height):
+            offset = y * width
+            row = array('q', range(offset, offset + width))
+            runs = []
+            row_mask = bytes(passable[offset:offset + width])  # any buffer, e.g. a shared memoryview
+            start = row_mask.find(0)
+            while start != -1:
+                end = row_mask.find(1, start)
+                if end == -1:
+                    end = width
+                row[start:end] = self._run_keys(offset + start, offset + end, offset)
+                if rows:
+                    row[start:end] = array('q', map(min, row[start:end], map(step, rows[-1][start:end])))
+                runs.append((start, end))
+                start = row_mask.find(0, end)
+            rows.append(row)
+            row_runs.append(runs)
+
+        for y in range(height - 2, -1, -1):
+            row, below = rows[y], rows[y + 1]
+            for start, end in row_runs[y]:
+                row[start:end] = array('q', map(min, row[start:end], map(step, below[start:end])))
+        for row in rows:
+            self.keys.extend(row)
+
+    def _run_keys(self, run_start: int, run_end: int, offset: int) -> array:
+        """Keys from row distances alone for the run of obstacles [run_start, run_end) of the row at offset."""
+        count = self._count
+        has_left, has_right = run_start > offset, run_end < offset + self.width
+        if not has_left and not has_right:
+            return array('q', [self._none]) * (run_end - run_start)  # the column passes fill these in
+        if not has_left:
+            split = run_start
+        elif not has_right:
+            split = run_end
+        else:
+            split = (run_start + run_end + 1) // 2  # cells before split are at least as close to the left
+        left_id, right_id = run_start - 1, run_end
+        keys = array('q', range((run_start - left_id) * count + left_id, (split - left_id) * count + left_id, count))
+        keys.extend(range((run_end - split) * count + right_id, right_id, -count))
+        return keys
+
+    def nearest(self, cell_id: int) -> int:
+        """Returns the id of the nearest passable cell, or NO_CELL if the grid has none."""
+        key = self.keys[cell_id]
+        return key % self._count if key < self._none else NO_CELL
+
+    def distance(self, cell_id: int) -> int:
+        """Returns the Manhattan distance to the nearest passable cell (0 for passable cells)."""
+        key = self.keys[cell_id]
+        return key // self._count if key < self._none else _FAR
+
+    def update_cell(self, cell_id: int, passable: bool) -> None:
+        """Updates the table after one cell changed passability."""
+        keys, count = self.keys, self._count
+        was_passable = keys[cell_id] == cell_id
+        self.passable[cell_id] = 1 if passable else 0
+        if passable == was_passable:
+            return
+
+        if passable:
+            # A new source: a breadth-first pass over the obstacle cells that are now closer to it.
+            keys[cell_id] = cell_id
+            frontier = [cell_id]
+            while frontier:
+                next_frontier = []
+                for current_id in frontier:
+                    key = keys[current_id] + count
+                    for neighbor_id in self._neighbor_ids(current_id):
+                        if not self.passable[neighbor_id] and keys[neighbor_id] > key:
+                            keys[neighbor_id] = key
+                            next_frontier.append(neighbor_id)
+                frontier = next_frontier
+            return
+
+        # The cells that snapped to this one form a connected region around it (each has a neighbor one step
+        # closer with the same nearest cell). Re-solve just that region from its border, which is still valid.
+        stale = [cell_id]
+        keys[cell_id] = self._none
+        for stale_id in stale:
+            for neighbor_id in self._neighbor_ids(stale_id):
+                key = keys[neighbor_id]
+                if key < self._none and key % count == cell_id:
+                    keys[neighbor_id] = self._none
+                    stale.append(neighbor_id)
+
+        queue = []
+        for stale_id in stale:
+            best = min((keys[neighbor_id] + count for neighbor_id in self._neighbor_ids(stale_id)
+                        if keys[neighbor_id] < self._none), default=self._none)
+            if best < self._none:
+                keys[stale_id] = best
+                queue.append((best, stale_id))
+
+        heapq.heapify(queue)
+        while queue:
+            key, stale_id = heapq.heappop(queue)
+            if key > keys[stale_id]:
+                continue
+            for neighbor_id in self._neighbor_ids(stale_id):
+                if not self.passable[neighbor_id] and keys[neighbor_id] > key + count:
+                    keys[neighbor_id] = key + count
+                    heapq.heappush(queue, (key + count, neighbor_id))
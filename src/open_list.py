@@ -0,0 +1,79 @@
+import heapq
+from typing import Any, Dict, List, Tuple
+
+from src.grid import Grid
+
+
+class HeapOpenList:
+    """
+    Binary-heap open list, the general fallback for arbitrary (float) costs.
+    Entries are ordered by f, then by h (lower h first, i.e. closer to the goal), then by cell id,
+    so ties never fall back to comparing Cell objects.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, float, int, Any]] = []
+
+    def push(self, f_score: float, h_score: float, item_id: int, item: Any) -> None:
+        heapq.heappush(self._heap, (f_score, h_score, item_id, item))
+
+    def pop(self) -> Tuple[float, int, Any]:
+        """Removes and returns (f_score, item_id, item) of the best entry."""
+        f_score, _, item_id, item = heapq.heappop(self._heap)
+        return f_score, item_id, item
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class BucketOpenList:
+    """
+    Bucket (Dial) open list for integer f-scores, as produced by integer terrain costs with an
+    integer heuristic. Entries go into one bucket per f value; only the few live buckets are kept,
+    so push is O(1) and pop only orders the entries that share the minimum f.
+    Within a bucket, entries are ordered by h, then by cell id, like HeapOpenList.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[int, List[Tuple[float, int, Any]]] = {}
+        self._current = 0
+        self._size = 0
+
+    def push(self, f_score: float, h_score: float, item_id: int, item: Any) -> None:
+        key = int(f_score)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = []
+            if self._size == 0 or key < self._current:
+                self._current = key
+        heapq.heappush(bucket, (h_score, item_id, item))
+        self._size += 1
+
+    def pop(self) -> Tuple[float, int, Any]:
+        """Removes and returns (f_score, item_id, item) of the best entry."""
+        if not self._size:
+            raise IndexError("pop from an empty open list")
+        bucket = self._buckets.get(self._current)
+        if bucket is None:
+            self._current = min(self._buckets)
+            bucket = self._buckets[self._current]
+
+        _, item_id, item = heapq.heappop(bucket)
+        f_score = self._current
+        if not bucket:
+            del self._buckets[self._current]
+        self._size -= 1
+        return f_score, item_id, item
+
+    def __len__(self) -> int:
+        return self._size
+
+
+def has_integer_costs(grid: Grid) -> bool:
+    """True if every passable environment known to the grid has an integer movement cost."""
+    return all(float(env.cost).is_integer() for env in grid.symbol_to_environment.values() if not env.is_obstacle)
+
+
+def open_list_for(grid: Grid):
+    """Picks the open list implementation for a grid: buckets for integer costs, the heap otherwise."""
+    return BucketOpenList() if has_integer_costs(grid) else HeapOpenList()
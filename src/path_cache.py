@@ -0,0 +1,141 @@
+import collections
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.cost_profile import resolve_profile
+from src.environment import Environment
+from src.grid import Cell
+
+CacheKey = Tuple[Tuple[int, int], Tuple[int, int], Optional[str]]
+
+
+def _default_cost(environment: Environment) -> float:
+    return float('inf') if environment.is_obstacle else environment.cost
+
+
+class PathCache:
+    """
+    LRU cache in front of a pathfinder (anything with grid and find_path(start_cell, end_cell)),
+    keyed by (start, goal, cost profile name).
+    Entries are bounded by count (max_entries) and optionally by the total number of cached path cells
+    (max_cells). Terrain changes made through Grid.set_environment invalidate selectively:
+    - a cell getting more expensive or blocked drops only the cached paths that cross it;
+    - a cell getting cheaper or passable drops cached "no path" answers and the cached paths that
+      could be shortened by going through it (a Manhattan lower bound decides), leaving the rest.
+    """
+
+    def __init__(self, pathfinder, max_entries: int = 1024, max_cells: Optional[int] = None):
+        self.pathfinder = pathfinder
+        self.grid = pathfinder.grid
+        self.max_entries = max_entries
+        self.max_cells = max_cells
+
+        self._entries: 'collections.OrderedDict[CacheKey, Optional[List[Cell]]]' = collections.OrderedDict()
+        self._cells_by_id: Dict[int, Set[CacheKey]] = {}  # cell id -> keys of cached paths crossing it
+        self._cached_cells = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.grid.add_change_listener(self._on_cell_changed)
+
+    def close(self) -> None:
+        """Stops listening to terrain changes on the grid."""
+        self.grid.remove_change_listener(self._on_cell_changed)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "invalidations": self.invalidations, "entries": len(self._entries), "cells": self._cached_cells}
+
+    def find_path(self, start_cell: Cell, end_cell: Cell, profile: Optional[str] = None) -> Optional[List[Cell]]:
+        """
+        Returns the cached path for (start, goal, profile), or runs the pathfinder and caches its result.
+        profile is passed on to the pathfinder's find_path when given.
+        """
+        key = (start_cell.coords, end_cell.coords, profile)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                path = self._entries[key]
+                return list(path) if path is not None else None
+            self.misses += 1
+
+        if profile is None:
+            path = self.pathfinder.find_path(start_cell, end_cell)
+        else:
+            path = self.pathfinder.find_path(start_cell, end_cell, profile=profile)
+
+        with self._lock:
+            self._store(key, path)
+        return list(path) if path is not None else None
+
+    def _store(self, key: CacheKey, path: Optional[List[Cell]]) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if path is not None and self.max_cells is not None and len(path) > self.max_cells:
+            return  # too large to cache at all
+
+        self._entries[key] = path
+        if path is not None:
+            width = self.grid.width
+            for cell in path:
+                self._cells_by_id.setdefault(cell.y * width + cell.x, set()).add(key)
+            self._cached_cells += len(path)
+
+        while len(self._entries) > self.max_entries or \
+                (self.max_cells is not None and self._cached_cells > self.max_cells):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: CacheKey) -> None:
+        path = self._entries.pop(key)
+        if path is None:
+            return
+        width = self.grid.width
+        for cell in path:
+            keys = self._cells_by_id.get(cell.y * width + cell.x)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._cells_by_id[cell.y * width + cell.x]
+        self._cached_cells -= len(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._cells_by_id.clear()
+            self._cached_cells = 0
+
+    def _on_cell_changed(self, x: int, y: int, old_environment: Environment, new_environment: Environment) -> None:
+        with self._lock:
+            stale = set(self._cells_by_id.get(y * self.grid.width + x, ()))
+
+            # Costs are compared as each cached path's profile sees them: a change can be an improvement for one
+            # agent type and not for another.
+            environments = list(self.grid.symbol_to_environment.values())
+            for profile_name in {key[2] for key in self._entries}:
+                cost_of = resolve_profile(profile_name).cost_of if profile_name is not None else _default_cost
+                old_cost, new_cost = cost_of(old_environment), cost_of(new_environment)
+                if new_cost >= old_cost:
+                    continue
+                # A cheaper cell can only help a path if the cheapest possible detour through it beats the path.
+                min_cost = min((cost for cost in map(cost_of, environments) if cost != float('inf')), default=1.0)
+                for key, path in self._entries.items():
+                    if key[2] != profile_name:
+                        continue
+                    if path is None:
+                        stale.add(key)
+                        continue
+                    (start_x, start_y), (end_x, end_y), _ = key
+                    detour = (abs(start_x - x) + abs(start_y - y) - 1 + abs(end_x - x) + abs(end_y - y)) * min_cost \
+                        + new_cost
+                    if detour < path[-1].g_score:
+                        stale.add(key)
+
+            for key in stale:
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
@@ -0,0 +1,330 @@
+import argparse
+import json
+import os
+import random
+import zlib
+from array import array
+from multiprocessing import Pool, shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from src.a_star import AStarPathfinder
+from src.batch import attach_shared_grid, share_grid
+from src.compact_grid import CompactGrid
+from src.environment import Environment
+from src.flow_field import cost_field
+from src.grid import Cell, Grid
+from src.map_format import load_binary_map
+
+INFINITY = float('inf')
+
+Coords = Tuple[int, int]
+Endpoint = Union[Coords, Cell]
+
+# Per-process state of an oracle build worker, set once by _init_worker.
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+_worker_grid: Optional[CompactGrid] = None
+
+
+def oracle_path_for(map_filepath: str) -> str:
+    """Default place to store a POI oracle for a map file: next to it, with a .poi extension."""
+    return os.path.splitext(map_filepath)[0] + ".poi"
+
+
+def _grid_checksum(grid: Grid) -> int:
+    return zlib.crc32(grid.cost_array().tobytes())
+
+
+def _init_worker(memory_name: str, width: int, height: int, environments: List[Environment]) -> None:
+    global _worker_memory, _worker_grid
+
+    _worker_memory, _worker_grid = attach_shared_grid(memory_name, width, height, environments)
+
+
+def _trace_back(field: array, width: int, height: int, source_id: int, target_id: int) -> array:
+    """
+    Cell ids of a cheapest path from source to target in a forward cost field, found by stepping from the
+    target to its cheapest neighbor until the source is reached.
+    """
+    cell_ids = [target_id]
+    cell_id = target_id
+    while cell_id != source_id:
+        x = cell_id % width
+        best_id, best_cost = cell_id, INFINITY
+        for neighbor_id, in_bounds in ((cell_id - 1, x > 0), (cell_id + 1, x < width - 1),
+                                       (cell_id - width, cell_id >= width),
+                                       (cell_id + width, cell_id < (height - 1) * width)):
+            if in_bounds and field[neighbor_id] < best_cost:
+                best_id, best_cost = neighbor_id, field[neighbor_id]
+        cell_id = best_id
+        cell_ids.append(cell_id)
+    cell_ids.reverse()
+    return array('i', cell_ids)
+
+
+def _poi_row(grid: Grid, pois: Sequence[Coords], index: int,
+             store_paths: bool) -> Tuple[int, array, Optional[List[Optional[array]]]]:
+    """Runs one-to-all Dijkstra from POI `index` and keeps its row of the matrix (and paths, if asked)."""
+    width, height = grid.width, grid.height
+    field = cost_field(grid, pois[index])
+    poi_ids = [y * width + x for x, y in pois]
+    row = array('d', (field[poi_id] for poi_id in poi_ids))
+    if not store_paths:
+        return index, row, None
+    paths = [_trace_back(field, width, height, poi_ids[index], poi_id) if cost < INFINITY else None
+             for poi_id, cost in zip(poi_ids, row)]
+    return index, row, paths
+
+
+def _poi_row_task(task: Tuple[Sequence[Coords], int, bool]) -> Tuple[int, array, Optional[List[Optional[array]]]]:
+    pois, index, store_paths = task
+    return _poi_row(_worker_grid, pois, index, store_paths)
+
+
+class PoiOracle:
+    """
+    Precomputed shortest-path costs between a fixed set of points of interest (depots, gates, spawn
+    points): a POI x POI cost matrix, stored as one flat row-major array('d') with infinity for
+    unreachable pairs, and optionally the cheapest path of every pair as an array of cell ids.
+    POI-to-POI lookups read the matrix directly; queries involving any other cell, and every query once
+    the terrain has changed (stale is set), fall back to AStarPathfinder.
+    """
+
+    def __init__(self, grid: Grid, pois: Sequence[Coords], costs: array,
+                 paths: Optional[List[Optional[array]]] = None):
+        self.grid = grid
+        self.pois: List[Coords] = [tuple(poi) for poi in pois]
+        self.costs = costs
+        self.paths = paths
+        self.stale = False
+        self._index: Dict[Coords, int] = {poi: index for index, poi in enumerate(self.pois)}
+        self._fallback: Optional[AStarPathfinder] = None
+        grid.add_change_listener(self._on_cell_changed)
+
+    def _on_cell_changed(self, x: int, y: int, old_environment: Environment, new_environment: Environment) -> None:
+        self.stale = True
+
+    @classmethod
+    def build(cls, grid: Grid, pois: Iterable[Endpoint], store_paths: bool = False,
+              workers: Optional[int] = None) -> 'PoiOracle':
+        """
+        Runs one Dijkstra per POI, spread over a process pool that maps the terrain from shared memory.
+        Args:
+            grid: Any grid backend with whole-map arrays.
+            pois: POI coordinates (or Cells); each must be a passable cell inside the map.
+            store_paths: Also keep the cheapest path of every pair (memory grows with POIs^2 x path length).
+            workers: Number of worker processes (defaults to the CPU count). 1 runs in-process.
+        """
+        pois = [poi.coords if isinstance(poi, Cell) else (poi[0], poi[1]) for poi in pois]
+        if len(set(pois)) != len(pois):
+            raise ValueError("POIs must be distinct.")
+        for x, y in pois:
+            cell = grid.get_cell(x, y)
+            if cell is None or cell.environment_type.is_obstacle:
+                raise ValueError(f"POI ({x},{y}) is outside the map or on an obstacle.")
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        rows: List[Optional[array]] = [None] * len(pois)
+        paths: Optional[List[Optional[array]]] = [] if store_paths else None
+        row_paths: List[Optional[List[Optional[array]]]] = [None] * len(pois)
+        if workers <= 1 or len(pois) <= 1:
+            results = (_poi_row(grid, pois, index, store_paths) for index in range(len(pois)))
+            for index, row, row_path in results:
+                rows[index], row_paths[index] = row, row_path
+        else:
+            compact_grid = CompactGrid.from_grid(grid)
+            memory = share_grid(compact_grid)
+            try:
+                init_args = (memory.name, compact_grid.width, compact_grid.height, compact_grid.environments)
+                with Pool(processes=workers, initializer=_init_worker, initargs=init_args) as pool:
+                    tasks = [(pois, index, store_paths) for index in range(len(pois))]
+                    for index, row, row_path in pool.imap_unordered(_poi_row_task, tasks):
+                        rows[index], row_paths[index] = row, row_path
+            finally:
+                memory.close()
+                memory.unlink()
+
+        costs = array('d')
+        for index, row in enumerate(rows):
+            costs.extend(row)
+            if store_paths:
+                paths.extend(row_paths[index])
+        return cls(grid, pois, costs, paths)
+
+    def index_of(self, endpoint: Endpoint) -> Optional[int]:
+        """Position of a POI in the matrix, or None if the cell is not a POI."""
+        return self._index.get(endpoint.coords if isinstance(endpoint, Cell) else (endpoint[0], endpoint[1]))
+
+    def _pathfinder(self) -> AStarPathfinder:
+        if self._fallback is None:
+            self._fallback = AStarPathfinder(self.grid)
+        return self._fallback
+
+    def _search(self, start: Endpoint, end: Endpoint) -> Optional[List[Cell]]:
+        start_x, start_y = start.coords if isinstance(start, Cell) else start
+        end_x, end_y = end.coords if isinstance(end, Cell) else end
+        start_cell, end_cell = self.grid.get_cell(start_x, start_y), self.grid.get_cell(end_x, end_y)
+        if start_cell is None or end_cell is None:
+            return None
+        return self._pathfinder().find_path(start_cell, end_cell)
+
+    def cost(self, start: Endpoint, end: Endpoint) -> float:
+        """Cheapest cost from start to end (infinity if unreachable): a matrix lookup between POIs, else A*."""
+        start_index, end_index = self.index_of(start), self.index_of(end)
+        if start_index is not None and end_index is not None and not self.stale:
+            return self.costs[start_index * len(self.pois) + end_index]
+        path = self._search(start, end)
+        return path[-1].g_score if path else INFINITY
+
+    def cost_row(self, start: Endpoint) -> List[float]:
+        """Costs from one POI to every POI, in POI order."""
+        start_index = self.index_of(start)
+        if start_index is None or self.stale:
+            return [self.cost(start, poi) for poi in self.pois]
+        count = len(self.pois)
+        return self.costs[start_index * count:(start_index + 1) * count].tolist()
+
+    def path(self, start: Endpoint, end: Endpoint) -> Optional[List[Cell]]:
+        """
+        Cheapest path from start to end as fresh Cells with g_score and parent set, like
+        AStarPathfinder.find_path, or None if unreachable. Stored paths are used between POIs;
+        everything else is searched with A*.
+        """
+        start_index, end_index = self.index_of(start), self.index_of(end)
+        if self.paths is None or start_index is None or end_index is None or self.stale:
+            return self._search(start, end)
+        cell_ids = self.paths[start_index * len(self.pois) + end_index]
+        if cell_ids is None:
+            return None
+
+        grid = self.grid
+        width = grid.width
+        cell_costs = grid.cost_array()
+        path: List[Cell] = []
+        for cell_id in cell_ids:
+            cell = grid.get_cell(cell_id % width, cell_id // width)
+            step = Cell(cell.x, cell.y, cell.environment_type)
+            if path:
+                step.g_score = step.f_score = path[-1].g_score + cell_costs[cell_id]
+                step.parent = path[-1]
+            else:
+                step.g_score = step.f_score = 0.0
+            path.append(step)
+        return path
+
+    def find_path(self, start: Cell, end: Cell) -> Optional[List[Cell]]:
+        """Pathfinder interface, so the oracle can stand in for AStarPathfinder (e.g. inside a PathCache)."""
+        return self.path(start, end)
+
+    def save(self, filepath: str) -> None:
+        """
+        Writes the oracle: one JSON header line (dimensions, terrain checksum, POIs) followed by the raw
+        cost matrix and, if paths are stored, their offsets and cell ids.
+        """
+        header = {
+            "width": self.grid.width,
+            "height": self.grid.height,
+            "checksum": _grid_checksum(self.grid),
+            "pois": self.pois,
+            "paths": self.paths is not None,
+        }
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        with open(filepath, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b"\n")
+            self.costs.tofile(f)
+            if self.paths is not None:
+                # Offsets into the flat cell id array; a pair without a path has an empty range.
+                offsets = array('q', [0])
+                for cell_ids in self.paths:
+                    offsets.append(offsets[-1] + (len(cell_ids) if cell_ids is not None else 0))
+                offsets.tofile(f)
+                for cell_ids in self.paths:
+                    if cell_ids is not None:
+                        cell_ids.tofile(f)
+
+    @classmethod
+    def load(cls, filepath: str, grid: Grid) -> 'PoiOracle':
+        """Reads an oracle written by save(), refusing it if it was built for different terrain."""
+        with open(filepath, 'rb') as f:
+            header = json.loads(f.readline().decode('utf-8'))
+            if (header["width"], header["height"]) != (grid.width, grid.height) \
+                    or header["checksum"] != _grid_checksum(grid):
+                raise ValueError(f"POI oracle in '{filepath}' was built for a different map.")
+
+            pair_count = len(header["pois"]) ** 2
+            costs = array('d')
+            costs.fromfile(f, pair_count)
+            paths = None
+            if header["paths"]:
+                offsets = array('q')
+                offsets.fromfile(f, pair_count + 1)
+                cell_ids = array('i')
+                cell_ids.fromfile(f, offsets[-1])
+                paths = [cell_ids[offsets[pair]:offsets[pair + 1]] if offsets[pair] < offsets[pair + 1] else None
+                         for pair in range(pair_count)]
+
+        return cls(grid, [tuple(poi) for poi in header["pois"]], costs, paths)
+
+    @classmethod
+    def load_or_build(cls, filepath: str, grid: Grid, pois: Iterable[Endpoint], store_paths: bool = False,
+                      workers: Optional[int] = None) -> 'PoiOracle':
+        """Loads the oracle at filepath, or builds and stores it if missing, outdated or for other POIs."""
+        pois = [poi.coords if isinstance(poi, Cell) else (poi[0], poi[1]) for poi in pois]
+        if os.path.exists(filepath):
+            try:
+                oracle = cls.load(filepath, grid)
+                if oracle.pois == pois and (oracle.paths is not None or not store_paths):
+                    return oracle
+                oracle.close()
+            except (ValueError, EOFError, KeyError, json.JSONDecodeError):
+                pass
+        oracle = cls.build(grid, pois, store_paths, workers)
+        oracle.save(filepath)
+        return oracle
+
+    def close(self) -> None:
+        """Stops listening to terrain changes on the grid."""
+        self.grid.remove_change_listener(self._on_cell_changed)
+
+
+def _read_pois(filepath: str) -> List[Coords]:
+    """Reads one "x,y" (or "x y") POI per line, skipping blank lines and # comments."""
+    pois = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                x, y = line.replace(',', ' ').split()
+                pois.append((int(x), int(y)))
+    return pois
+
+
+def _random_pois(grid: Grid, count: int, seed: int) -> List[Coords]:
+    passable_ids = [cell_id for cell_id, passable in enumerate(grid.passable_mask()) if passable]
+    chosen = random.Random(seed).sample(passable_ids, min(count, len(passable_ids)))
+    return [(cell_id % grid.width, cell_id // grid.width) for cell_id in chosen]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the POI x POI cost matrix of a binary map.")
+    parser.add_argument("binary_map", help="Path of the binary map, e.g. maps/map.pfm")
+    sources = parser.add_mutually_exclusive_group(required=True)
+    sources.add_argument("--pois", help="File with one POI per line, as x,y")
+    sources.add_argument("--random", type=int, metavar="N", help="Use N random passable cells as POIs.")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for --random.")
+    parser.add_argument("--paths", action="store_true", help="Also store the path of every pair.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--output", default=None, help="Oracle file to write (default: next to the map, .poi)")
+    args = parser.parse_args()
+
+    grid = load_binary_map(args.binary_map)
+    pois = _read_pois(args.pois) if args.pois else _random_pois(grid, args.random, args.seed)
+    output = args.output or oracle_path_for(args.binary_map)
+    oracle = PoiOracle.build(grid, pois, store_paths=args.paths, workers=args.workers)
+    oracle.save(output)
+    reachable = sum(1 for cost in oracle.costs if cost < INFINITY)
+    print(f"POI oracle for {len(oracle.pois)} POIs ({reachable} reachable pairs) saved to '{output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+from typing import Callable, Dict, Optional
+
+from src.grid import Cell
+
+ExpandHook = Callable[[Cell, float], None]  # (cell, g_score)
+PushHook = Callable[[Cell, float, float], None]  # (cell, g_score, f_score)
+
+
+class SearchStats:
+    """
+    Counters for one search, filled in when passed as find_path(..., stats=SearchStats()).
+    Counters are reset at the start of every search, so an object can be reused across queries.
+    on_expand(cell, g_score) is called for every expanded cell and on_push(cell, g_score, f_score) for every
+    open-list push, e.g. to profile a query or collect explored cells for a heat map.
+    Searches without a stats object pay nothing for this.
+    """
+
+    def __init__(self, on_expand: Optional[ExpandHook] = None, on_push: Optional[PushHook] = None):
+        self.on_expand = on_expand
+        self.on_push = on_push
+        self.reset()
+
+    def reset(self) -> None:
+        self.nodes_expanded = 0
+        self.pushes = 0
+        self.stale_pops = 0  # popped entries whose cell had already been expanded
+        self.max_open_size = 0
+        self.wall_time = 0.0  # seconds
+        self.path_cost: Optional[float] = None  # None if no path was found
+        self.budget_exhausted = False  # an expansion or time budget stopped the search
+
+    def as_dict(self) -> Dict[str, Optional[float]]:
+        return {"nodes_expanded": self.nodes_expanded, "pushes": self.pushes, "stale_pops": self.stale_pops,
+                "max_open_size": self.max_open_size, "wall_time": self.wall_time, "path_cost": self.path_cost,
+                "budget_exhausted": self.budget_exhausted}
+
+    def __repr__(self):
+        return "SearchStats(" + ", ".join(f"{name}={value}" for name, value in self.as_dict().items()) + ")"
@@ -0,0 +1,430 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Deque, Dict, List, Optional, Tuple
+
+from src.a_star import AStarPathfinder
+from src.batch import attach_shared_grid, share_grid
+from src.compact_grid import CompactGrid
+from src.cost_profile import PROFILES, CostProfile, register_profile, resolve_profile
+from src.environment import Environment
+from src.map_format import load_map
+from src.workload import latency_summary_ms
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+Coords = Tuple[int, int]
+# A query as a worker receives it: map name, start, end and cost profile name (or None).
+Task = Tuple[str, Coords, Coords, Optional[str]]
+# A worker's answer: the path as coordinates and its cost, or an error message.
+Outcome = Tuple[Optional[List[Coords]], Optional[float], Optional[str]]
+
+# Per-process state of a service worker, set once by _init_worker (or _init_local for in-process work).
+_worker_memories: List[shared_memory.SharedMemory] = []
+_worker_pathfinders: Dict[str, AStarPathfinder] = {}
+
+
+def _init_worker(shared_maps: List[Tuple[str, str, int, int, List[Environment]]],
+                 profiles: List[CostProfile]) -> None:
+    """Attaches a pool worker to the shared terrain of every map and builds one pathfinder per map."""
+    for profile in profiles:
+        register_profile(profile)
+    for map_name, memory_name, width, height, environments in shared_maps:
+        memory, grid = attach_shared_grid(memory_name, width, height, environments)
+        _worker_memories.append(memory)
+        _worker_pathfinders[map_name] = AStarPathfinder(grid)
+
+
+def _init_local(grids: Dict[str, CompactGrid]) -> None:
+    """Builds the pathfinders in this process, for services without worker processes."""
+    for map_name, grid in grids.items():
+        _worker_pathfinders[map_name] = AStarPathfinder(grid)
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _solve_batch(batch: List[Task]) -> List[Outcome]:
+    """Runs one micro-batch of queries in a worker, one search after the other."""
+    outcomes = []
+    for map_name, start, end, profile in batch:
+        pathfinder = _worker_pathfinders[map_name]
+        try:
+            path = pathfinder.find_path(pathfinder.grid.get_cell(*start), pathfinder.grid.get_cell(*end),
+                                        profile=profile)
+        except ValueError as error:
+            outcomes.append((None, None, str(error)))
+            continue
+        if path:
+            outcomes.append(([cell.coords for cell in path], path[-1].g_score, None))
+        else:
+            outcomes.append((None, None, None))
+    return outcomes
+
+
+class ServiceMetrics:
+    """Counters and recent latencies of a PathService, summarised by snapshot()."""
+
+    def __init__(self, window: int = 10000):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.max_batch_size = 0
+        self.max_queue_depth = 0
+        # Latencies (receipt to response) and queue waits (receipt to dispatch) of the last `window` requests.
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.queue_waits: Deque[float] = deque(maxlen=window)
+
+    def record_batch(self, size: int) -> None:
+        self.batches += 1
+        self.batched_requests += size
+        self.max_batch_size = max(self.max_batch_size, size)
+
+    def record_request(self, latency: float, queue_wait: float, failed: bool) -> None:
+        self.requests += 1
+        self.errors += failed
+        self.latencies.append(latency)
+        self.queue_waits.append(queue_wait)
+
+    def snapshot(self, queued: int, in_flight: int) -> Dict[str, object]:
+        uptime = time.perf_counter() - self.started
+        return {
+            "uptime_s": uptime,
+            "requests": self.requests,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "throughput_per_s": self.requests / uptime if uptime else 0.0,
+            "latency_ms": latency_summary_ms(self.latencies),
+            "queue_wait_ms": latency_summary_ms(self.queue_waits),
+            "queue_depth": {"queued": queued, "in_flight": in_flight, "max": self.max_queue_depth},
+            "batches": self.batches,
+            "batch_size": {"mean": self.batched_requests / self.batches if self.batches else 0.0,
+                           "max": self.max_batch_size},
+        }
+
+
+class PathService:
+    """
+    A resident pathfinding service: maps are loaded once and kept hot, and newline-delimited JSON requests
+    from any number of connections are grouped into micro-batches that run on a pool of worker processes.
+    A batch is dispatched as soon as a worker slot frees up, taking everything queued by then (up to
+    max_batch), so batches stay small under light load and grow on their own when the workers are busy.
+
+    Requests (one JSON object per line; "id" is echoed back and responses may arrive out of order):
+        {"id": 1, "map": "default", "start": [0, 0], "end": [99, 99], "profile": "wader"}
+        {"id": 2, "op": "metrics"}    {"id": 3, "op": "maps"}    {"id": 4, "op": "ping"}
+    A path response carries "path" (a list of [x, y], or null if there is none), "cost", the server-side
+    "latency_ms" and "queue_ms", the "batch_size" it ran in and the "queue_depth" it found on arrival.
+    Invalid requests get {"id": ..., "error": "..."}.
+    """
+
+    def __init__(self, maps: Dict[str, str], workers: Optional[int] = None, max_batch: int = 32,
+                 batch_window: float = 0.0, max_queue: int = 10000):
+        """
+        Args:
+            maps: Map name to map file (text or .pfm); all are loaded up front.
+            workers: Number of worker processes (defaults to the CPU count). 1 runs searches on a
+                single background thread of this process.
+            max_batch: Largest number of queries sent to a worker at a time.
+            batch_window: Seconds to keep collecting a batch that is not full before dispatching it.
+            max_queue: Queued requests beyond this are rejected with an "overloaded" error.
+        """
+        if not maps:
+            raise ValueError("PathService needs at least one map.")
+        self.grids: Dict[str, CompactGrid] = {name: load_map(filepath) for name, filepath in maps.items()}
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+        self.metrics = ServiceMetrics()
+
+        self._memories: List[shared_memory.SharedMemory] = []
+        self._executor: Optional[Executor] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._running_batches = set()
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._in_flight = 0
+
+    def _start_executor(self) -> Executor:
+        if self.workers <= 1:
+            _init_local(self.grids)
+            return ThreadPoolExecutor(max_workers=1)
+        shared_maps = []
+        for name, grid in self.grids.items():
+            memory = share_grid(grid)
+            self._memories.append(memory)
+            shared_maps.append((name, memory.name, grid.width, grid.height, grid.environments))
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(shared_maps, list(PROFILES.values())))
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Starts the workers and listens on a TCP port, or on a Unix socket if unix_path is given."""
+        loop = asyncio.get_running_loop()
+        self._executor = self._start_executor()
+        await loop.run_in_executor(self._executor, _warm_up)
+        self._queue = asyncio.Queue()
+        # Two batches per worker: one running and one waiting, so a worker never idles while its next
+        # batch is being put together.
+        self._slots = asyncio.Semaphore(2 * self.workers)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def close(self) -> None:
+        """Stops listening, stops the workers and releases the shared terrain."""
+        if self._server is not None:
+            self._server.close()
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._batcher
+        if self._running_batches:
+            await asyncio.gather(*self._running_batches, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        for memory in self._memories:
+            memory.close()
+            memory.unlink()
+        self._memories.clear()
+
+    def queue_depth(self) -> int:
+        """Requests waiting for a batch plus requests in batches that have not returned yet."""
+        return (self._queue.qsize() if self._queue is not None else 0) + self._in_flight
+
+    def metrics_snapshot(self) -> Dict[str, object]:
+        return self.metrics.snapshot(self._queue.qsize() if self._queue is not None else 0, self._in_flight)
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            running = asyncio.create_task(self._run_batch(batch))
+            self._running_batches.add(running)
+            running.add_done_callback(self._running_batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Task, asyncio.Future, float]]) -> None:
+        dispatched = time.perf_counter()
+        self._in_flight += len(batch)
+        self.metrics.record_batch(len(batch))
+        try:
+            tasks = [task for task, _, _ in batch]
+            outcomes = await asyncio.get_running_loop().run_in_executor(self._executor, _solve_batch, tasks)
+        except Exception as error:  # e.g. a worker died; fail the batch, keep the service up
+            outcomes = [(None, None, f"worker failed: {error!r}")] * len(batch)
+        finally:
+            self._in_flight -= len(batch)
+            self._slots.release()
+        for (_, future, received), outcome in zip(batch, outcomes):
+            if not future.done():
+                future.set_result((outcome, dispatched - received, len(batch)))
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        write_lock = asyncio.Lock()
+        pending = set()
+        connection = asyncio.current_task()
+        self._connections[connection] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                responding = asyncio.create_task(self._respond(line, writer, write_lock))
+                pending.add(responding)
+                responding.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            del self._connections[connection]
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter, write_lock: asyncio.Lock) -> None:
+        received = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object.")
+            request_id = request.get("id")
+            response = await self._dispatch(request, received)
+        except ValueError as error:  # json.JSONDecodeError is a ValueError too
+            response = {"error": str(error)}
+        except Exception as error:  # never leave a request unanswered
+            response = {"error": f"internal error: {error!r}"}
+        response["id"] = request_id
+        try:
+            async with write_lock:
+                writer.write(json.dumps(response, separators=(',', ':')).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass  # the client went away; nothing left to answer
+
+    async def _dispatch(self, request: Dict[str, object], received: float) -> Dict[str, object]:
+        op = request.get("op", "path")
+        if op == "path":
+            return await self._path(request, received)
+        if op == "metrics":
+            return {"metrics": self.metrics_snapshot()}
+        if op == "maps":
+            return {"maps": {name: {"width": grid.width, "height": grid.height} for name, grid in self.grids.items()}}
+        if op == "ping":
+            return {"pong": True}
+        raise ValueError(f"Unknown op '{op}'.")
+
+    def _parse_task(self, request: Dict[str, object]) -> Task:
+        map_name = request.get("map")
+        if map_name is not None and not isinstance(map_name, str):
+            raise ValueError("'map' must be a map name.")
+        if map_name is None and len(self.grids) == 1:
+            map_name = next(iter(self.grids))
+        grid = self.grids.get(map_name)
+        if grid is None:
+            raise ValueError(f"Unknown map '{map_name}'.")
+        endpoints = []
+        for key in ("start", "end"):
+            value = request.get(key)
+            if (not isinstance(value, list) or len(value) != 2
+                    or not all(isinstance(v, int) and not isinstance(v, bool) for v in value)):
+                raise ValueError(f"'{key}' must be [x, y] with integer coordinates.")
+            if not (0 <= value[0] < grid.width and 0 <= value[1] < grid.height):
+                raise ValueError(f"'{key}' {value} is outside map '{map_name}' ({grid.width}x{grid.height}).")
+            endpoints.append((value[0], value[1]))
+        profile = request.get("profile")
+        if profile is not None:
+            if not isinstance(profile, str):
+                raise ValueError("'profile' must be the name of a registered cost profile.")
+            resolve_profile(profile)
+        return map_name, endpoints[0], endpoints[1], profile
+
+    async def _path(self, request: Dict[str, object], received: float) -> Dict[str, object]:
+        task = self._parse_task(request)
+        depth = self.queue_depth()
+        if self._queue.qsize() >= self.max_queue:
+            self.metrics.rejected += 1
+            raise ValueError("overloaded: request queue is full")
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, depth + 1)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((task, future, received))
+        (path, cost, error), queue_wait, batch_size = await future
+
+        latency = time.perf_counter() - received
+        self.metrics.record_request(latency, queue_wait, error is not None)
+        if error is not None:
+            raise ValueError(error)
+        return {
+            "path": [list(coords) for coords in path] if path else None,
+            "cost": cost,
+            "latency_ms": 1000 * latency,
+            "queue_ms": 1000 * queue_wait,
+            "batch_size": batch_size,
+            "queue_depth": depth,
+        }
+
+
+def _parse_map_argument(value: str) -> Tuple[str, str]:
+    """Splits "name=path"; a bare path is named after its file."""
+    if "=" in value:
+        name, filepath = value.split("=", 1)
+    else:
+        filepath = value
+        name = os.path.splitext(os.path.basename(value))[0]
+    return name, filepath
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    service = PathService(dict(args.map), workers=args.workers, max_batch=args.max_batch,
+                          batch_window=args.batch_window_ms / 1000, max_queue=args.max_queue)
+    server = await service.start(args.host, args.port, args.unix)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    where = args.unix or "{}:{}".format(*server.sockets[0].getsockname()[:2])
+    print(f"Serving {', '.join(service.grids)} on {where} with {service.workers} worker(s)", flush=True)
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), args.metrics_interval or None)
+            except asyncio.TimeoutError:
+                metrics = service.metrics_snapshot()
+                print(f"requests {metrics['requests']}  errors {metrics['errors']}  "
+                      f"p50 {metrics['latency_ms']['p50']:.2f} ms  p99 {metrics['latency_ms']['p99']:.2f} ms  "
+                      f"queue {metrics['queue_depth']['queued']}+{metrics['queue_depth']['in_flight']} "
+                      f"(max {metrics['queue_depth']['max']})  batch {metrics['batch_size']['mean']:.1f}",
+                      flush=True)
+    finally:
+        await service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve path queries over a local socket, with maps kept loaded.")
+    parser.add_argument("--map", action="append", type=_parse_map_argument, required=True, metavar="NAME=PATH",
+                        help="Map to serve (text or .pfm); repeat for several maps.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, help="Listen on this Unix socket path instead of TCP.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count).")
+    parser.add_argument("--max-batch", type=int, default=32, help="Most queries sent to a worker at a time.")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0,
+                        help="How long to keep filling a batch that is not full.")
+    parser.add_argument("--max-queue", type=int, default=10000, help="Queued requests before rejecting new ones.")
+    parser.add_argument("--metrics-interval", type=float, default=0,
+                        help="Print a metrics line every this many seconds (0 disables it).")
+    args = parser.parse_args()
+
+    asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    main()
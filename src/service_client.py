@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.map_format import load_map
+from src.service import DEFAULT_HOST, DEFAULT_PORT
+from src.workload import latency_summary_ms, query_pairs
+
+Coords = Tuple[int, int]
+
+
+class ServiceClient:
+    """
+    An asyncio client for PathService. Requests are pipelined over one connection: any number of them can
+    be awaited at once, and responses are matched back to their requests by id.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                      unix_path: Optional[str] = None) -> 'ServiceClient':
+        """Connects over TCP, or over a Unix socket if unix_path is given."""
+        if unix_path:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self) -> None:
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._waiting.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to the path service closed."))
+            self._waiting.clear()
+
+    async def request(self, message: Dict[str, object]) -> Dict[str, object]:
+        """Sends one request and returns its response. Error responses raise ValueError."""
+        if self._receiver.done():
+            raise ConnectionError("Connection to the path service closed.")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(json.dumps(dict(message, id=request_id), separators=(',', ':')).encode() + b"\n")
+        await self._writer.drain()
+        response = await future
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+    async def find_path(self, map_name: Optional[str], start: Coords, end: Coords,
+                        profile: Optional[str] = None) -> Dict[str, object]:
+        """Returns the path response: "path" (list of [x, y] or None), "cost" and the server-side timings."""
+        message = {"map": map_name, "start": list(start), "end": list(end)}
+        if profile is not None:
+            message["profile"] = profile
+        return await self.request(message)
+
+    async def metrics(self) -> Dict[str, object]:
+        return (await self.request({"op": "metrics"}))["metrics"]
+
+    async def maps(self) -> Dict[str, Dict[str, int]]:
+        return (await self.request({"op": "maps"}))["maps"]
+
+    async def close(self) -> None:
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._receiver.cancel()
+
+
+async def run_load(map_name: str, pairs: Sequence[Tuple[Coords, Coords]], concurrency: int = 32,
+                   connections: int = 4, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                   unix_path: Optional[str] = None, profile: Optional[str] = None) -> Dict[str, object]:
+    """
+    Sends every pair to the service with `concurrency` requests outstanding at a time, spread over
+    `connections` connections, and reports throughput, client-side round-trip latency, the server-side
+    latency the responses carried and the service's own metrics afterwards.
+    """
+    clients = [await ServiceClient.connect(host, port, unix_path) for _ in range(max(1, connections))]
+    remaining = iter(pairs)
+    round_trips: List[float] = []
+    server_latencies: List[float] = []
+    errors = 0
+    no_path = 0
+
+    async def send(client: ServiceClient) -> None:
+        nonlocal errors, no_path
+        for start, end in remaining:
+            sent = time.perf_counter()
+            try:
+                response = await client.find_path(map_name, start, end, profile)
+            except ValueError:
+                errors += 1
+                continue
+            round_trips.append(time.perf_counter() - sent)
+            server_latencies.append(response["latency_ms"] / 1000)
+            no_path += response["path"] is None
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(send(clients[index % len(clients)]) for index in range(max(1, concurrency))))
+        wall_time = time.perf_counter() - started
+        server_metrics = await clients[0].metrics()
+    finally:
+        for client in clients:
+            await client.close()
+
+    return {
+        "requests": len(round_trips) + errors,
+        "errors": errors,
+        "no_path": no_path,
+        "concurrency": concurrency,
+        "connections": len(clients),
+        "wall_time_s": wall_time,
+        "throughput_per_s": len(round_trips) / wall_time if wall_time else 0.0,
+        "round_trip_ms": latency_summary_ms(round_trips),
+        "server_latency_ms": latency_summary_ms(server_latencies),
+        "server": server_metrics,
+    }
+
+
+async def _load_pairs(args: argparse.Namespace) -> List[Tuple[Coords, Coords]]:
+    """Connected query pairs drawn from a local copy of the map, or random in-bounds pairs without one."""
+    if args.map_file:
+        return query_pairs(load_map(args.map_file), args.requests, args.seed)
+    client = await ServiceClient.connect(args.host, args.port, args.unix)
+    try:
+        maps = await client.maps()
+    finally:
+        await client.close()
+    size = maps[args.map] if args.map else next(iter(maps.values()))
+    rng = random.Random(args.seed)
+
+    def random_coords() -> Coords:
+        return rng.randrange(size["width"]), rng.randrange(size["height"])
+
+    return [(random_coords(), random_coords()) for _ in range(args.requests)]
+
+
+async def _run(args: argparse.Namespace) -> Dict[str, object]:
+    if args.command == "load":
+        pairs = await _load_pairs(args)
+        return await run_load(args.map, pairs, args.concurrency, args.connections, args.host, args.port, args.unix,
+                              args.profile)
+    client = await ServiceClient.connect(args.host, args.port, args.unix)
+    try:
+        if args.command == "query":
+            return await client.find_path(args.map, tuple(args.start), tuple(args.end), args.profile)
+        if args.command == "maps":
+            return await client.maps()
+        return await client.metrics()
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a running path service, or put it under load.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, help="Connect to this Unix socket path instead of TCP.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="Find one path.")
+    query.add_argument("--map", default=None, help="Map name (may be left out if the service has one map).")
+    query.add_argument("--start", type=int, nargs=2, required=True, metavar=("X", "Y"))
+    query.add_argument("--end", type=int, nargs=2, required=True, metavar=("X", "Y"))
+    query.add_argument("--profile", default=None, help="Registered cost profile name.")
+
+    commands.add_parser("metrics", help="Print the service metrics.")
+    commands.add_parser("maps", help="List the served maps.")
+
+    load = commands.add_parser("load", help="Send many concurrent queries and report latency and throughput.")
+    load.add_argument("--map", default=None, help="Map name (may be left out if the service has one map).")
+    load.add_argument("--map-file", default=None,
+                      help="Local copy of the map, used to draw connected query pairs (otherwise pairs are random).")
+    load.add_argument("--requests", type=int, default=1000)
+    load.add_argument("--concurrency", type=int, default=32, help="Requests outstanding at a time.")
+    load.add_argument("--connections", type=int, default=4)
+    load.add_argument("--seed", type=int, default=1)
+    load.add_argument("--profile", default=None, help="Registered cost profile name.")
+    load.add_argument("--output", default=None, help="Also write the load report to this JSON file.")
+    args = parser.parse_args()
+
+    result = asyncio.run(_run(args))
+    if args.command == "load":
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2)
+        print(f"{result['requests']} requests ({result['errors']} errors, {result['no_path']} without a path) in "
+              f"{result['wall_time_s']:.2f} s: {result['throughput_per_s']:.0f}/s")
+        for label, key in (("round trip", "round_trip_ms"), ("server", "server_latency_ms")):
+            latency = result[key]
+            print(f"{label:<11} p50 {latency['p50']:8.2f} ms  p90 {latency['p90']:8.2f} ms  "
+                  f"p99 {latency['p99']:8.2f} ms  max {latency['max']:8.2f} ms")
+        server = result["server"]
+        print(f"server queue depth max {server['queue_depth']['max']}, "
+              f"batch size mean {server['batch_size']['mean']:.1f} max {server['batch_size']['max']}")
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
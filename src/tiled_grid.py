@@ -0,0 +1,189 @@
+import collections
+import os
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.compact_grid import MAX_ENVIRONMENTS
+from src.environment import Environment
+from src.grid import Cell, Grid
+from src.map_format import read_binary_header
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024  # bytes of tile data kept resident
+
+
+class TiledGrid(Grid):
+    """
+    Grid backend for maps larger than memory. The map stays in a binary map file (see src/map_format.py)
+    and is read in tile_size x tile_size tiles on first access from get_cell / get_neighbors.
+    Resident tiles are kept in LRU order and the coldest are evicted once memory_budget bytes are in use.
+    Edits made through set_environment are kept in a small overlay, so they survive eviction.
+    tile_hits, tile_misses and tile_evictions count tile accesses.
+    """
+
+    def __init__(self, binary_filepath: str, tile_size: int = DEFAULT_TILE_SIZE,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 symbol_to_environment: Optional[Dict[str, Environment]] = None):
+        if not os.path.exists(binary_filepath):
+            raise FileNotFoundError(f"Map file not found at '{binary_filepath}'")
+        if tile_size < 1:
+            raise ValueError("tile_size must be at least 1.")
+
+        self._file = open(binary_filepath, 'rb')
+        self._data_offset, self.width, self.height, self.environments = \
+            read_binary_header(self._file, symbol_to_environment)
+        if not self.width or not self.height:
+            raise ValueError("Map data cannot be empty.")
+
+        self.symbol_to_environment = {env.symbol: env for env in self.environments}
+        self.tile_size = tile_size
+        self.max_tiles = max(1, memory_budget // (tile_size * tile_size))
+        self._tiles: 'collections.OrderedDict[Tuple[int, int], bytearray]' = collections.OrderedDict()
+        # Edited cells per tile: (tile_x, tile_y) -> {offset within the tile: environment index}.
+        self._overlay: Dict[Tuple[int, int], Dict[int, int]] = {}
+        self._lock = threading.Lock()
+        self.tile_hits = 0
+        self.tile_misses = 0
+        self.tile_evictions = 0
+        self._update_tables()
+        self._init_indexes()
+
+        self.start_node: Optional[Cell] = self.get_cell(0, 0)
+        self.end_node: Optional[Cell] = self.get_cell(self.width - 1, self.height - 1)
+
+    def close(self) -> None:
+        """Closes the underlying map file and drops all resident tiles."""
+        self._file.close()
+        self._tiles.clear()
+
+    def _update_tables(self) -> None:
+        self.passable_table = [not env.is_obstacle for env in self.environments]
+
+    def _load_tile(self, tile_x: int, tile_y: int) -> bytearray:
+        size = self.tile_size
+        min_x, min_y = tile_x * size, tile_y * size
+        tile_width = min(size, self.width - min_x)
+        tile_height = min(size, self.height - min_y)
+
+        tile = bytearray(tile_width * tile_height)
+        for row in range(tile_height):
+            self._file.seek(self._data_offset + (min_y + row) * self.width + min_x)
+            tile[row * tile_width:(row + 1) * tile_width] = self._file.read(tile_width)
+
+        for offset, environment_index in self._overlay.get((tile_x, tile_y), {}).items():
+            tile[offset] = environment_index
+        return tile
+
+    def _tile(self, tile_x: int, tile_y: int) -> bytearray:
+        key = (tile_x, tile_y)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self.tile_hits += 1
+                self._tiles.move_to_end(key)
+                return tile
+
+            self.tile_misses += 1
+            tile = self._load_tile(tile_x, tile_y)
+            self._tiles[key] = tile
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+                self.tile_evictions += 1
+            return tile
+
+    def _environment_index(self, x: int, y: int) -> int:
+        size = self.tile_size
+        tile_x, tile_y = x // size, y // size
+        tile_width = min(size, self.width - tile_x * size)
+        return self._tile(tile_x, tile_y)[(y - tile_y * size) * tile_width + (x - tile_x * size)]
+
+    @property
+    def resident_tiles(self) -> int:
+        return len(self._tiles)
+
+    def tile_stats(self) -> Dict[str, int]:
+        """Returns the tile hit/miss/eviction counters and the number of resident tiles."""
+        return {"hits": self.tile_hits, "misses": self.tile_misses, "evictions": self.tile_evictions,
+                "resident": len(self._tiles)}
+
+    def get_cell(self, x: int, y: int) -> Optional[Cell]:
+        """Returns a new Cell view for the given (x, y) coordinates, loading its tile if needed."""
+        if 0 <= y < self.height and 0 <= x < self.width:
+            return Cell(x, y, self.environments[self._environment_index(x, y)])
+        return None
+
+    def get_neighbors(self, cell: Cell) -> List[Cell]:
+        """Returns a list of valid, non-obstacle neighbors, loading their tiles if needed."""
+        neighbors = []
+        for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            new_x, new_y = cell.x + dx, cell.y + dy
+            if 0 <= new_y < self.height and 0 <= new_x < self.width:
+                environment_index = self._environment_index(new_x, new_y)
+                if self.passable_table[environment_index]:
+                    neighbors.append(Cell(new_x, new_y, self.environments[environment_index]))
+        return neighbors
+
+    def _row_symbols(self, y: int, min_x: int, max_x: int) -> str:
+        """Renders a row slice tile by tile, copying whole tile rows at once."""
+        size = self.tile_size
+        tile_y = y // size
+        parts = []
+        x = min_x
+        while x < max_x:
+            tile_x = x // size
+            tile_min_x = tile_x * size
+            tile_width = min(size, self.width - tile_min_x)
+            row_offset = (y - tile_y * size) * tile_width
+            end_x = min(max_x, tile_min_x + tile_width)
+            tile = self._tile(tile_x, tile_y)
+            parts.extend(self.environments[index].symbol
+                         for index in tile[row_offset + x - tile_min_x:row_offset + end_x - tile_min_x])
+            x = end_x
+        return "".join(parts)
+
+    def _store_environment(self, x: int, y: int, environment: Environment) -> None:
+        if environment in self.environments:
+            index = self.environments.index(environment)
+        elif len(self.environments) < MAX_ENVIRONMENTS:
+            index = len(self.environments)
+            self.environments.append(environment)
+            self._update_tables()
+        else:
+            raise ValueError(f"At most {MAX_ENVIRONMENTS} environment types are supported.")
+
+        size = self.tile_size
+        key = (x // size, y // size)
+        offset = (y % size) * min(size, self.width - key[0] * size) + x % size
+        with self._lock:
+            self._overlay.setdefault(key, {})[offset] = index
+            tile = self._tiles.get(key)
+            if tile is not None:
+                tile[offset] = index
+
+    def _terrain_rows(self) -> Iterator[bytes]:
+        """Yields the environment indexes of the whole map row by row, reading one band of tiles at a time."""
+        size = self.tile_size
+        for tile_y in range((self.height + size - 1) // size):
+            band = [(self._tile(tile_x, tile_y), min(size, self.width - tile_x * size))
+                    for tile_x in range((self.width + size - 1) // size)]
+            for row in range(min(size, self.height - tile_y * size)):
+                yield b"".join(tile[row * tile_width:(row + 1) * tile_width] for tile, tile_width in band)
+
+    def cost_array(self) -> array:
+        """
+        Returns the per-cell cost array, built tile by tile on first use and kept current by set_environment.
+        It holds 8 bytes per cell for the whole map, unlike the tiles themselves.
+        """
+        if self._cost_array is None:
+            costs = [float('inf') if env.is_obstacle else env.cost for env in self.environments]
+            cost_array = array('d')
+            for row in self._terrain_rows():
+                cost_array.extend(map(costs.__getitem__, row))
+            self._cost_array = cost_array
+        return self._cost_array
+
+    def passable_mask(self) -> bytearray:
+        """Returns a row-major bytearray with 1 for passable cells and 0 for obstacles, built tile by tile."""
+        table = bytes(1 if passable else 0 for passable in self.passable_table).ljust(256, b"\0")
+        return bytearray(b"".join(row.translate(table) for row in self._terrain_rows()))
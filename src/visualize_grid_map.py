@@ -1,100 +1,200 @@
 import os
-from typing import List, Dict, Optional
+import weakref
+from typing import Dict, List, Optional, Tuple
 
-from PIL import Image, ImageDraw
+from PIL import Image, ImageDraw, ImageStat
 
-from .grid import Cell
+from .compact_grid import CompactGrid
+from .grid import Cell, Viewport
 
+DEFAULT_CELL_SIZE = 10
+# Images whose longer side would exceed this many pixels are downsampled (see generate_grid_image_with_images).
+DEFAULT_MAX_DIMENSION = 10000
+MISSING_TILE_COLOR = (128, 128, 128)  # gray
 
-def generate_grid_image_with_images(grid, image_paths: Dict[str, str], path: Optional[List[Cell]] = None,
-                                    output_filename: str = 'grid_map_visualization.png'):
-    """
-    Creates a 1000x1000 pixel image from a grid, replacing symbols with 10x10  images.
-    Path is shown with orange circles.
-    """
-    cell_size = 10
-    image_size = 1000
+_project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_images_dir = os.path.join(_project_root, 'images')
 
-    # new blank image
-    image = Image.new('RGB', (image_size, image_size), 'white')
-    draw = ImageDraw.Draw(image)
+# Tile images, loaded and resized once per (file, size).
+_tile_cache: Dict[Tuple[str, int], Optional[Image.Image]] = {}
+# Terrain base layers per grid, keyed by (cell size, image mapping); dropped when the grid's terrain changes.
+_terrain_layers: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
 
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    images_dir = os.path.join(project_root, 'images')
 
-    loaded_images = {}
-    for symbol, img_filename in image_paths.items():
-        image_full_path = os.path.join(images_dir, img_filename)
+def _load_tile(img_filename: str, cell_size: int) -> Optional[Image.Image]:
+    key = (img_filename, cell_size)
+    if key not in _tile_cache:
+        image_full_path = os.path.join(_images_dir, img_filename)
         try:
-            loaded_images[symbol] = Image.open(image_full_path).resize((cell_size, cell_size))
+            with Image.open(image_full_path) as tile:
+                _tile_cache[key] = tile.convert('RGB').resize((cell_size, cell_size))
         except FileNotFoundError as e:
-            print(
-                f'Error: Image file not found for symbol "{symbol}" at "{image_full_path}":'
-                f' {e}. This terrain type will use default gray.')
-            loaded_images[symbol] = None
+            print(f'Error: Image file not found at "{image_full_path}": {e}. This terrain type will use default gray.')
+            _tile_cache[key] = None
         except Exception as e:
-            print(f'Error loading image for symbol "{symbol}" from "{image_full_path}": {e}. Using default gray.')
-            loaded_images[symbol] = None
-
-    # draw the grid cells
-    for r in range(grid.height):
-        for c in range(grid.width):
-            cell = grid.get_cell(c, r)
-            if cell:
-                symbol = cell.environment_type.symbol
-                x1 = c * cell_size
-                y1 = r * cell_size
-
-                if symbol in loaded_images and loaded_images[symbol] is not None:
-                    image.paste(loaded_images[symbol], (x1, y1))
-                else:
-                    #  gray color if image is not found
-                    if symbol not in image_paths:
-                        print(
-                            f'Warning: No image path provided for terrain symbol "{symbol}". Drawing default gray.')
-                    draw.rectangle([x1, y1, x1 + cell_size, y1 + cell_size], fill=(128, 128, 128))  # gray
-            else:
-                print(f"Warning: Cell at ({c},{r}) is None. Drawing default gray.")
-                draw.rectangle([c * cell_size, r * cell_size, (c + 1) * cell_size, (r + 1) * cell_size],
-                               fill=(128, 128, 128))
+            print(f'Error loading image from "{image_full_path}": {e}. Using default gray.')
+            _tile_cache[key] = None
+    return _tile_cache[key]
+
+
+def _tile_for(symbol: str, image_paths: Dict[str, str], cell_size: int) -> Optional[Image.Image]:
+    if symbol not in image_paths:
+        print(f'Warning: No image path provided for terrain symbol "{symbol}". Drawing default gray.')
+        return None
+    return _load_tile(image_paths[symbol], cell_size)
+
+
+def _index_image(grid: CompactGrid, viewport: Optional[Viewport] = None) -> Image.Image:
+    """One 8-bit pixel per cell holding the cell's environment index, cropped to viewport if given."""
+    if viewport is None:
+        return Image.frombytes('L', (grid.width, grid.height), bytes(grid.terrain))
+    min_x, min_y, max_x, max_y = grid._clip_viewport(viewport)
+    rows = b"".join(bytes(grid.terrain[y * grid.width + min_x:y * grid.width + max_x]) for y in range(min_y, max_y))
+    return Image.frombytes('L', (max_x - min_x, max_y - min_y), rows)
+
+
+def _tiled_texture(tile: Image.Image, size: Tuple[int, int]) -> Image.Image:
+    """Repeats tile over an image of the given size, doubling the covered area at each step."""
+    texture = Image.new('RGB', size)
+    strip = Image.new('RGB', (size[0], tile.height))
+    strip.paste(tile, (0, 0))
+    filled = tile.width
+    while filled < size[0]:
+        strip.paste(strip.crop((0, 0, filled, tile.height)), (filled, 0))
+        filled *= 2
+    texture.paste(strip, (0, 0))
+    filled = tile.height
+    while filled < size[1]:
+        texture.paste(texture.crop((0, 0, size[0], filled)), (0, filled))
+        filled *= 2
+    return texture
+
+
+def build_terrain_layer(grid, image_paths: Dict[str, str], cell_size: int = DEFAULT_CELL_SIZE,
+                        viewport: Optional[Viewport] = None) -> Image.Image:
+    """
+    Builds the terrain image in bulk: for every environment present, its tile is repeated over the canvas
+    and pasted through a mask of the cells of that environment (scaled up from one pixel per cell).
+    viewport is (x, y, width, height) in cells, as for Grid.iter_rows. Any grid backend is accepted, but it
+    is converted to a CompactGrid on every call, so pass a CompactGrid when building many layers.
+    With cell_size 1 each cell is a single pixel in its tile's average color, which is how very large maps
+    are downsampled.
+    """
+    compact_grid = CompactGrid.from_grid(grid)
+    index = _index_image(compact_grid, viewport)
+    size = (index.width * cell_size, index.height * cell_size)
+    image = Image.new('RGB', size, MISSING_TILE_COLOR)
+    present = set(index.getdata()) if index.width * index.height <= 1 << 16 else \
+        {value for value, count in enumerate(index.histogram()) if count}
+
+    for environment_index in sorted(present):
+        symbol = compact_grid.environments[environment_index].symbol
+        tile = _tile_for(symbol, image_paths, max(cell_size, 1))
+        if tile is None:
+            continue
+        mask = index.point([255 if value == environment_index else 0 for value in range(256)])
+        if cell_size > 1:
+            mask = mask.resize(size, Image.NEAREST)
+            image.paste(_tiled_texture(tile, size), (0, 0), mask)
+        else:
+            image.paste(tuple(int(channel) for channel in ImageStat.Stat(tile).mean[:3]), (0, 0) + size, mask)
+    return image
+
+
+def _cached_terrain_layer(grid, image_paths: Dict[str, str], cell_size: int) -> Image.Image:
+    layers = _terrain_layers.get(grid)
+    if layers is None:
+        layers = _terrain_layers[grid] = {}
+
+        def drop_layers(x, y, old_environment, new_environment):
+            layers.clear()
+
+        grid.add_change_listener(drop_layers)
+
+    key = (cell_size, tuple(sorted(image_paths.items())))
+    if key not in layers:
+        layers[key] = build_terrain_layer(grid, image_paths, cell_size)
+    return layers[key]
+
+
+def _draw_path(image: Image.Image, grid, path: Optional[List[Cell]], cell_size: int,
+               origin: Tuple[int, int] = (0, 0)) -> None:
+    """Draws the path as orange dots and the grid's start/end nodes as green/red markers."""
+    draw = ImageDraw.Draw(image)
+    origin_x, origin_y = origin
+    path_dot_radius = max(1, cell_size * 3 // 10)
+    start_end_marker_size = max(2, cell_size * 8 // 10)
 
-    # draw the path
     if path:
         path_color = (255, 165, 0)  # Orange for the path
-        path_dot_radius = 3
-
         for cell in path:
             if (grid.start_node and cell.coords == grid.start_node.coords) or \
                     (grid.end_node and cell.coords == grid.end_node.coords):
                 continue
+            x_center = (cell.x - origin_x) * cell_size + cell_size // 2
+            y_center = (cell.y - origin_y) * cell_size + cell_size // 2
+            if cell_size < 3:
+                draw.point((x_center, y_center), fill=path_color)
+            else:
+                draw.ellipse([x_center - path_dot_radius, y_center - path_dot_radius,
+                              x_center + path_dot_radius, y_center + path_dot_radius], fill=path_color)
 
-            x_center = cell.x * cell_size + cell_size // 2
-            y_center = cell.y * cell_size + cell_size // 2
-            # draw an orange circle at the path's cell
-            draw.ellipse([x_center - path_dot_radius, y_center - path_dot_radius,
-                          x_center + path_dot_radius, y_center + path_dot_radius],
-                         fill=path_color)
-
-    start_end_marker_size = 8
-    start_color = (0, 255, 0)
-    end_color = (255, 0, 0)
-
-    if grid.start_node:
-        start_x_center = grid.start_node.x * cell_size + cell_size // 2
-        start_y_center = grid.start_node.y * cell_size + cell_size // 2
-        draw.ellipse([start_x_center - start_end_marker_size, start_y_center - start_end_marker_size,
-                      start_x_center + start_end_marker_size, start_y_center + start_end_marker_size],
-                     fill=start_color, outline=(0, 0, 0), width=1)
-
-    if grid.end_node:
-        end_x_center = grid.end_node.x * cell_size + cell_size // 2
-        end_y_center = grid.end_node.y * cell_size + cell_size // 2
-        draw.ellipse([end_x_center - start_end_marker_size, end_y_center - start_end_marker_size,
-                      end_x_center + start_end_marker_size, end_y_center + start_end_marker_size],
-                     fill=end_color, outline=(0, 0, 0), width=1)
+    for node, color in ((grid.start_node, (0, 255, 0)), (grid.end_node, (255, 0, 0))):
+        if node:
+            x_center = (node.x - origin_x) * cell_size + cell_size // 2
+            y_center = (node.y - origin_y) * cell_size + cell_size // 2
+            draw.ellipse([x_center - start_end_marker_size, y_center - start_end_marker_size,
+                          x_center + start_end_marker_size, y_center + start_end_marker_size],
+                         fill=color, outline=(0, 0, 0), width=1)
+
+
+def generate_grid_image_with_images(grid, image_paths: Dict[str, str], path: Optional[List[Cell]] = None,
+                                    output_filename: Optional[str] = None,
+                                    cell_size: int = DEFAULT_CELL_SIZE,
+                                    max_dimension: int = DEFAULT_MAX_DIMENSION):
+    """
+    Creates an image sized to the grid, replacing symbols with cell_size x cell_size images.
+    Path is shown with orange circles.
+    The terrain layer is cached per grid, so drawing a path over a map rendered before is only a copy and an
+    overlay. If the image would be larger than max_dimension pixels on a side, cell_size is reduced (down to one
+    pixel per cell, drawn in each tile's average color) and the result is scaled down further if still needed.
+    output_filename defaults to grid_map_visualization.png in the project root.
+    """
+    cell_size = max(1, min(cell_size, max_dimension // max(grid.width, grid.height)))
+    image = _cached_terrain_layer(grid, image_paths, cell_size).copy()
+    _draw_path(image, grid, path, cell_size)
+
+    if max(image.size) > max_dimension:
+        scale = max_dimension / max(image.size)
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.BOX)
 
     # final image
-    output_full_path = os.path.join(project_root, output_filename)
+    output_full_path = output_filename or os.path.join(_project_root, 'grid_map_visualization.png')
     image.save(output_full_path)
     print(f'Generated visualization: {output_full_path}')
+
+
+def generate_grid_image_tiles(grid, image_paths: Dict[str, str], output_dir: Optional[str] = None,
+                              path: Optional[List[Cell]] = None, tile_cells: int = 256,
+                              cell_size: int = DEFAULT_CELL_SIZE) -> List[str]:
+    """
+    Renders a large grid as a set of images, each covering tile_cells x tile_cells cells, saved as
+    <output_dir>/tile_<column>_<row>.png (output_dir defaults to tiles/ in the project root).
+    Returns the paths of the written files.
+    """
+    output_dir = output_dir or os.path.join(_project_root, 'tiles')
+    os.makedirs(output_dir, exist_ok=True)
+    compact_grid = CompactGrid.from_grid(grid)  # converted once, not once per tile
+    written = []
+    for min_y in range(0, grid.height, tile_cells):
+        for min_x in range(0, grid.width, tile_cells):
+            viewport = (min_x, min_y, tile_cells, tile_cells)
+            image = build_terrain_layer(compact_grid, image_paths, cell_size, viewport)
+            tile_path = [cell for cell in path or []
+                         if min_x <= cell.x < min_x + tile_cells and min_y <= cell.y < min_y + tile_cells]
+            _draw_path(image, grid, tile_path, cell_size, origin=(min_x, min_y))
+            filename = os.path.join(output_dir, f"tile_{min_x // tile_cells}_{min_y // tile_cells}.png")
+            image.save(filename)
+            written.append(filename)
+    print(f'Generated {len(written)} visualization tiles in: {output_dir}')
+    return written
@@ -0,0 +1,48 @@
+import random
+from typing import Dict, Iterable, List, Tuple
+
+from src.components import ComponentIndex
+from src.grid import Grid
+
+Coords = Tuple[int, int]
+Query = Tuple[Coords, Coords]
+
+
+def query_pairs(grid: Grid, count: int, seed: int) -> List[Query]:
+    """
+    Draws count seeded (start, end) pairs of passable cells that are connected to each other,
+    so every query exercises a full search rather than an early "no path" answer.
+    """
+    components = ComponentIndex(grid.width, grid.height, grid.passable_mask())
+    passable_ids = [cell_id for cell_id, passable in enumerate(grid.passable_mask()) if passable]
+    if len(passable_ids) < 2:
+        return []
+
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count * 100):
+        if len(pairs) == count:
+            break
+        start_id, end_id = rng.choice(passable_ids), rng.choice(passable_ids)
+        if start_id != end_id and components.same(start_id, end_id):
+            pairs.append(((start_id % grid.width, start_id // grid.width), (end_id % grid.width, end_id // grid.width)))
+    return pairs
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+def latency_summary_ms(seconds: Iterable[float]) -> Dict[str, float]:
+    """Mean, p50, p90, p99 and max of a set of durations in seconds, reported in milliseconds."""
+    ordered = sorted(seconds)
+    return {
+        "mean": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50": percentile(ordered, 0.50) * 1000,
+        "p90": percentile(ordered, 0.90) * 1000,
+        "p99": percentile(ordered, 0.99) * 1000,
+        "max": ordered[-1] * 1000 if ordered else 0.0,
+    }